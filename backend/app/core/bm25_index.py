@@ -0,0 +1,106 @@
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.normalize import normalize_text
+
+# Sorts after every token character, so prefix + _END bounds a prefix range
+_END = "\uffff"
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return normalize_text(text).split()
+
+
+class BM25Index:
+    """
+    Inverted index over multi-field documents with BM25 ranking. Field term
+    frequencies are weighted (a product-name hit counts more than one in a
+    description) and every posting stores its final BM25 contribution, so a
+    query only sums the postings of its terms.
+    """
+
+    def __init__(self, documents: Sequence[Dict[str, Optional[str]]], field_weights: Dict[str, float],
+                 k1: float = 1.2, b: float = 0.75):
+        self.size = len(documents)
+        counts: Dict[str, Dict[int, float]] = defaultdict(lambda: defaultdict(float))
+        lengths = np.zeros(self.size, dtype=np.float32)
+
+        for row, document in enumerate(documents):
+            for field, weight in field_weights.items():
+                for token in tokenize(document.get(field)):
+                    counts[token][row] += weight
+                    lengths[row] += weight
+
+        average = float(lengths.mean()) if self.size and lengths.mean() > 0 else 1.0
+        norms = k1 * (1 - b + b * lengths / average)
+
+        self.terms: List[str] = sorted(counts)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term in self.terms:
+            rows = np.fromiter(counts[term].keys(), dtype=np.int32)
+            tf = np.fromiter(counts[term].values(), dtype=np.float32)
+            order = np.argsort(rows)
+            rows, tf = rows[order], tf[order]
+            idf = np.log(1 + (self.size - len(rows) + 0.5) / (len(rows) + 0.5))
+            self._postings[term] = (rows, (idf * tf * (k1 + 1) / (tf + norms[rows])).astype(np.float32))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def expand(self, token: str, limit: int = 50) -> List[str]:
+        """Indexed terms starting with token (the token itself first, if indexed)"""
+        lo = bisect_left(self.terms, token)
+        hi = min(bisect_left(self.terms, token + _END, lo), lo + limit)
+        return self.terms[lo:hi]
+
+    def _token_postings(self, token: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows matching a query token by prefix, each scored by its best-matching term"""
+        expansions = [self._postings[term] for term in self.expand(token)]
+        if not expansions:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        if len(expansions) == 1:
+            return expansions[0]
+
+        rows = np.concatenate([r for r, _ in expansions])
+        scores = np.concatenate([s for _, s in expansions])
+        order = np.lexsort((scores, rows))
+        rows, scores = rows[order], scores[order]
+        last = np.r_[rows[1:] != rows[:-1], True]  # highest score of each row sorts last
+        return rows[last], scores[last]
+
+    def search(self, query: str, allowed_rows: Optional[np.ndarray] = None,
+               limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        (row, score) for documents matching every query token (as a word
+        prefix), best first. allowed_rows, if given, is a sorted row array
+        the results are restricted to.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        # Rarest token first keeps the running intersection small
+        postings = sorted((self._token_postings(token) for token in tokens), key=lambda p: len(p[0]))
+        rows, scores = postings[0]
+        for other_rows, other_scores in postings[1:]:
+            rows, mine, theirs = np.intersect1d(rows, other_rows, assume_unique=True, return_indices=True)
+            scores = scores[mine] + other_scores[theirs]
+            if not len(rows):
+                return []
+
+        if allowed_rows is not None:
+            keep = np.isin(rows, allowed_rows, assume_unique=True)
+            rows, scores = rows[keep], scores[keep]
+
+        if limit is not None and len(rows) > limit:
+            # Keep every row tied with the limit-th score, so the row tie-break
+            # below (not partition order) decides the cut and deeper limits
+            # only ever extend the result
+            cutoff = np.partition(-scores, limit - 1)[limit - 1]
+            keep = -scores <= cutoff
+            rows, scores = rows[keep], scores[keep]
+        order = np.lexsort((rows, -scores))[:limit]
+        return [(int(rows[i]), float(scores[i])) for i in order]
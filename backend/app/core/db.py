@@ -1,7 +1,7 @@
 import os
 import json
 import firebase_admin
-from firebase_admin import credentials, firestore, auth
+from firebase_admin import credentials, firestore, firestore_async, auth
 from dotenv import load_dotenv
 import base64
 from google.auth.transport import requests
@@ -91,6 +91,10 @@ class FirebaseManager:
 firebase_manager = FirebaseManager()
 db = firebase_manager.get_firestore_client()
 
+def get_async_firestore_client():
+    """Async Firestore client for request paths that must not block the event loop"""
+    return firestore_async.client()
+
 # Utility: Firestore Server Timestamp
 def get_server_timestamp():
     return firestore.SERVER_TIMESTAMP
@@ -187,7 +191,7 @@ initialize_stats_collection()
 
 # Exported
 __all__ = [
-    'db', 'get_server_timestamp',
+    'db', 'get_async_firestore_client', 'get_server_timestamp',
     'users_collection', 'reports_collection',
     'stats_collection',
     'firebase_manager',
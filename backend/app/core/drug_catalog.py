@@ -0,0 +1,127 @@
+import json
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+VERIFIED_DRUGS_PATH = DATA_DIR / "verified_drugs.json"
+UNIFIED_DRUGS_PATH = DATA_DIR / "unified_drugs_with_pils_v.json"
+
+
+def _rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux only)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class DrugCatalog:
+    """
+    One parsed copy of a drug JSON file per process, shared by every module
+    that reads it. The document tuple and lookup maps are read-only; the
+    documents themselves are plain dicts shared between routers, so callers
+    must copy before modifying one.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._drugs: Optional[Tuple[Dict[str, Any], ...]] = None
+        self._by_product_name: Optional[Mapping[str, Dict[str, Any]]] = None
+        self._by_nexahealth_id: Optional[Mapping[Any, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+        self.load_rss_bytes: Optional[int] = None
+
+    def _load(self) -> Tuple[Dict[str, Any], ...]:
+        start = time.perf_counter()
+        rss_before = _rss_bytes()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                content = f.read().strip()
+                drugs = json.loads(content) if content else []
+        except (json.JSONDecodeError, FileNotFoundError) as e:
+            logger.error(f"Failed to load drug catalog {self.path}: {e}")
+            drugs = []
+
+        rss_after = _rss_bytes()
+        self.load_seconds = time.perf_counter() - start
+        if rss_before is not None and rss_after is not None:
+            self.load_rss_bytes = rss_after - rss_before
+        logger.info(
+            f"Loaded drug catalog {self.path.name}: {len(drugs)} drugs in {self.load_seconds:.2f}s"
+            + (f", +{self.load_rss_bytes / 1e6:.1f} MB RSS" if self.load_rss_bytes is not None else "")
+        )
+        return tuple(drugs)
+
+    @property
+    def drugs(self) -> Tuple[Dict[str, Any], ...]:
+        """Raw drug documents, in file order"""
+        if self._drugs is None:
+            with self._lock:
+                if self._drugs is None:
+                    self._drugs = self._load()
+        return self._drugs
+
+    @property
+    def by_product_name(self) -> Mapping[str, Dict[str, Any]]:
+        """Lowercased product name -> first document with that name"""
+        if self._by_product_name is None:
+            index = {}
+            for drug in self.drugs:
+                name = (drug.get("product_name") or "").lower()
+                if name:
+                    index.setdefault(name, drug)
+            self._by_product_name = MappingProxyType(index)
+        return self._by_product_name
+
+    @property
+    def by_nexahealth_id(self) -> Mapping[Any, Dict[str, Any]]:
+        """nexahealth_id -> document"""
+        if self._by_nexahealth_id is None:
+            index = {}
+            for drug in self.drugs:
+                if drug.get("nexahealth_id") is not None:
+                    index.setdefault(drug["nexahealth_id"], drug)
+            self._by_nexahealth_id = MappingProxyType(index)
+        return self._by_nexahealth_id
+
+    def find_by_product_name(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.by_product_name.get((name or "").lower())
+
+    def stats(self) -> Dict[str, Any]:
+        """Load time and memory of this catalog (reported at startup, see app/main.py)"""
+        return {
+            "path": str(self.path),
+            "loaded": self._drugs is not None,
+            "drugs": len(self._drugs) if self._drugs is not None else 0,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "load_rss_mb": round(self.load_rss_bytes / 1e6, 1) if self.load_rss_bytes is not None else None
+        }
+
+
+_catalogs: Dict[Path, DrugCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(path: Path = UNIFIED_DRUGS_PATH) -> DrugCatalog:
+    """The process-wide catalog for a drug JSON file (loaded on first access)"""
+    resolved_path = Path(path).resolve()
+    with _catalogs_lock:
+        if resolved_path not in _catalogs:
+            _catalogs[resolved_path] = DrugCatalog(resolved_path)
+        return _catalogs[resolved_path]
+
+
+def catalog_stats() -> List[Dict[str, Any]]:
+    """stats() of every catalog this process has opened"""
+    with _catalogs_lock:
+        catalogs = list(_catalogs.values())
+    return [catalog.stats() for catalog in catalogs]
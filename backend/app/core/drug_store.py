@@ -0,0 +1,62 @@
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+
+def _intern(value: Any) -> Optional[str]:
+    """Intern highly repeated strings so every record shares one copy"""
+    if not value:
+        return None
+    return sys.intern(str(value))
+
+
+@dataclass(slots=True, frozen=True)
+class DrugRecord:
+    """
+    Compact drug record holding only what verification needs.
+    Replaces the full Firestore document (PIL text, SmPC links, etc.).
+    """
+    nexahealth_id: int
+    product_name: Optional[str] = None
+    generic_name: Optional[str] = None
+    dosage_form: Optional[str] = None
+    strength: Optional[str] = None
+    nafdac_reg_no: Optional[str] = None
+    manufacturer: Optional[str] = None
+    approval_date: Optional[Any] = None
+
+    @classmethod
+    def from_dict(cls, drug: Dict) -> Optional["DrugRecord"]:
+        """Build a record from a raw drug document; None if it has no nexahealth_id"""
+        drug_id = drug.get("nexahealth_id")
+        if not drug_id:
+            return None
+        return cls(
+            nexahealth_id=drug_id,
+            product_name=drug.get("product_name") or None,
+            generic_name=_intern(drug.get("generic_name")),
+            dosage_form=_intern(drug.get("dosage_form")),
+            strength=_intern(drug.get("strength")),
+            nafdac_reg_no=(drug.get("identifiers") or {}).get("nafdac_reg_no") or None,
+            manufacturer=_intern((drug.get("manufacturer") or {}).get("name")),
+            approval_date=(drug.get("approval") or {}).get("approval_date")
+        )
+
+
+DrugLike = Union[DrugRecord, Dict]
+
+
+def to_records(drugs: Iterable[DrugLike]) -> Iterator[DrugRecord]:
+    """Convert raw drug documents to records one at a time (records pass through)"""
+    for drug in drugs:
+        record = drug if isinstance(drug, DrugRecord) else DrugRecord.from_dict(drug)
+        if record is not None:
+            yield record
+
+
+def merge_records(records: List[DrugRecord], deltas: Iterable[DrugLike]) -> List[DrugRecord]:
+    """Replace records by nexahealth_id and append new ones"""
+    by_id = {r.nexahealth_id: r for r in to_records(deltas)}
+    merged = [by_id.pop(r.nexahealth_id, r) for r in records]
+    merged.extend(by_id.values())
+    return merged
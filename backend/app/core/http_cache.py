@@ -0,0 +1,57 @@
+import gzip
+import os
+from functools import lru_cache
+
+from fastapi import Request, Response
+
+# Browser/proxy freshness for pre-rendered static responses; after it, clients
+# revalidate with If-None-Match and get a bodiless 304 while unchanged
+STATIC_MAX_AGE = int(os.getenv("STATIC_RESPONSE_MAX_AGE", 3600))
+# Decompressed bodies kept for clients that do not accept gzip (most recent only)
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_RESPONSE_CACHE_SIZE", 64))
+
+
+def etag_matches(if_none_match: str, etags) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 specifies for it)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(etag in wanted for etag in etags)
+
+
+def accepts_gzip(request: Request) -> bool:
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+@lru_cache(maxsize=IDENTITY_CACHE_SIZE)
+def _identity_body(body_gzip: bytes) -> bytes:
+    # Keyed on the gzip bytes object itself: bytes cache their hash, so hits are cheap
+    return gzip.decompress(body_gzip)
+
+
+def cached_json_response(request: Request, etag: str, body_gzip: bytes,
+                         max_age: int = STATIC_MAX_AGE) -> Response:
+    """
+    Serve a pre-rendered, gzipped JSON body: 304 when the client already has
+    it, the gzip bytes as-is when accepted, else the decompressed JSON (kept
+    for the IDENTITY_CACHE_SIZE most recent bodies). Each encoding gets its
+    own strong ETag (etag / etag + "-gzip").
+    """
+    gzip_etag = etag[:-1] + '-gzip"'
+    headers = {"Cache-Control": f"public, max-age={max_age}", "Vary": "Accept-Encoding"}
+    use_gzip = accepts_gzip(request)
+    headers["ETag"] = gzip_etag if use_gzip else etag
+
+    if etag_matches(request.headers.get("if-none-match", ""), (etag, gzip_etag)):
+        return Response(status_code=304, headers=headers)
+
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=body_gzip, media_type="application/json", headers=headers)
+    return Response(content=_identity_body(body_gzip), media_type="application/json", headers=headers)
@@ -1,88 +1,46 @@
-import pandas as pd
-import spacy
 import re
-import json
 import os
 from typing import Dict, List, Optional, Any, Tuple, Set, DefaultDict
 from difflib import get_close_matches
 from functools import lru_cache
-from negspacy.negation import Negex
-from transformers import pipeline
 from pathlib import Path
 from collections import defaultdict
 from rapidfuzz import fuzz, process
+from app.core.drug_catalog import get_catalog, VERIFIED_DRUGS_PATH
+from app.core.phrase_matcher import PhraseMatcher, normalize_phrase
+from app.core.risk_table import (
+    RiskTable, contextual_weights, is_long_duration, is_severe, load_risk_table, read_mesh_synonyms
+)
+from app.core.symptom_classifier import CLASSIFIER_PATH, SymptomClassifier, sources_sha256
+# Shared spaCy pipeline (lazy, one per process)
+from app.core.nlp import get_doc
 
-# Initialize NLP models
-nlp = spacy.load("en_core_web_sm")
-nlp.add_pipe("negex")  # Add negation detection
 
-# Lazy-loaded zero-shot model
-_zero_shot_model: Optional[Any] = None
+# --- Data Loading with Caching ---
+DATA_DIR = Path(__file__).parent.parent / "data"
+RISK_MAP_PATH = DATA_DIR / "keyword_risk_map.csv"
+MESH_PATH = DATA_DIR / "MeSH.csv"
 
 
-# --- Data Loading with Caching ---
 @lru_cache(maxsize=1)
-def load_risk_data() -> Dict[str, Dict[str, Any]]:
-    BASE_DIR = Path(__file__).parent.parent
-    risk_df = pd.read_csv(BASE_DIR / "data" / "keyword_risk_map.csv")
-    risk_df["symptom_keyword"] = risk_df["symptom_keyword"].str.lower().str.strip()
-
-    # Merge with MeSH terms
-    mesh_df = pd.read_csv(BASE_DIR / "data" / "MeSH.csv")
-    mesh_terms = mesh_df['standard_term'].unique()
-
-    # Ensure all MeSH terms are in risk_map
-    for term in mesh_terms:
-        if term not in risk_df['symptom_keyword'].values:
-            risk_df = pd.concat([risk_df, pd.DataFrame([{
-                'symptom_keyword': term,
-                'risk_weight': 30,  # Default weight
-                'common_drugs': ''
-            }])], ignore_index=True)
-
-    risk_df['common_drugs'] = risk_df['common_drugs'].apply(
-        lambda x: [drug.strip() for drug in x.split(",")] if pd.notna(x) and isinstance(x, str) else []
-    )
-
-    return {
-        row["symptom_keyword"]: {
-            "risk_weight": row["risk_weight"],
-            "common_drugs": row["common_drugs"]
-        }
-        for _, row in risk_df.iterrows()
-    }
+def load_risk_data() -> RiskTable:
+    """keyword_risk_map.csv plus every MeSH term, compiled once (shared with symptom_matcher)"""
+    return load_risk_table(RISK_MAP_PATH, MESH_PATH)
 
 
-@lru_cache(maxsize=1)
-def load_verified_drugs() -> List[Dict[str, Any]]:
-    BASE_DIR = Path(__file__).parent.parent
-    with open(BASE_DIR / "data" / "verified_drugs.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+def load_verified_drugs() -> Tuple[Dict[str, Any], ...]:
+    return get_catalog(VERIFIED_DRUGS_PATH).drugs
 
 
-risk_map = load_risk_data()
+risk_table = load_risk_data()
 verified_drugs = load_verified_drugs()
 
 
 # --- Cached NLP Functions ---
-@lru_cache(maxsize=1000)
-def get_doc(text: str) -> Any:
-    return nlp(text.lower())
-
-
 @lru_cache(maxsize=1)
 def load_mesh_synonyms() -> Dict[str, List[str]]:
-    BASE_DIR = Path(__file__).parent.parent
     try:
-        df = pd.read_csv(BASE_DIR / "data" / "MeSH.csv")
-        synonym_map = defaultdict(list)
-        for _, row in df.iterrows():
-            # Handle NaN/float values safely
-            if pd.isna(row['local_synonyms']):
-                continue
-            synonyms = [s.strip() for s in str(row['local_synonyms']).split(",")]
-            synonym_map[row['standard_term']].extend(synonyms)
-        return dict(synonym_map)
+        return read_mesh_synonyms(MESH_PATH)
     except FileNotFoundError:
         return {}
 
@@ -98,6 +56,48 @@ def load_reverse_synonyms() -> Dict[str, str]:
     return reverse_map
 
 
+@lru_cache(maxsize=1)
+def load_mesh_phrases() -> Dict[str, List[str]]:
+    """Normalized MeSH standard terms and synonyms -> the standard terms they name, in MeSH order"""
+    phrases: DefaultDict[str, List[str]] = defaultdict(list)
+    for term, synonyms in load_mesh_synonyms().items():
+        for phrase in (term, *synonyms):
+            key = normalize_phrase(phrase)
+            if key and term not in phrases[key]:
+                phrases[key].append(term)
+    return dict(phrases)
+
+
+@lru_cache(maxsize=1)
+def load_symptom_matcher() -> PhraseMatcher:
+    """One automaton over every risk-map keyword, MeSH term and MeSH synonym"""
+    return PhraseMatcher([*risk_table.keys, *load_mesh_phrases()])
+
+
+def symptom_label_phrases() -> Dict[str, List[str]]:
+    """Every risk-map label with the MeSH synonyms naming it (the symptom classifier's training data)"""
+    phrases = {key: [key] for key in risk_table.keys}
+    for term, synonyms in load_mesh_synonyms().items():
+        key = normalize_phrase(term)
+        if key in phrases:
+            phrases[key].extend(synonyms)
+    return phrases
+
+
+@lru_cache(maxsize=1)
+def load_symptom_classifier() -> SymptomClassifier:
+    """
+    Zero-shot fallback over all risk-map labels: the file written by
+    app/scripts/build_symptom_classifier.py if built from the current CSVs,
+    else built here (preloaded before fork, not inside a request).
+    """
+    source_sha256 = sources_sha256(path for path in (RISK_MAP_PATH, MESH_PATH) if path.exists())
+    classifier = SymptomClassifier.load(CLASSIFIER_PATH, source_sha256=source_sha256)
+    if classifier is None:
+        classifier = SymptomClassifier.build(symptom_label_phrases(), source_sha256=source_sha256)
+    return classifier
+
+
 @lru_cache(maxsize=1000)
 def preprocess_nigerian_english(text: str) -> str:
     """Convert common Nigerian English phrases to standard medical terms"""
@@ -146,32 +146,20 @@ def extract_keywords(user_input: str) -> List[str]:
     input_lower = user_input.lower()
     mesh_synonyms = load_mesh_synonyms()
 
-    # 1. First check for complete phrase matches from MeSH
-    for term, synonyms in mesh_synonyms.items():
-        # Check if any complete synonym phrase exists in input
-        for syn in synonyms:
-            if ' ' in syn and syn in input_lower:  # Only multi-word phrases
-                matched.add(term)
-                break  # No need to check other synonyms for this term
-
-    # 2. Check standard terms and single-word synonyms
-    for term, synonyms in mesh_synonyms.items():
-        if term in input_lower and term not in matched:
-            matched.add(term)
+    # 1. MeSH terms and synonyms occurring as whole words, found in one pass
+    mesh_phrases = load_mesh_phrases()
+    for phrase in load_symptom_matcher().phrases(input_lower):
+        matched.update(mesh_phrases.get(phrase, ()))
 
-        for syn in synonyms:
-            if syn in input_lower and ' ' not in syn:  # Single word synonyms
-                matched.add(term)
-
-    # 3. Check noun chunks against reverse synonyms
+    # 2. Check noun chunks against reverse synonyms
     for chunk in doc.noun_chunks:
         chunk_text = chunk.text.lower()
         if chunk_text in reverse_synonyms:
             matched.add(reverse_synonyms[chunk_text])
-        elif chunk_text in risk_map:
+        elif chunk_text in risk_table:
             matched.add(chunk_text)
 
-    # 4. Fuzzy matching fallback with adjusted scoring
+    # 3. Fuzzy matching fallback with adjusted scoring
     if not matched:
         # First try fuzzy matching with complete input
         def phrase_scorer(s1: str, s2: str, **kwargs: Any) -> float:
@@ -192,11 +180,10 @@ def extract_keywords(user_input: str) -> List[str]:
 
         for match, score, _ in phrase_matches:
             if score >= 70:
-                # Find which standard term this synonym belongs to
-                for term, synonyms in mesh_synonyms.items():
-                    if match == term or match in synonyms:
-                        matched.add(term)
-                        break
+                # The first standard term this phrase names
+                terms = mesh_phrases.get(normalize_phrase(match))
+                if terms:
+                    matched.add(terms[0])
 
         # If still no matches, try individual tokens
         if not matched:
@@ -208,7 +195,7 @@ def extract_keywords(user_input: str) -> List[str]:
                     token_text = token.text.lower()
                     results = process.extract(
                         token_text,
-                        list(risk_map.keys()),
+                        risk_table.keys,
                         scorer=word_scorer,
                         score_cutoff=50.0
                     )
@@ -229,37 +216,26 @@ def calculate_risk(user_input: str) -> Dict[str, Any]:
     negated = [e.text for e in doc.ents if e._.negex]
     valid_keywords = [k for k in keywords if not any(n in k for n in negated)]
 
-    # Zero-shot fallback if no matches
+    # Zero-shot fallback if no matches: every risk-map label scored in about a millisecond
     if not valid_keywords and len(user_input.split()) > 2:
-        global _zero_shot_model
-        if _zero_shot_model is None:
-            _zero_shot_model = pipeline(
-                "zero-shot-classification",
-                model="distilbert-base-uncased"
-            )
-        result = _zero_shot_model(user_input, list(risk_map.keys())[:50])
-        if result['scores'][0] > 0.7:
-            valid_keywords.append(result['labels'][0])
-
-    # Calculate risk scores
-    max_risk = 0
-    suggested_drugs: Set[str] = set()
-
-    for keyword in valid_keywords:
-        if keyword not in risk_map:
-            continue
-
-        weight = int(risk_map[keyword]["risk_weight"])
-
-        # Apply context multipliers
-        if context["duration"] and ("week" in context["duration"] or "month" in context["duration"]):
-            weight = int(weight * 1.5)
-        if context["severity"] in ["severe", "acute"]:
-            weight = int(weight * 1.8)
-
-        weight = min(weight, 100)
-        max_risk = max(max_risk, weight)
-        suggested_drugs.update(risk_map[keyword].get("common_drugs", []))
+        label = load_symptom_classifier().predict(user_input)
+        if label:
+            valid_keywords.append(label)
+
+    # Calculate risk scores: context multipliers over all matched weights at once
+    rows = risk_table.rows(valid_keywords)
+    weights = contextual_weights(
+        risk_table.weights[rows],
+        long_duration=is_long_duration(context["duration"]),
+        severe=is_severe(context["severity"])
+    )
+    max_risk = int(weights.max()) if len(weights) else 0
+    # Suggested drug -> keyword of the first matched row listing it
+    suggested_drugs: Dict[str, str] = {}
+    for row in rows:
+        record = risk_table.records[row]
+        for drug in record.common_drugs:
+            suggested_drugs.setdefault(drug, record.keyword)
 
     # Prepare output
     risk_level = "High" if max_risk >= 80 else "Moderate" if max_risk >= 50 else "Low"
@@ -273,7 +249,7 @@ def calculate_risk(user_input: str) -> Dict[str, Any]:
             {
                 "name": drug["product_name"],
                 "dosage_form": drug.get("dosage_form", "N/A"),
-                "use_case": f"Treats {keyword}"
+                "use_case": f"Treats {suggested_drugs[drug['product_name']]}"
             }
             for drug in verified_drugs
             if drug["product_name"] in suggested_drugs
@@ -0,0 +1,139 @@
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from rapidfuzz.distance import Levenshtein
+
+from app.core.normalize import canonical_nafdac
+
+# Sorts after every canonical character, so prefix + _END bounds a prefix range
+_END = "\uffff"
+
+# Largest edit distance fuzzy() supports (keys are split into MAX_DISTANCE + 1 segments)
+MAX_DISTANCE = 2
+
+
+def _segment_bounds(length: int) -> List[Tuple[int, int]]:
+    """Split range(length) into MAX_DISTANCE + 1 near-equal [start, end) segments"""
+    size, extra = divmod(length, MAX_DISTANCE + 1)
+    bounds, start = [], 0
+    for part in range(MAX_DISTANCE + 1):
+        end = start + size + (1 if part < extra else 0)
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+class NafdacIndex:
+    """
+    Canonical NAFDAC registration numbers for exact, prefix, substring and
+    typo-tolerant lookups. Keys live in one sorted list, which acts as a compact
+    trie (every prefix is a bisect range); substring lookups use a sorted list
+    of key suffixes, built on first use; edit-distance lookups go through a
+    segment index.
+    """
+
+    def __init__(self, items: Iterable[Tuple[Optional[str], Any]]):
+        groups: Dict[str, List[Any]] = {}
+        for nafdac, value in items:
+            key = canonical_nafdac(nafdac)
+            if key:
+                groups.setdefault(key, []).append(value)
+        self.keys: List[str] = sorted(groups)
+        self._values = groups
+
+        # (key length, segment number, segment) -> keys, for edit-distance lookups
+        self._segments: Dict[Tuple[int, int, str], List[str]] = {}
+        for key in self.keys:
+            for part, (start, end) in enumerate(_segment_bounds(len(key))):
+                self._segments.setdefault((len(key), part, key[start:end]), []).append(key)
+
+        # Sorted key suffixes and the key each belongs to, for contains()
+        self._suffixes: Optional[List[str]] = None
+        self._suffix_keys: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def values(self, key: str) -> List[Any]:
+        """Values stored under a canonical key"""
+        return self._values.get(key, [])
+
+    def exact(self, nafdac: Optional[str]) -> List[Any]:
+        return self.values(canonical_nafdac(nafdac))
+
+    def prefix(self, nafdac: Optional[str], limit: Optional[int] = None) -> List[str]:
+        """Canonical keys starting with the given number, in sorted order"""
+        query = canonical_nafdac(nafdac)
+        if not query:
+            return []
+        lo = bisect_left(self.keys, query)
+        hi = bisect_left(self.keys, query + _END, lo)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return self.keys[lo:hi]
+
+    def contains(self, nafdac: Optional[str], limit: Optional[int] = None) -> List[str]:
+        """Canonical keys containing the given number anywhere, in order of the matching suffix"""
+        query = canonical_nafdac(nafdac)
+        if not query:
+            return []
+        if self._suffixes is None:
+            pairs = sorted((key[start:], key) for key in self.keys for start in range(len(key)))
+            self._suffix_keys = [key for _, key in pairs]
+            self._suffixes = [suffix for suffix, _ in pairs]
+
+        lo = bisect_left(self._suffixes, query)
+        hi = bisect_left(self._suffixes, query + _END, lo)
+        found: Dict[str, None] = {}
+        for position in range(lo, hi):
+            found.setdefault(self._suffix_keys[position])
+            if limit is not None and len(found) >= limit:
+                break
+        return list(found)
+
+    def fuzzy(self, nafdac: Optional[str], max_distance: int = 2,
+              limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Canonical keys within max_distance Levenshtein edits, as (key, distance)
+        sorted by distance then key. By pigeonhole, a key within d <= MAX_DISTANCE
+        edits keeps one of its MAX_DISTANCE + 1 segments intact, shifted by at
+        most d in the query; only keys sharing such a segment are verified.
+        """
+        query = canonical_nafdac(nafdac)
+        if not query:
+            return []
+        max_distance = min(max_distance, MAX_DISTANCE)
+
+        candidates = set()
+        for length in range(max(1, len(query) - max_distance), len(query) + max_distance + 1):
+            for part, (start, end) in enumerate(_segment_bounds(length)):
+                for shift in range(-max_distance, max_distance + 1):
+                    if start + shift < 0 or end + shift > len(query):
+                        continue
+                    bucket = self._segments.get((length, part, query[start + shift:end + shift]))
+                    if bucket:
+                        candidates.update(bucket)
+
+        results = []
+        for key in candidates:
+            distance = Levenshtein.distance(query, key, score_cutoff=max_distance)
+            if distance <= max_distance:
+                results.append((key, distance))
+
+        results.sort(key=lambda r: (r[1], r[0]))
+        return results[:limit] if limit is not None else results
+
+    def lookup(self, nafdac: Optional[str], max_distance: int = 2, limit: int = 10) -> List[Any]:
+        """Values for an exact match, else prefix matches, else the nearest numbers"""
+        found = self.exact(nafdac)
+        if found:
+            return found
+
+        keys = self.prefix(nafdac, limit=limit)
+        if not keys and max_distance > 0:
+            keys = [key for key, _ in self.fuzzy(nafdac, max_distance=max_distance, limit=limit)]
+
+        values = []
+        for key in keys:
+            values.extend(self._values[key])
+        return values[:limit]
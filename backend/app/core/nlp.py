@@ -0,0 +1,70 @@
+import os
+import time
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Iterable, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# One spaCy pipeline per process, shared by ml.py (diagnosis) and
+# symptom_matcher.py (risk). spaCy is imported on first use, not at import
+# time, so importing app.main stays cheap.
+
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+NLP_BATCH_SIZE = int(os.getenv("NLP_BATCH_SIZE", 64))
+DOC_CACHE_SIZE = 1000
+
+# Never read by any caller (lemmas), so not even loaded
+EXCLUDED_COMPONENTS = ("lemmatizer",)
+# The symptom path reads entities, negation and the dependency parse only;
+# POS tags (needed for noun_chunks in ml.py) are skipped there
+SYMPTOM_DISABLED_COMPONENTS = ("tagger", "attribute_ruler")
+
+_nlp = None
+_lock = threading.Lock()
+
+
+def get_nlp():
+    """The shared pipeline (with negex), loaded on first call"""
+    global _nlp
+    if _nlp is None:
+        with _lock:
+            if _nlp is None:
+                import spacy
+                from negspacy.negation import Negex  # noqa: F401 (registers the "negex" factory)
+
+                start = time.perf_counter()
+                nlp = spacy.load(SPACY_MODEL, exclude=list(EXCLUDED_COMPONENTS))
+                nlp.add_pipe("negex")  # Add negation detection
+                logger.info(f"Loaded spaCy {SPACY_MODEL} {nlp.pipe_names} in {time.perf_counter() - start:.2f}s")
+                _nlp = nlp
+    return _nlp
+
+
+def _disabled(components: Sequence[str]) -> List[str]:
+    """Components to skip that this pipeline actually has"""
+    return [name for name in components if name in get_nlp().pipe_names]
+
+
+@lru_cache(maxsize=DOC_CACHE_SIZE)
+def get_doc(text: str) -> Any:
+    """Full-pipeline Doc of the lowercased text"""
+    return get_nlp()(text.lower())
+
+
+@lru_cache(maxsize=DOC_CACHE_SIZE)
+def get_symptom_doc(text: str) -> Any:
+    """Doc of the lowercased text without POS tagging (entities, negation, parse)"""
+    return get_nlp()(text.lower(), disable=_disabled(SYMPTOM_DISABLED_COMPONENTS))
+
+
+def pipe(texts: Iterable[str], symptom_only: bool = False, batch_size: int = NLP_BATCH_SIZE) -> List[Any]:
+    """Docs of many lowercased texts, batched through nlp.pipe"""
+    disable = _disabled(SYMPTOM_DISABLED_COMPONENTS) if symptom_only else []
+    return list(get_nlp().pipe((text.lower() for text in texts), batch_size=batch_size, disable=disable))
+
+
+def warm_up() -> None:
+    """Load the pipeline and run it once, e.g. before forking workers"""
+    get_nlp()("warm up")
@@ -0,0 +1,115 @@
+import re
+import string
+import unicodedata
+from functools import lru_cache
+from typing import Optional
+
+# Shared, memoized text normalizers. Drug names, manufacturers and NAFDAC
+# numbers repeat heavily across requests and index builds, so each function
+# is an LRU-cached pure function of its input string.
+
+NORMALIZE_CACHE_SIZE = 65536
+
+# Common corporate suffixes for manufacturer matching
+CORP_SUFFIXES = [
+    r"ltd", r"limited", r"plc", r"inc", r"incorporated",
+    r"co", r"company", r"corp", r"corporation", r"llc",
+    r"llp", r"partners", r"group", r"holdings",
+    r"sa", r"ag", r"gmbh", r"sp\.?z\.?o\.?o\.?",
+    r"industries", r"pharma", r"pharmaceuticals", r"pharmacies",
+    r"healthcare", r"biotech", r"biotechnology", r"medicines",
+    r"laboratories", r"labs", r"research", r"therapeutics",
+    r"sciences", r"formulations",
+    r"nigeria", r"nig\.?", r"ng"
+]
+
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+_NON_WORD_OR_SPACE_RE = re.compile(r'[^\w]')
+_NON_ALNUM_RE = re.compile(r'[^0-9A-Z]')
+_SPACES_RE = re.compile(r'\s+')
+_CORP_SUFFIX_RE = re.compile(r"\b(?:" + "|".join(CORP_SUFFIXES) + r")\b")
+_PUNCTUATION_RE = re.compile(f"[{re.escape(string.punctuation)}]")
+
+# Abbreviations used in Nigerian drug labels
+_ABBREVIATIONS = {
+    "tab": "tablet",
+    "cap": "capsule",
+    "susp": "suspension",
+    "inj": "injection",
+    "supp": "suppository",
+    "pcm": "paracetamol"
+}
+_ABBREVIATION_RE = re.compile(r"\b(?:" + "|".join(_ABBREVIATIONS) + r")\b")
+
+_COMPACT_ABBREVIATIONS = {
+    "tab": "tablet",
+    "cap": "capsule",
+    "susp": "suspension",
+}
+_COMPACT_ABBREVIATION_RE = re.compile(r"\b(?:" + "|".join(_COMPACT_ABBREVIATIONS) + r")\b")
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    if not text:
+        return ""
+
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join([c for c in text if not unicodedata.combining(c)])
+
+    text = _NON_WORD_RE.sub(' ', text)
+    return _SPACES_RE.sub(' ', text).strip()
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_manufacturer(manufacturer: Optional[str]) -> str:
+    """Normalize a manufacturer name and drop corporate suffixes in one pass"""
+    if not manufacturer:
+        return ""
+
+    normalized = _CORP_SUFFIX_RE.sub('', normalize_text(manufacturer))
+    return _SPACES_RE.sub(' ', normalized).strip()
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_nafdac(nafdac: Optional[str]) -> str:
+    """Uppercase, strip separators, and format 6-digit numbers as XX-XXXX"""
+    if not nafdac:
+        return ""
+
+    normalized = _NON_WORD_OR_SPACE_RE.sub('', nafdac.upper())
+    if len(normalized) == 6 and normalized[:2].isdigit() and normalized[2:].isdigit():
+        return f"{normalized[:2]}-{normalized[2:]}"
+
+    return normalized
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def canonical_nafdac(nafdac: Optional[str]) -> str:
+    """Registration number as uppercase letters and digits only (A4-1234 / a4 1234 -> A41234)"""
+    if not nafdac:
+        return ""
+
+    return _NON_ALNUM_RE.sub('', nafdac.upper())
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_label_text(text: Optional[str]) -> str:
+    """Lowercase, drop punctuation and expand label abbreviations (tab, susp, pcm...)"""
+    if not text:
+        return ""
+
+    text = _PUNCTUATION_RE.sub("", text.lower())
+    text = _ABBREVIATION_RE.sub(lambda m: _ABBREVIATIONS[m.group(0)], text)
+    return text.strip()
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_compact(text: Optional[str]) -> str:
+    """Lowercase and remove every non-word character, including spaces"""
+    if not text:
+        return ''
+
+    text = _NON_WORD_OR_SPACE_RE.sub('', text.lower().strip())
+    return _COMPACT_ABBREVIATION_RE.sub(lambda m: _COMPACT_ABBREVIATIONS[m.group(0)], text)
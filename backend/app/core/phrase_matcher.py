@@ -0,0 +1,97 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def normalize_phrase(text: str) -> str:
+    """Lowercase and collapse whitespace, the form phrases are stored and reported in"""
+    return " ".join(str(text).lower().split())
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over a fixed phrase vocabulary. find() reports
+    every phrase occurring in a text in one pass over its characters, so
+    matching costs O(len(text) + hits) however many phrases are indexed.
+    Hits must start and end on word boundaries ("fever" does not match
+    inside "feverish").
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Optional[str]] = [None]  # phrase ending at this state
+        self._next_output: List[int] = [0]  # nearest state down the fail chain with an output (0: none)
+
+        for phrase in phrases:
+            phrase = normalize_phrase(phrase)
+            if phrase:
+                self._insert(phrase)
+        self._link()
+
+    def __len__(self) -> int:
+        return sum(output is not None for output in self._output)
+
+    def _insert(self, phrase: str) -> None:
+        state = 0
+        for char in phrase:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._next_output.append(0)
+            state = nxt
+        self._output[state] = phrase
+
+    def _link(self) -> None:
+        """Breadth-first fail links: each state's longest proper suffix that is also a trie path"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[child] = fail
+                self._next_output[child] = fail if self._output[fail] is not None else self._next_output[fail]
+                queue.append(child)
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """(start, end, phrase) of every whole-word hit in text.lower(), by end position"""
+        text = text.lower()
+        goto, fail, output, next_output = self._goto, self._fail, self._output, self._next_output
+        hits = []
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            found = state if output[state] is not None else next_output[state]
+            while found:
+                phrase = output[found]
+                start = end - len(phrase)
+                if self._on_boundaries(text, start, end, phrase):
+                    hits.append((start, end, phrase))
+                found = next_output[found]
+        return hits
+
+    @staticmethod
+    def _on_boundaries(text: str, start: int, end: int, phrase: str) -> bool:
+        # Same rule as regex \b: only a word character at the phrase edge needs a non-word neighbour
+        if start > 0 and _is_word_char(phrase[0]) and _is_word_char(text[start - 1]):
+            return False
+        if end < len(text) and _is_word_char(phrase[-1]) and _is_word_char(text[end]):
+            return False
+        return True
+
+    def phrases(self, text: str) -> List[str]:
+        """Distinct phrases found in text, in order of first occurrence"""
+        return list(dict.fromkeys(phrase for _, _, phrase in self.find(text)))
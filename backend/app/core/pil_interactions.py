@@ -0,0 +1,309 @@
+import os
+import atexit
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Protocol, Tuple
+
+from app.core.drug_catalog import DATA_DIR
+from app.models.pils_model import UserInteractionBase, UserInteractionInDB
+
+logger = logging.getLogger(__name__)
+
+PIL_INTERACTIONS_BACKEND = os.getenv("PIL_INTERACTIONS_BACKEND", "sqlite")  # sqlite | firestore
+# Runtime data, gitignored; created on first use, not at import
+PIL_INTERACTIONS_PATH = os.getenv("PIL_INTERACTIONS_PATH", str(DATA_DIR / "pil_interactions.db"))
+# Write-behind: buffered view counts are flushed after this many seconds or pending rows
+PIL_INTERACTIONS_FLUSH_SECONDS = float(os.getenv("PIL_INTERACTIONS_FLUSH_SECONDS", 5))
+PIL_INTERACTIONS_FLUSH_SIZE = int(os.getenv("PIL_INTERACTIONS_FLUSH_SIZE", 500))
+
+# One change to a (user, PIL) pair: views to add, saved flag (sticky once set), last view time
+Delta = Dict[str, object]
+
+
+class InteractionStore(Protocol):
+    """Durable per-user interaction storage. upsert adds view_count and never unsets saved."""
+
+    def upsert(self, deltas: Dict[Tuple[str, str], Delta]) -> None: ...
+
+    def get(self, user_id: str, pil_id: str) -> Optional[Delta]: ...
+
+    def list_for_user(self, user_id: str, saved: Optional[bool], limit: int) -> List[Tuple[str, Delta]]: ...
+
+
+class SQLiteInteractionStore:
+    """
+    One SQLite file per host, shared by every worker on it, opened (and
+    created) on first use. Rows are clustered by (user_id, pil_id), and an
+    index on (user_id, saved, last_viewed) serves a user's recent and saved
+    lists without a scan.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _create_schema(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pil_interactions (
+                    user_id TEXT NOT NULL,
+                    pil_id TEXT NOT NULL,
+                    saved INTEGER NOT NULL DEFAULT 0,
+                    view_count INTEGER NOT NULL DEFAULT 0,
+                    last_viewed REAL NOT NULL,
+                    PRIMARY KEY (user_id, pil_id)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS pil_interactions_by_user
+                ON pil_interactions (user_id, saved, last_viewed DESC)
+            """)
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """This thread's connection (reopened in a forked worker); use as a transaction context"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            with self._schema_lock:
+                if not self._schema_ready:
+                    self._create_schema()
+                    self._schema_ready = True
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def upsert(self, deltas: Dict[Tuple[str, str], Delta]) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO pil_interactions (user_id, pil_id, saved, view_count, last_viewed)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, pil_id) DO UPDATE SET
+                    saved = MAX(saved, excluded.saved),
+                    view_count = view_count + excluded.view_count,
+                    last_viewed = MAX(last_viewed, excluded.last_viewed)
+                """,
+                [
+                    (user_id, pil_id, int(bool(d["saved"])), d["view_count"], d["last_viewed"].timestamp())
+                    for (user_id, pil_id), d in deltas.items()
+                ]
+            )
+
+    @staticmethod
+    def _delta(saved, view_count, last_viewed) -> Delta:
+        return {
+            "saved": bool(saved),
+            "view_count": view_count,
+            "last_viewed": datetime.fromtimestamp(last_viewed, tz=timezone.utc)
+        }
+
+    def get(self, user_id: str, pil_id: str) -> Optional[Delta]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT saved, view_count, last_viewed FROM pil_interactions WHERE user_id = ? AND pil_id = ?",
+                (user_id, pil_id)
+            ).fetchone()
+        return self._delta(*row) if row else None
+
+    def list_for_user(self, user_id: str, saved: Optional[bool], limit: int) -> List[Tuple[str, Delta]]:
+        query = "SELECT pil_id, saved, view_count, last_viewed FROM pil_interactions WHERE user_id = ?"
+        params: list = [user_id]
+        if saved is not None:
+            query += " AND saved = ?"
+            params.append(int(saved))
+        query += " ORDER BY last_viewed DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [(pil_id, self._delta(*rest)) for pil_id, *rest in rows]
+
+
+class FirestoreInteractionStore:
+    """
+    Same interface over Firestore: pil_interactions/{user_id}/items/{pil_id},
+    so each user's history is its own subcollection. Recent/saved queries
+    need a composite index on (saved, last_viewed desc).
+    """
+
+    def __init__(self, db, collection: str = "pil_interactions"):
+        self.db = db
+        self.collection = collection
+
+    def _items(self, user_id: str):
+        return self.db.collection(self.collection).document(user_id).collection("items")
+
+    def upsert(self, deltas: Dict[Tuple[str, str], Delta]) -> None:
+        from firebase_admin import firestore
+
+        items = list(deltas.items())
+        for start in range(0, len(items), 500):  # Firestore batch limit
+            chunk = items[start:start + 500]
+            refs = [self._items(user_id).document(pil_id) for (user_id, pil_id), _ in chunk]
+            # "saved" never goes back to False, but new documents need it for the saved == False query
+            existing = {snapshot.reference.path for snapshot in self.db.get_all(refs) if snapshot.exists}
+
+            batch = self.db.batch()
+            for ref, (_, d) in zip(refs, chunk):
+                update = {
+                    "view_count": firestore.Increment(d["view_count"]),
+                    "last_viewed": d["last_viewed"]
+                }
+                if d["saved"] or ref.path not in existing:
+                    update["saved"] = bool(d["saved"])
+                batch.set(ref, update, merge=True)
+            batch.commit()
+
+    @staticmethod
+    def _delta(data: Dict) -> Delta:
+        return {
+            "saved": bool(data.get("saved", False)),
+            "view_count": data.get("view_count", 0),
+            "last_viewed": data.get("last_viewed")
+        }
+
+    def get(self, user_id: str, pil_id: str) -> Optional[Delta]:
+        doc = self._items(user_id).document(pil_id).get()
+        return self._delta(doc.to_dict()) if doc.exists else None
+
+    def list_for_user(self, user_id: str, saved: Optional[bool], limit: int) -> List[Tuple[str, Delta]]:
+        from firebase_admin import firestore
+
+        query = self._items(user_id)
+        if saved is not None:
+            query = query.where("saved", "==", saved)
+        query = query.order_by("last_viewed", direction=firestore.Query.DESCENDING).limit(limit)
+        return [(doc.id, self._delta(doc.to_dict())) for doc in query.stream()]
+
+
+def _merge(stored: Optional[Delta], pending: Optional[Delta]) -> Optional[Delta]:
+    if stored is None or pending is None:
+        return pending or stored
+    return {
+        "saved": stored["saved"] or pending["saved"],
+        "view_count": stored["view_count"] + pending["view_count"],
+        "last_viewed": max(stored["last_viewed"], pending["last_viewed"])
+    }
+
+
+class InteractionRecorder:
+    """
+    Write-behind front of an InteractionStore. View counts are summed in
+    memory and flushed in one batch every PIL_INTERACTIONS_FLUSH_SECONDS
+    (or PIL_INTERACTIONS_FLUSH_SIZE pending pairs); saves are written
+    through. Reads merge pending changes, so users see their own views.
+    """
+
+    def __init__(self, store: InteractionStore, flush_seconds: float = PIL_INTERACTIONS_FLUSH_SECONDS,
+                 flush_size: int = PIL_INTERACTIONS_FLUSH_SIZE):
+        self.store = store
+        self.flush_seconds = flush_seconds
+        self.flush_size = flush_size
+        self._pending: Dict[Tuple[str, str], Delta] = {}
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_pid: Optional[int] = None
+        self._wake = threading.Event()
+        atexit.register(self.flush)
+
+    def record(self, interaction: UserInteractionBase) -> UserInteractionInDB:
+        key = (interaction.user_id, interaction.pil_id)
+        delta = {
+            "saved": interaction.saved,
+            "view_count": interaction.view_count,
+            "last_viewed": self._aware(interaction.last_viewed or datetime.now(timezone.utc))
+        }
+        with self._lock:
+            self._pending[key] = _merge(self._pending.get(key), delta)
+            pending_count = len(self._pending)
+
+        if interaction.saved or pending_count >= self.flush_size:
+            self.flush()
+        else:
+            self._ensure_flusher()
+        return self.get(*key)
+
+    def get(self, user_id: str, pil_id: str) -> Optional[UserInteractionInDB]:
+        with self._lock:
+            pending = self._pending.get((user_id, pil_id))
+        merged = _merge(self.store.get(user_id, pil_id), pending)
+        return self._to_model(user_id, pil_id, merged) if merged else None
+
+    def list_for_user(self, user_id: str, saved: Optional[bool] = None, limit: int = 10) -> List[UserInteractionInDB]:
+        with self._lock:
+            pending = {pil_id: d for (uid, pil_id), d in self._pending.items() if uid == user_id}
+
+        # Pending rows can move a stored row into or out of the saved filter, so read that much deeper
+        merged = dict(self.store.list_for_user(user_id, saved, limit + len(pending)))
+        for pil_id, delta in pending.items():
+            stored = merged.get(pil_id)
+            if stored is None and saved is not None:
+                stored = self.store.get(user_id, pil_id)
+            merged[pil_id] = _merge(stored, delta)
+
+        rows = [(pil_id, d) for pil_id, d in merged.items() if saved is None or d["saved"] == saved]
+        rows.sort(key=lambda row: row[1]["last_viewed"], reverse=True)
+        return [self._to_model(user_id, pil_id, d) for pil_id, d in rows[:limit]]
+
+    def flush(self) -> int:
+        """Write pending changes to the store; returns how many pairs were written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            self.store.upsert(pending)
+        except Exception as e:
+            logger.error(f"Flushing {len(pending)} PIL interactions failed: {e}")
+            with self._lock:  # keep them for the next flush
+                for key, delta in pending.items():
+                    self._pending[key] = _merge(delta, self._pending.get(key))
+            return 0
+        return len(pending)
+
+    def _ensure_flusher(self) -> None:
+        # Started on first use, and again in a forked worker (threads do not survive fork)
+        if self._flusher is not None and self._flusher_pid == os.getpid() and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher_pid == os.getpid() and self._flusher.is_alive():
+                return
+            self._flusher_pid = os.getpid()
+            self._flusher = threading.Thread(target=self._flush_loop, name="pil-interactions-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._wake.wait(self.flush_seconds):
+            self.flush()
+
+    @staticmethod
+    def _aware(value: datetime) -> datetime:
+        return value if value.tzinfo else value.astimezone(timezone.utc)
+
+    @staticmethod
+    def _to_model(user_id: str, pil_id: str, delta: Delta) -> UserInteractionInDB:
+        return UserInteractionInDB(
+            id=f"{user_id}_{pil_id}",
+            user_id=user_id,
+            pil_id=pil_id,
+            saved=delta["saved"],
+            view_count=delta["view_count"],
+            last_viewed=delta["last_viewed"]
+        )
+
+
+def _default_store() -> InteractionStore:
+    if PIL_INTERACTIONS_BACKEND == "firestore":
+        from app.core.db import db
+        return FirestoreInteractionStore(db)
+    return SQLiteInteractionStore(PIL_INTERACTIONS_PATH)
+
+
+interaction_recorder = InteractionRecorder(_default_store())
@@ -1,21 +1,27 @@
-import json
 from pathlib import Path
-from typing import Dict, List, Optional
-from app.models.pils_model import PILInDB
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Sequence
+from app.models.pils_model import PILInDB, DrugCategory
+from app.core.drug_catalog import get_catalog, UNIFIED_DRUGS_PATH
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Required text fields of PILBase carried by summaries
+_SUMMARY_TEXT_FIELDS = ('product_name', 'generic_name', 'dosage_form', 'strength')
+_CATEGORY_VALUES = {category.value for category in DrugCategory}
+
 class PILDataLoader:
     def __init__(self, json_path: str):
         self.json_path = Path(json_path)
         self._data = None
+        self._items = None  # read-only views of _data
     
-    def load_data(self) -> List[Dict]:
-        """Load and parse the JSON data"""
+    def load_data(self) -> Sequence[Dict]:
+        """Load the JSON data from the shared drug catalog (parsed once per process)"""
         try:
-            with open(self.json_path, 'r', encoding='utf-8') as f:
-                self._data = json.load(f)
+            self._data = get_catalog(self.json_path).drugs
+            self._items = None
             logger.info(f"Loaded {len(self._data)} PIL records")
             return self._data
         except Exception as e:
@@ -39,16 +45,60 @@ class PILDataLoader:
                 continue
         return pils
 
-    def _transform_to_pil_model(self, item: Dict) -> Optional[PILInDB]:
+    def get_all_items(self) -> Sequence[Mapping]:
+        """
+        Raw PIL records, without building models, as read-only views of the
+        shared catalog documents (nested values are shared too: copy first)
+        """
+        if not self._data:
+            self.load_data()
+        if self._items is None:
+            self._items = tuple(MappingProxyType(item) for item in self._data)
+        return self._items
+
+    def get_pil(self, item: Mapping) -> Optional[PILInDB]:
+        """Full PILInDB for one raw record"""
+        return self._transform_to_pil_model(item)
+
+    def get_summary(self, item: Mapping) -> Optional[Dict]:
+        """
+        Search/list projection of a raw record (see PILSummary), as a new
+        dict, or None for records _transform_to_pil_model would reject on
+        these fields.
+        """
+        try:
+            nexahealth_id = int(item.get('nexahealth_id'))
+            text = {field: item.get(field, '') for field in _SUMMARY_TEXT_FIELDS}
+            category = item.get('category', '')
+            if category not in _CATEGORY_VALUES or not all(isinstance(v, str) for v in text.values()):
+                return None
+
+            return {
+                'id': str(item.get('nexahealth_id')),
+                'nexahealth_id': nexahealth_id,
+                **text,
+                'description': item.get('description') or '',
+                'category': category,
+                'identifiers': {'nafdac_reg_no': (item.get('identifiers') or {}).get('nafdac_reg_no')},
+                'manufacturer': {'name': (item.get('manufacturer') or {}).get('name')},
+                'tags': self._extract_tags(item),
+                'featured': False
+            }
+        except (TypeError, ValueError, AttributeError) as e:
+            logger.warning(f"Skipping invalid PIL data: {str(e)}")
+            return None
+
+    def _transform_to_pil_model(self, item: Mapping) -> Optional[PILInDB]:
         """Transform raw JSON item to PILInDB model"""
         try:
-            # Handle documents structure
+            # Handle documents structure (copied: catalog documents are shared)
             documents = item.get('documents', {})
-            pil_doc = documents.get('pil', {})
+            pil_doc = dict(documents.get('pil', {}))
             
             # Handle side effects structure
             side_effects = pil_doc.get('side_effects', {})
             if isinstance(side_effects, dict):
+                side_effects = dict(side_effects)
                 # Convert snake_case to camelCase for Pydantic aliases
                 if 'very common' in side_effects:
                     side_effects['very_common'] = side_effects.pop('very common')
@@ -94,7 +144,7 @@ class PILDataLoader:
             logger.warning(f"Error transforming PIL data: {str(e)}")
             return None
 
-    def _extract_tags(self, item: Dict) -> List[str]:
+    def _extract_tags(self, item: Mapping) -> List[str]:
         """Extract tags from drug data"""
         tags = []
         category = item.get('category', '').lower()
@@ -109,4 +159,4 @@ class PILDataLoader:
         return tags
 
 # Initialize with your JSON path
-pil_loader = PILDataLoader("app/data/unified_drugs_with_pils_v.json")
\ No newline at end of file
+pil_loader = PILDataLoader(UNIFIED_DRUGS_PATH)
\ No newline at end of file
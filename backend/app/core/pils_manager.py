@@ -1,21 +1,124 @@
-from typing import List, Optional, Dict, Tuple
+from typing import Any, List, NamedTuple, Optional, Dict, Set, Tuple
+from bisect import bisect_left
 from datetime import datetime
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+import os
 import re
+import gzip
+import json
+import hashlib
+import heapq
+import base64
 import logging
+import numpy as np
 from rapidfuzz import fuzz, process
 
 from app.models.pils_model import PILInDB, UserInteractionBase, UserInteractionInDB
 from app.core.pils_loader import pil_loader
+from app.core.normalize import normalize_compact
+from app.core.nafdac_index import NafdacIndex
+from app.core.bm25_index import BM25Index, tokenize
+from app.core.pil_interactions import interaction_recorder
+
+# Indexed PIL fields and their BM25 term weights
+SEARCH_FIELD_WEIGHTS = {
+    'product_name': 3.0,
+    'generic_name': 2.0,
+    'composition': 1.5,
+    'indications': 1.0,
+    'description': 1.0,
+    'dosage_form': 0.5
+}
+# BM25 hits re-ranked with fuzzy name matching
+RERANK_LIMIT = 50
+# Full PILInDB models kept after a detail request
+PIL_DETAIL_CACHE_SIZE = 512
+# Leaflets rendered to JSON before serving: how many (catalogue order), "all",
+# or 0 (each is rendered on its first request)
+PIL_PRERENDER_DEFAULT = 100
+PIL_PRERENDER = os.getenv("PIL_PRERENDER", str(PIL_PRERENDER_DEFAULT))
+# Rendered leaflets kept (least recently served dropped first); also caps pre-rendering
+PIL_RENDERED_CACHE_SIZE = int(os.getenv("PIL_RENDERED_CACHE_SIZE", "4096"))
+
+# Pagination cursors: an offset into ranked results, or the last row of a listing
+_CURSOR_OFFSET = "o"
+_CURSOR_AFTER_ROW = "r"
 
 logger = logging.getLogger(__name__)
 
+
+def _prerender_limit(value: str) -> Optional[int]:
+    """PIL_PRERENDER as a row limit (None: all); an unparseable value falls back to the default"""
+    value = value.strip().lower()
+    if value == "all":
+        return None
+    try:
+        return max(0, int(value))
+    except ValueError:
+        logger.warning(f"Invalid PIL_PRERENDER={value!r}; pre-rendering {PIL_PRERENDER_DEFAULT} leaflets")
+        return PIL_PRERENDER_DEFAULT
+
+
+def _encode_cursor(kind: str, position: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([kind, position]).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: Optional[str]) -> Tuple[str, int]:
+    """(kind, position) of a cursor from _encode_cursor; no cursor means the first page"""
+    if not cursor:
+        return _CURSOR_OFFSET, 0
+    try:
+        kind, position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if kind not in (_CURSOR_OFFSET, _CURSOR_AFTER_ROW) or not isinstance(position, int) or position < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return kind, position
+
+
+class RenderedPIL(NamedTuple):
+    """A leaflet's response body, serialized once per dataset load"""
+    etag: str  # strong ETag of the JSON body; the gzip body's is etag + "-gzip"
+    body_gzip: bytes
+
+
+class _TokenFacet:
+    """Rows per word of a facet value (manufacturer, dosage form), looked up by word prefix"""
+
+    def __init__(self):
+        self._rows = defaultdict(set)
+        self._tokens = []
+        self._all = set()
+
+    def add(self, row: int, value: str):
+        self._all.add(row)
+        for token in tokenize(value):
+            self._rows[token].add(row)
+
+    def freeze(self):
+        self._tokens = sorted(self._rows)
+
+    def candidates(self, value: str) -> Set[int]:
+        """Rows having a word starting with each word of value (every row with a value if it has no words)"""
+        found = None
+        for token in tokenize(value):
+            lo = bisect_left(self._tokens, token)
+            hi = bisect_left(self._tokens, token + "\uffff", lo)
+            rows = set().union(*(self._rows[t] for t in self._tokens[lo:hi]))
+            found = rows if found is None else found & rows
+            if not found:
+                return set()
+        return found if found is not None else self._all
+
+
 class PILManager:
     def __init__(self):
-        self._pils = None
+        self._items = None  # raw PIL records; rows of every index below
+        self._summaries = []  # search/list projection per row
         self._search_index = []
         self._drug_names_index = defaultdict(list)
-        self._interactions = {}
+        self._interactions = interaction_recorder  # durable, write-behind (pil_interactions)
         self._common_misspellings = {
             'paracetmol': 'paracetamol',
             'amoxycillin': 'amoxicillin',
@@ -23,62 +126,98 @@ class PILManager:
             'vitamen': 'vitamin',
             'panadol': 'paracetamol'
         }
-        self._nafdac_index = {}  # fast lookup: nafdac_no → PIL
+        self._nafdac_index = NafdacIndex(())  # canonical nafdac_no → rows (exact, prefix, typo)
+        self._text_index = BM25Index([], SEARCH_FIELD_WEIGHTS)  # rows follow _search_index
+        self._row_by_id = {}  # PIL id → row (first listed wins)
+        self._category_rows = {}  # lowercased category → rows
+        self._manufacturer_facet = _TokenFacet()
+        self._dosage_form_facet = _TokenFacet()
+        self._featured_rows = []
+        self._rendered: "OrderedDict[int, RenderedPIL]" = OrderedDict()  # row → RenderedPIL, LRU order
+        # Full PILInDB models are built on first request only
+        self._full_pil = lru_cache(maxsize=PIL_DETAIL_CACHE_SIZE)(self._build_full_pil)
 
-    
     @property
-    def pils(self) -> List[PILInDB]:
-        """Lazy load PIL data with thread-safe initialization"""
-        if self._pils is None:
-            self._pils = pil_loader.get_all_pils()
-            if self._pils:  # Only build indexes if we have data
+    def summaries(self) -> List[Dict]:
+        """Lazy load PIL summaries and indexes (full models are built per request)"""
+        if self._items is None:
+            items, summaries = [], []
+            for item in pil_loader.get_all_items():
+                summary = pil_loader.get_summary(item)
+                if summary:
+                    items.append(item)
+                    summaries.append(summary)
+            self._summaries = summaries
+            self._items = items
+            if self._items:  # Only build indexes if we have data
                 self._build_search_indexes()
-        return self._pils or []
-
-    # pils_manager.py
+        return self._summaries
 
     def _build_search_indexes(self):
         """Build optimized search indexes for fast lookup"""
         self._search_index = []
         self._drug_names_index = defaultdict(list)
-        self._nafdac_index = {}
-
-        for pil in self._pils:
-            if not pil or not hasattr(pil, 'identifiers'):
-                continue
-
-            nafdac_no = (
-                self._normalize_text(pil.identifiers.nafdac_reg_no)
-                if pil.identifiers and pil.identifiers.nafdac_reg_no
-                else ''
-            )
-            if nafdac_no:
-                self._nafdac_index[nafdac_no] = pil   # 🔑 store for O(1) lookup
-
+        self._row_by_id = {}
+        self._category_rows = defaultdict(set)
+        self._manufacturer_facet = _TokenFacet()
+        self._dosage_form_facet = _TokenFacet()
+        self._full_pil.cache_clear()
+        self._rendered = OrderedDict()
+        documents = []
+        self._nafdac_index = NafdacIndex(
+            (summary['identifiers']['nafdac_reg_no'], row) for row, summary in enumerate(self._summaries)
+        )
+
+        for row, (item, summary) in enumerate(zip(self._items, self._summaries)):
             self._search_index.append({
-                'pil': pil,
-                'product_name': self._normalize_text(pil.product_name),
-                'generic_name': self._normalize_text(pil.generic_name),
-                'composition': self._normalize_text(pil.composition),
-                'description': self._normalize_text(pil.description),
-                'strength': self._normalize_text(pil.strength),
-                'nafdac_no': nafdac_no,
-                'manufacturer': self._normalize_text(pil.manufacturer.name) if pil.manufacturer and pil.manufacturer.name else '',
-                'dosage_form': self._normalize_text(pil.dosage_form)
+                'product_name': self._normalize_text(summary['product_name']),
+                'generic_name': self._normalize_text(summary['generic_name']),
+                'composition': self._normalize_text(item.get('composition')),
+                # Compact text of the fields the substring fallback searches
+                'full_text': ' '.join(self._normalize_text(item.get(field)) for field in (
+                    'product_name', 'generic_name', 'dosage_form', 'strength', 'description', 'composition'
+                ))
             })
-
-            if pil.product_name:
-                self._add_to_suggestion_index(pil.product_name, pil)
-            if pil.generic_name:
-                self._add_to_suggestion_index(pil.generic_name, pil)
+            self._row_by_id.setdefault(summary['id'], row)
+            documents.append(self._search_document(item))
+
+            # Facet posting lists for filters
+            self._category_rows[summary['category'].lower()].add(row)
+            if summary['manufacturer']['name']:
+                self._manufacturer_facet.add(row, summary['manufacturer']['name'])
+            if summary['dosage_form']:
+                self._dosage_form_facet.add(row, summary['dosage_form'])
+
+            if summary['product_name']:
+                self._add_to_suggestion_index(summary['product_name'], summary['id'])
+            if summary['generic_name']:
+                self._add_to_suggestion_index(summary['generic_name'], summary['id'])
+
+        self._text_index = BM25Index(documents, SEARCH_FIELD_WEIGHTS)
+        self._manufacturer_facet.freeze()
+        self._dosage_form_facet.freeze()
+        self._featured_rows = [row for row, summary in enumerate(self._summaries) if summary['featured']]
+
+    @staticmethod
+    def _search_document(item: Dict) -> Dict[str, str]:
+        """Raw text of the full-text indexed fields"""
+        therapeutic_use = ((item.get('documents') or {}).get('pil') or {}).get('therapeutic_use') or {}
+        return {
+            'product_name': item.get('product_name'),
+            'generic_name': item.get('generic_name'),
+            'composition': item.get('composition'),
+            'indications': ' '.join(map(str, therapeutic_use.get('indications') or [])),
+            'description': ' '.join(filter(None, [item.get('description'), therapeutic_use.get('description')])),
+            'dosage_form': item.get('dosage_form')
+        }
 
 
-    def _add_to_suggestion_index(self, name: str, pil: PILInDB):
+    def _add_to_suggestion_index(self, name: str, pil_id: str):
         """Normalize and add names to suggestion index"""
         try:
             normalized = self._normalize_drug_name(name)
             if normalized:
-                self._drug_names_index[normalized].append(pil.id)  # Store IDs instead of objects
+                self._drug_names_index[normalized].append(pil_id)  # Store IDs instead of objects
         except Exception as e:
             logger.warning(f"Error adding to suggestion index: {str(e)}")
 
@@ -106,35 +245,86 @@ class PILManager:
             return ''
         
         try:
-            # Remove all special characters and spaces
-            text = text.lower().strip()
-            text = re.sub(r'[^\w]', '', text)
-            
-            # Common replacements
-            replacements = {
-                "tab": "tablet",
-                "cap": "capsule",
-                "susp": "suspension",
-                # Add more as needed
-            }
-            
-            for short, long in replacements.items():
-                text = re.sub(rf"\b{short}\b", long, text)
-                
-            return text
+            return normalize_compact(text)
         except Exception as e:
             logger.warning(f"Error normalizing text: {str(e)}")
             return text.lower() if text else ''
 
+    def _build_full_pil(self, row: int) -> Optional[PILInDB]:
+        return pil_loader.get_pil(self._items[row])
+
+    def has_pil(self, pil_id: str) -> bool:
+        return bool(pil_id) and bool(self.summaries) and pil_id in self._row_by_id
+
+    def get_summary(self, pil_id: str) -> Optional[Dict]:
+        if not self.has_pil(pil_id):
+            return None
+        return self._summaries[self._row_by_id[pil_id]]
+
     def get_pil(self, pil_id: str) -> Optional[PILInDB]:
+        """Full leaflet, validated on first request and kept in a bounded cache"""
         try:
-            if not pil_id or not self.pils:
+            if not self.has_pil(pil_id):
                 return None
-            return next((pil for pil in self.pils if pil and pil.id == pil_id), None)
+            return self._full_pil(self._row_by_id[pil_id])
         except Exception as e:
             logger.error(f"Error getting PIL {pil_id}: {str(e)}")
             return None
 
+    def get_rendered_pil(self, pil_id: str) -> Optional[RenderedPIL]:
+        """Full leaflet as pre-serialized JSON with its ETag (rendered on first use if not warmed)"""
+        try:
+            if not self.has_pil(pil_id):
+                return None
+            row = self._row_by_id[pil_id]
+            rendered = self._rendered.get(row)
+            if rendered is None:
+                return self._render(row)
+            self._rendered.move_to_end(row)
+            return rendered
+        except Exception as e:
+            logger.error(f"Error rendering PIL {pil_id}: {str(e)}")
+            return None
+
+    def _render(self, row: int) -> Optional[RenderedPIL]:
+        pil = self._full_pil(row)
+        if pil is None:
+            return None
+        body = pil.json(by_alias=True).encode()  # same shape FastAPI's response_model gives
+        rendered = RenderedPIL(
+            etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+            body_gzip=gzip.compress(body, compresslevel=9, mtime=0)
+        )
+        self._rendered[row] = rendered
+        if len(self._rendered) > PIL_RENDERED_CACHE_SIZE:
+            self._rendered.popitem(last=False)
+        return rendered
+
+    def warm_rendered_pils(self, limit: Optional[int] = None) -> int:
+        """
+        Render leaflets ahead of requests (all, or the first limit, up to
+        PIL_RENDERED_CACHE_SIZE); returns how many are rendered
+        """
+        count = len(self.summaries) if limit is None else min(limit, len(self.summaries))
+        if count > PIL_RENDERED_CACHE_SIZE:
+            logger.warning(f"Pre-rendering {PIL_RENDERED_CACHE_SIZE} of {count} PILs (PIL_RENDERED_CACHE_SIZE)")
+            count = PIL_RENDERED_CACHE_SIZE
+        rows = range(count)
+        for row in rows:
+            if row not in self._rendered:
+                try:
+                    self._render(row)
+                except Exception as e:
+                    logger.warning(f"Error rendering PIL row {row}: {str(e)}")
+        logger.info(f"Pre-rendered {len(self._rendered)} PIL responses "
+                    f"({sum(len(r.body_gzip) for r in self._rendered.values()) / 1e6:.1f} MB gzipped)")
+        return len(self._rendered)
+
+    def warm_from_env(self) -> int:
+        """The startup cache-warm step, sized by PIL_PRERENDER"""
+        limit = _prerender_limit(PIL_PRERENDER)
+        return self.warm_rendered_pils(limit) if limit != 0 else 0
+
     def search_pils(
         self,
         search: Optional[str] = None,
@@ -142,126 +332,181 @@ class PILManager:
         manufacturer: Optional[str] = None,
         dosage_form: Optional[str] = None,
         nafdac_no: Optional[str] = None,
-        limit: int = 10
-    ) -> Dict[str, List]:
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        full_text: bool = False
+    ) -> Dict[str, Any]:
         """
-        Powerful search:
-        - Direct O(1) lookup by NAFDAC number (highest priority)
-        - Otherwise, fuzzy matching on names, generic, description, etc.
+        Powerful search, returning PIL summaries one page at a time:
+        - Direct lookup by NAFDAC number (highest priority); a partial number
+          returns the PILs it prefixes, a mistyped one suggests the nearest numbers
+        - Otherwise, fuzzy matching on names, generic, composition (score >= 70).
+          With full_text, full-text matches below that score (e.g. on
+          description or indications) follow them.
+        Pass the returned next_cursor back as cursor for the following page.
+        Raises ValueError for a malformed cursor.
         """
+        kind, position = _decode_cursor(cursor)
         try:
-            if not self.pils:  
-                return {'results': [], 'suggestions': []}
+            if not self.summaries:
+                return {'results': [], 'suggestions': [], 'next_cursor': None}
 
+            suggestions = []
             # 🔍 1. Direct lookup by NAFDAC number
             if nafdac_no:
-                normalized_no = self._normalize_text(nafdac_no)
-                pil = self._nafdac_index.get(normalized_no)
-                if pil:
-                    return {'results': [pil], 'suggestions': []}
+                exact = self._nafdac_index.exact(nafdac_no)
+                if exact:
+                    rows = exact[-1:]  # last listed wins
                 else:
-                    return {'results': [], 'suggestions': []}  # no fuzzy here
-
-            # 🔍 2. Apply filters first
-            filtered_pils = self._apply_filters(category, manufacturer, dosage_form)
-
-            # 🔍 3. Fuzzy search if search term is provided
-            results, suggestions = [], []
+                    rows = [
+                        row
+                        for key in self._nafdac_index.prefix(nafdac_no, limit=position + limit + 1)
+                        for row in self._nafdac_index.values(key)
+                    ]
+                    suggestions = [] if rows else [
+                        self._summaries[self._nafdac_index.values(key)[-1]]['identifiers']['nafdac_reg_no']
+                        for key, _ in self._nafdac_index.fuzzy(nafdac_no, max_distance=2, limit=3)
+                    ]
+                return self._page(rows, position, limit, suggestions)
+
+            # 🔍 2. Apply filters first (None = no filter)
+            filtered_rows = self._filter_rows(category, manufacturer, dosage_form)
+
+            # 🔍 3. Fuzzy search if search term is provided (ranked: offset cursor)
             if search:
                 search_normalized = self._normalize_drug_name(search)
-                results, suggestions = self._fuzzy_search(search_normalized, filtered_pils, min_score=70)
-            else:
-                results = filtered_pils
+                rows, suggestions = self._fuzzy_search(
+                    search_normalized, filtered_rows, min_score=70, depth=position + limit + 1,
+                    full_text=full_text
+                )
+                return self._page(rows, position, limit, suggestions if not position else [])
 
+            # 🔍 4. Plain listing in catalogue order (keyset cursor: rows after the last one)
+            after = position if kind == _CURSOR_AFTER_ROW else -1
+            if filtered_rows is None:
+                rows = list(range(after + 1, min(after + limit + 2, len(self._summaries))))
+            else:
+                rows = heapq.nsmallest(limit + 1, (row for row in filtered_rows if row > after))
+            next_cursor = _encode_cursor(_CURSOR_AFTER_ROW, rows[limit - 1]) if len(rows) > limit else None
             return {
-                'results': results[:limit] if results else [],
-                'suggestions': suggestions[:3] if suggestions else []
+                'results': [self._summaries[row] for row in rows[:limit]],
+                'suggestions': [],
+                'next_cursor': next_cursor
             }
         except Exception as e:
             logger.error(f"Search error: {str(e)}", exc_info=True)
-            return {'results': [], 'suggestions': []}
-
+            return {'results': [], 'suggestions': [], 'next_cursor': None}
+
+    def _page(self, rows: List[int], offset: int, limit: int, suggestions: List[str]) -> Dict[str, Any]:
+        """One page of ranked rows, starting at offset"""
+        page = rows[offset:offset + limit]
+        more = len(rows) > offset + limit
+        return {
+            'results': [self._summaries[row] for row in page],
+            'suggestions': suggestions[:3] if suggestions else [],
+            'next_cursor': _encode_cursor(_CURSOR_OFFSET, offset + limit) if more else None
+        }
 
-    def _apply_filters(
-        self, 
-        category: Optional[str], 
+    def _filter_rows(
+        self,
+        category: Optional[str],
         manufacturer: Optional[str],
         dosage_form: Optional[str]
-    ) -> List[PILInDB]:
-        """Apply filters with null checks"""
-        if not self.pils:
-            return []
-
-        filtered = [pil for pil in self.pils if pil]  # Remove None values
-        
+    ) -> Optional[Set[int]]:
+        """
+        Rows passing every given filter, as an intersection of facet posting
+        lists; None when no filter is given. Manufacturer and dosage form
+        still mean "contains the filter text", checked on the indexed rows.
+        """
+        facets = []
         if category:
-            category_lower = category.lower()
-            filtered = [pil for pil in filtered 
-                       if pil.category and pil.category.lower() == category_lower]
-        
+            facets.append(self._category_rows.get(category.lower(), set()))
         if manufacturer:
             manuf_lower = manufacturer.lower()
-            filtered = [pil for pil in filtered 
-                       if pil.manufacturer and 
-                          pil.manufacturer.name and 
-                          manuf_lower in pil.manufacturer.name.lower()]
-        
+            facets.append({
+                row for row in self._manufacturer_facet.candidates(manufacturer)
+                if manuf_lower in self._summaries[row]['manufacturer']['name'].lower()
+            })
         if dosage_form:
             dosage_lower = dosage_form.lower()
-            filtered = [pil for pil in filtered 
-                       if pil.dosage_form and 
-                          dosage_lower in pil.dosage_form.lower()]
-        
-        return filtered
+            facets.append({
+                row for row in self._dosage_form_facet.candidates(dosage_form)
+                if dosage_lower in self._summaries[row]['dosage_form'].lower()
+            })
+
+        if not facets:
+            return None
+        facets.sort(key=len)
+        return facets[0].intersection(*facets[1:])
 
-    def _fuzzy_search(self, search_term: str, pils: List[PILInDB], min_score: int) -> Tuple[List[PILInDB], List[str]]:
+    def _fuzzy_search(self, search_term: str, rows: Optional[Set[int]], min_score: int,
+                      depth: int = RERANK_LIMIT, full_text: bool = False) -> Tuple[List[int], List[str]]:
+        """
+        BM25 over the inverted index picks rows containing every search word
+        (word prefixes count), then only the top RERANK_LIMIT are fuzzy-scored
+        against names. Only fuzzy matches >= min_score are returned, by fuzzy
+        score; if there are none, rows whose compact field text contains the
+        compact term (the original substring search) are scored instead.
+        With full_text, the remaining full-text matches (e.g. on indications)
+        follow by BM25 score, then rows past RERANK_LIMIT (up to depth) in
+        BM25 order, so pages keep the same order however deep the caller reads.
+        """
         if not search_term or not self._search_index:
             return [], []
 
-        keywords = self._normalize_text(search_term).split()
-        scored_pils = []
-        pil_ids = {pil.id for pil in pils if pil}
-
-        for item in self._search_index:
-            pil = item.get('pil')
-            if not pil or pil.id not in pil_ids:
-                continue
-
-            try:
-                fields = [
-                    item['product_name'],
-                    item['generic_name'],
-                    item.get('dosage_form', ''),
-                    item.get('strength', ''),
-                    item.get('description', ''),
-                    item.get('composition', ''),
-                ]
-                full_text = ' '.join(fields)
-
-                if all(kw in full_text for kw in keywords):
-                    fuzzy_score = max([
-                        fuzz.token_sort_ratio(search_term, item['product_name']),
-                        fuzz.token_sort_ratio(search_term, item['generic_name']),
-                        fuzz.token_sort_ratio(search_term, item.get('composition', '')),
-                    ])
-                    if search_term == item['product_name']:
-                        fuzzy_score += 10
+        allowed_rows = None
+        if rows is not None:
+            allowed_rows = np.fromiter(sorted(rows), dtype=np.int32, count=len(rows))
+
+        limit = max(depth, RERANK_LIMIT) if full_text else RERANK_LIMIT
+        hits = [row for row, _ in self._text_index.search(search_term, allowed_rows, limit=limit)]
+        fuzzy_hits, text_hits = [], []
+        for row in hits[:RERANK_LIMIT]:
+            fuzzy_score = self._name_score(search_term, row)
+            if fuzzy_score >= min_score:
+                fuzzy_hits.append((fuzzy_score, row))
+            else:
+                text_hits.append(row)
+
+        if not fuzzy_hits:
+            # Substring fallback: the compact term inside the compact field text
+            # (e.g. part of a word, or a name typed without spaces)
+            compact_term = self._normalize_text(search_term)
+            for row in (range(len(self._search_index)) if rows is None else sorted(rows)):
+                if compact_term and compact_term in self._search_index[row]['full_text']:
+                    fuzzy_score = self._name_score(search_term, row)
                     if fuzzy_score >= min_score:
-                        scored_pils.append((fuzzy_score, pil))
-
-            except Exception as e:
-                logger.warning(f"Error in fuzzy search for '{search_term}': {str(e)}")
+                        fuzzy_hits.append((fuzzy_score, row))
 
-        scored_pils.sort(key=lambda x: x[0], reverse=True)
-        results = [pil for score, pil in scored_pils]
+        fuzzy_hits.sort(key=lambda x: x[0], reverse=True)  # stable: BM25 order breaks ties
+        results = [row for score, row in fuzzy_hits]
+        if full_text:
+            ranked = set(results)
+            results += [row for row in text_hits + hits[RERANK_LIMIT:] if row not in ranked]
 
         suggestions = []
-        if not results or (scored_pils and scored_pils[0][0] < 75):
+        if not fuzzy_hits or fuzzy_hits[0][0] < 75:
             suggestions = self._get_search_suggestions(search_term)
 
         return results, suggestions
 
 
+    def _name_score(self, search_term: str, row: int) -> int:
+        """Fuzzy score of the search term against a row's names and composition (+10 for the exact name)"""
+        item = self._search_index[row]
+        try:
+            fuzzy_score = max([
+                fuzz.token_sort_ratio(search_term, item['product_name']),
+                fuzz.token_sort_ratio(search_term, item['generic_name']),
+                fuzz.token_sort_ratio(search_term, item.get('composition', '')),
+            ])
+            if search_term == item['product_name']:
+                fuzzy_score += 10
+            return fuzzy_score
+        except Exception as e:
+            logger.warning(f"Error in fuzzy search for '{search_term}': {str(e)}")
+            return 0
+
     def _get_search_suggestions(self, search_term: str) -> List[str]:
         """Generate spelling/correction suggestions using fuzzy matching"""
         if not search_term or not self._drug_names_index:
@@ -292,13 +537,13 @@ class PILManager:
             return []
 
 
-    def get_featured_pils(self, limit: int = 5) -> List[PILInDB]:
-        """Get featured PILs with caching"""
+    def get_featured_pils(self, limit: int = 5) -> List[Dict]:
+        """Summaries of featured PILs, newest first"""
         try:
             # In production, this could use a pre-computed featured list
             return sorted(
-                [pil for pil in self.pils if pil and pil.featured],
-                key=lambda x: x.created_at if x.created_at else datetime.min,
+                [self._summaries[row] for row in self._featured_rows] if self.summaries else [],
+                key=lambda x: x.get('created_at') or datetime.min,
                 reverse=True
             )[:limit]
         except Exception as e:
@@ -307,28 +552,9 @@ class PILManager:
 
     # In pils_manager.py
     def record_interaction(self, interaction: UserInteractionBase) -> UserInteractionInDB:
-        """Record user interaction with a PIL"""
+        """Record user interaction with a PIL (adds view_count; saved stays set once set)"""
         try:
-            key = f"{interaction.user_id}_{interaction.pil_id}"
-            
-            if key in self._interactions:
-                # Update existing
-                existing = self._interactions[key]
-                existing.view_count += interaction.view_count
-                existing.last_viewed = interaction.last_viewed or datetime.now()
-                existing.saved = interaction.saved or existing.saved
-                existing.updated_at = datetime.now()
-                return existing
-            else:
-                # Create new
-                interaction_data = interaction.dict()
-                interaction_data['last_viewed'] = interaction_data.get('last_viewed') or datetime.now()
-                new_interaction = UserInteractionInDB(
-                    id=key,
-                    **interaction_data
-                )
-                self._interactions[key] = new_interaction
-                return new_interaction
+            return self._interactions.record(interaction)
         except Exception as e:
             logger.error(f"Error recording interaction: {str(e)}")
             raise
@@ -339,27 +565,20 @@ class PILManager:
         saved: Optional[bool] = None,
         limit: int = 10
     ) -> List[UserInteractionInDB]:
-        """Get user's interactions with optional saved filter"""
+        """Get user's interactions with optional saved filter, most recently viewed first"""
         try:
-            interactions = [i for i in self._interactions.values() 
-                          if i.user_id == user_id]
-            
-            if saved is not None:
-                interactions = [i for i in interactions if i.saved == saved]
-            
-            return sorted(
-                interactions,
-                key=lambda x: x.last_viewed,
-                reverse=True
-            )[:limit]
+            return self._interactions.list_for_user(user_id, saved=saved, limit=limit)
         except Exception as e:
             logger.error(f"Error getting user interactions: {str(e)}")
             return []
 
     def get_user_interaction(self, user_id: str, pil_id: str) -> Optional[UserInteractionInDB]:
         """Get a specific user interaction"""
-        key = f"{user_id}_{pil_id}"
-        return self._interactions.get(key)
+        try:
+            return self._interactions.get(user_id, pil_id)
+        except Exception as e:
+            logger.error(f"Error getting user interaction: {str(e)}")
+            return None
 
 # Initialize the manager
 pil_manager = PILManager()
\ No newline at end of file
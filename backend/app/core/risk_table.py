@@ -0,0 +1,134 @@
+import csv
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.core.phrase_matcher import normalize_phrase
+
+# Weight given to MeSH terms that keyword_risk_map.csv does not list
+DEFAULT_RISK_WEIGHT = 30
+MAX_RISK = 100
+
+# Context multipliers: symptoms lasting weeks/months, and severe/acute ones
+LONG_DURATION_UNITS = ("week", "month")
+LONG_DURATION_MULTIPLIER = 1.5
+SEVERE_TERMS = ("severe", "acute")
+SEVERE_MULTIPLIER = 1.8
+
+
+class RiskRecord(NamedTuple):
+    keyword: str
+    risk_weight: int
+    common_drugs: Tuple[str, ...]
+    listed: bool  # in keyword_risk_map.csv (False: MeSH term with the default weight)
+
+
+class RiskTable:
+    """
+    Symptom risk map compiled once at load: records in a tuple, a read-only
+    keyword -> row mapping (keywords compared in normalize_phrase form) and
+    the weights as a NumPy array, so lookups are O(1) and context
+    multipliers apply to all matched rows at once.
+    """
+
+    def __init__(self, records: Iterable[RiskRecord]):
+        rows: Dict[str, int] = {}
+        kept: List[RiskRecord] = []
+        for record in records:
+            key = normalize_phrase(record.keyword)
+            if key and key not in rows:  # first definition wins
+                rows[key] = len(kept)
+                kept.append(record)
+
+        self.records: Tuple[RiskRecord, ...] = tuple(kept)
+        self._rows = MappingProxyType(rows)
+        self.keys: Tuple[str, ...] = tuple(rows)
+        self.listed: Tuple[str, ...] = tuple(record.keyword for record in kept if record.listed)
+        self.weights = np.array([record.risk_weight for record in kept], dtype=np.int32)
+        self.weights.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, keyword: str) -> bool:
+        return normalize_phrase(keyword) in self._rows
+
+    def row(self, keyword: str) -> Optional[int]:
+        return self._rows.get(normalize_phrase(keyword))
+
+    def get(self, keyword: str) -> Optional[RiskRecord]:
+        row = self.row(keyword)
+        return self.records[row] if row is not None else None
+
+    def rows(self, keywords: Iterable[str]) -> np.ndarray:
+        """Rows of the known keywords, in input order (unknown ones are skipped)"""
+        found = [row for row in map(self.row, keywords) if row is not None]
+        return np.array(found, dtype=np.intp)
+
+
+def is_long_duration(duration: Optional[str]) -> bool:
+    return bool(duration) and any(unit in duration for unit in LONG_DURATION_UNITS)
+
+
+def is_severe(severity: Optional[str]) -> bool:
+    return severity in SEVERE_TERMS
+
+
+def contextual_weights(weights: np.ndarray, long_duration: Union[bool, Sequence[bool]],
+                       severe: Union[bool, Sequence[bool]], truncate: bool = True) -> np.ndarray:
+    """
+    Risk weights after context multipliers (each truncated to an integer,
+    unless truncate is False: then floats such as 67.5), capped at MAX_RISK.
+    The flags are scalars or one per weight.
+    """
+    rounding = np.trunc if truncate else (lambda value: value)
+    weights = np.asarray(weights, dtype=np.float64)
+    weights = np.where(long_duration, rounding(weights * LONG_DURATION_MULTIPLIER), weights)
+    weights = np.where(severe, rounding(weights * SEVERE_MULTIPLIER), weights)
+    weights = np.minimum(weights, MAX_RISK)
+    return weights.astype(np.int32) if truncate else weights
+
+
+def _split_list(value: Optional[str]) -> Tuple[str, ...]:
+    return tuple(item.strip() for item in (value or "").split(",") if item.strip())
+
+
+def _read_rows(path: Path) -> List[Dict[str, str]]:
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def read_mesh_synonyms(mesh_path: Path) -> Dict[str, List[str]]:
+    """MeSH standard term -> local synonyms, in file order (terms without synonyms omitted)"""
+    synonym_map: Dict[str, List[str]] = {}
+    for row in _read_rows(mesh_path):
+        term = (row.get("standard_term") or "").strip()
+        synonyms = list(_split_list(row.get("local_synonyms")))
+        if term and synonyms:
+            synonym_map.setdefault(term, []).extend(synonyms)
+    return synonym_map
+
+
+def load_risk_table(risk_path: Path, mesh_path: Optional[Path] = None) -> RiskTable:
+    """
+    keyword_risk_map.csv rows (file order), then every MeSH standard term
+    it does not list, at DEFAULT_RISK_WEIGHT.
+    """
+    records = [
+        RiskRecord(
+            keyword=(row.get("symptom_keyword") or "").strip(),
+            risk_weight=int(float(row.get("risk_weight") or 0)),
+            common_drugs=_split_list(row.get("common_drugs")),
+            listed=True
+        )
+        for row in _read_rows(risk_path)
+    ]
+    if mesh_path is not None and mesh_path.exists():
+        records.extend(
+            RiskRecord(keyword=term, risk_weight=DEFAULT_RISK_WEIGHT, common_drugs=(), listed=False)
+            for term in ((row.get("standard_term") or "").strip() for row in _read_rows(mesh_path))
+            if term
+        )
+    return RiskTable(records)
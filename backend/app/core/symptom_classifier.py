@@ -0,0 +1,202 @@
+import os
+import zlib
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.phrase_matcher import normalize_phrase
+
+logger = logging.getLogger(__name__)
+
+# Fallback for calculate_risk when no symptom phrase matched: scores the input
+# against every risk-map label (and its MeSH synonyms) with hashed character
+# n-gram TF-IDF vectors, precomputed per label phrase. Replaces a transformers
+# zero-shot pipeline; a query is a few sparse lookups, well under 10 ms.
+
+# Bump whenever features or the file layout change so stale files are rebuilt
+CLASSIFIER_FORMAT = 1
+
+DEFAULT_CLASSIFIER_PATH = Path(__file__).parent.parent / "data" / "symptom_classifier.npz"
+CLASSIFIER_PATH = Path(os.getenv("SYMPTOM_CLASSIFIER_PATH", DEFAULT_CLASSIFIER_PATH))
+# Share of a label's (squared, normalized) weight the input must cover to count as a hit
+CLASSIFIER_MIN_SCORE = float(os.getenv("SYMPTOM_CLASSIFIER_MIN_SCORE", 0.5))
+
+N_FEATURES = 1 << 20
+CHAR_NGRAMS = (3, 4, 5)
+
+
+def _hash(feature: str) -> int:
+    # crc32, not hash(): feature ids must be stable across processes and runs
+    return zlib.crc32(feature.encode("utf-8")) % N_FEATURES
+
+
+def extract_features(text: str) -> Dict[int, int]:
+    """Hashed feature id -> count: whole words plus character n-grams of each space-padded word"""
+    counts: Dict[int, int] = {}
+    for word in normalize_phrase(text).split():
+        grams = [f"w:{word}"]
+        padded = f" {word} "
+        for n in CHAR_NGRAMS:
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        for gram in grams:
+            feature = _hash(gram)
+            counts[feature] = counts.get(feature, 0) + 1
+    return counts
+
+
+def sources_sha256(paths: Iterable[Path]) -> str:
+    """Digest of the source files a classifier was built from"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class SymptomClassifier:
+    """
+    Label phrases as TF-IDF vectors over hashed features, kept as an
+    inverted index: feature -> (phrase row, squared weight). A label scores
+    the share of its best phrase's vector that the input covers, so 1.0
+    means every n-gram of the phrase occurs in the input.
+    """
+
+    def __init__(self, labels: Sequence[str], label_starts: np.ndarray, features: np.ndarray,
+                 indptr: np.ndarray, rows: np.ndarray, weights: np.ndarray, source_sha256: str = ""):
+        self.labels: Tuple[str, ...] = tuple(labels)
+        self.label_starts = label_starts  # phrase rows of label i: label_starts[i]:label_starts[i + 1]
+        self.features = features  # sorted feature ids
+        self.indptr = indptr  # postings of features[i] are rows/weights[indptr[i]:indptr[i + 1]]
+        self.rows = rows
+        self.weights = weights
+        self.source_sha256 = source_sha256
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @classmethod
+    def build(cls, label_phrases: Dict[str, List[str]], source_sha256: str = "") -> "SymptomClassifier":
+        """label -> phrases naming it (the label itself included by the caller)"""
+        labels, label_starts, vectors = [], [0], []
+        for label, phrases in label_phrases.items():
+            phrase_features = [extract_features(phrase) for phrase in dict.fromkeys(phrases)]
+            phrase_features = [features for features in phrase_features if features]
+            if not phrase_features:
+                continue
+            labels.append(label)
+            vectors.extend(phrase_features)
+            label_starts.append(len(vectors))
+
+        # Smoothed IDF over phrases: n-grams shared by many labels ("pai", "ing") weigh little
+        document_frequency: Dict[int, int] = {}
+        for features in vectors:
+            for feature in features:
+                document_frequency[feature] = document_frequency.get(feature, 0) + 1
+        n = len(vectors)
+
+        postings: Dict[int, List[Tuple[int, float]]] = {}
+        for row, features in enumerate(vectors):
+            tfidf = {
+                feature: (1 + np.log(count)) * (np.log((1 + n) / (1 + document_frequency[feature])) + 1)
+                for feature, count in features.items()
+            }
+            norm = sum(value * value for value in tfidf.values())
+            for feature, value in tfidf.items():
+                postings.setdefault(feature, []).append((row, value * value / norm))
+
+        features = np.array(sorted(postings), dtype=np.int64)
+        indptr = np.zeros(len(features) + 1, dtype=np.int64)
+        rows, weights = [], []
+        for i, feature in enumerate(features):
+            entries = postings[int(feature)]
+            indptr[i + 1] = indptr[i] + len(entries)
+            rows.extend(row for row, _ in entries)
+            weights.extend(weight for _, weight in entries)
+
+        return cls(
+            labels=labels,
+            label_starts=np.array(label_starts, dtype=np.int64),
+            features=features,
+            indptr=indptr,
+            rows=np.array(rows, dtype=np.int32),
+            weights=np.array(weights, dtype=np.float16),  # quantized: scores only need ~3 digits
+            source_sha256=source_sha256
+        )
+
+    def scores(self, text: str) -> np.ndarray:
+        """Score of every label for text, in self.labels order"""
+        if not self.labels:
+            return np.zeros(0, dtype=np.float32)
+        query = np.fromiter(extract_features(text), dtype=np.int64)
+        positions = np.searchsorted(self.features, query)
+        found = positions < len(self.features)
+        found[found] = self.features[positions[found]] == query[found]
+        positions = positions[found]
+        if not len(positions):
+            return np.zeros(len(self.labels), dtype=np.float32)
+
+        # Concatenated posting ranges of the matched features, without a Python loop
+        starts = self.indptr[positions]
+        lengths = self.indptr[positions + 1] - starts
+        take = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        row_scores = np.bincount(self.rows[take], weights=self.weights[take].astype(np.float32),
+                                 minlength=int(self.label_starts[-1]))
+        return np.maximum.reduceat(row_scores, self.label_starts[:-1]).astype(np.float32)
+
+    def classify(self, text: str, top_k: int = 1) -> List[Tuple[str, float]]:
+        """(label, score) of the top_k labels, best first"""
+        scores = self.scores(text)
+        if not len(scores):
+            return []
+        top = np.argsort(-scores, kind="stable")[:top_k]
+        return [(self.labels[i], float(scores[i])) for i in top]
+
+    def predict(self, text: str, min_score: float = CLASSIFIER_MIN_SCORE) -> Optional[str]:
+        """Best label if its score reaches min_score"""
+        best = self.classify(text)
+        return best[0][0] if best and best[0][1] >= min_score else None
+
+    def save(self, path: Path = CLASSIFIER_PATH) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                format=np.array(CLASSIFIER_FORMAT),
+                source_sha256=np.array(self.source_sha256),
+                labels=np.array(self.labels, dtype=str),
+                label_starts=self.label_starts,
+                features=self.features,
+                indptr=self.indptr,
+                rows=self.rows,
+                weights=self.weights
+            )
+        os.replace(tmp_path, path)  # atomic: readers never see a partial file
+
+    @classmethod
+    def load(cls, path: Path = CLASSIFIER_PATH, source_sha256: Optional[str] = None) -> Optional["SymptomClassifier"]:
+        """The saved classifier, or None if missing, unreadable, of another format or built from other sources"""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["format"]) != CLASSIFIER_FORMAT:
+                    return None
+                if source_sha256 is not None and str(data["source_sha256"]) != source_sha256:
+                    return None
+                return cls(
+                    labels=data["labels"].tolist(),
+                    label_starts=data["label_starts"],
+                    features=data["features"],
+                    indptr=data["indptr"],
+                    rows=data["rows"],
+                    weights=data["weights"],
+                    source_sha256=str(data["source_sha256"])
+                )
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Unreadable symptom classifier {path}: {e}")
+            return None
@@ -1,49 +1,44 @@
-import pandas as pd
 from rapidfuzz import fuzz, process
-from pathlib import Path
-import spacy
-from negspacy.negation import Negex
-from transformers import pipeline
 import re
 from functools import lru_cache
-from .ml import load_reverse_synonyms, load_mesh_synonyms
-from typing import List, Dict, Optional, Any, Tuple, Set, DefaultDict
+from .ml import load_reverse_synonyms, load_mesh_synonyms, load_symptom_matcher, risk_table
+from .phrase_matcher import normalize_phrase
+from .risk_table import contextual_weights, is_long_duration, is_severe
+from .nlp import get_symptom_doc, pipe as nlp_pipe
+from typing import List, Dict, Optional, Any, Tuple, Set, DefaultDict, Sequence
 from collections import defaultdict
 
-# Initialize NLP pipeline with negation detection
-nlp = spacy.load("en_core_web_sm")
-nlp.add_pipe("negex")
+# --- Risk Data ---
+# The risk table compiled by ml.load_risk_data; symptom_list is keyword_risk_map.csv's keywords in file order
+symptom_list = list(risk_table.listed)
+symptom_keywords = frozenset(symptom_list)
 
-# Lazy-loaded zero-shot model
-_zero_shot_model: Optional[Any] = None
 
-
-# --- Cached Data Loading ---
 @lru_cache(maxsize=1)
-def load_symptom_data() -> Tuple[pd.DataFrame, List[str]]:
-    DATA_PATH = Path(__file__).parent.parent / "data" / "keyword_risk_map.csv"
-    df = pd.read_csv(DATA_PATH)
-
-    # Properly parse the common_drugs column
-    df['common_drugs'] = df['common_drugs'].apply(
-        lambda x: [drug.strip() for drug in x.split(",")] if pd.notna(x) and isinstance(x, str) else []
-    )
-
-    return df, df['symptom_keyword'].tolist()
+def load_symptom_priorities() -> Dict[str, List[Tuple[int, int, str]]]:
+    """
+    Normalized phrase -> (source, rank, symptom) candidates, sorting in the
+    order match_symptom tries them: risk-map keywords in file order, then
+    MeSH synonyms.
+    """
+    priorities: DefaultDict[str, List[Tuple[int, int, str]]] = defaultdict(list)
+    for rank, term in enumerate(symptom_list):
+        priorities[normalize_phrase(term)].append((0, rank, term))
+    for rank, (syn, term) in enumerate(load_reverse_synonyms().items()):
+        priorities[normalize_phrase(syn)].append((1, rank, term))
+    return dict(priorities)
 
 
-df_symptoms, symptom_list = load_symptom_data()
+# --- Cached NLP Processing ---
+# Shared pipeline without POS tagging: only entities, negation and the parse are read here
+get_doc = get_symptom_doc
 
 
-# --- Cached NLP Processing ---
-@lru_cache(maxsize=1000)
-def get_doc(text: str) -> Any:
-    return nlp(text.lower())
+def is_negated(doc: Any) -> bool:
+    return any(e._.negex for e in doc.ents)
 
 
-@lru_cache(maxsize=1000)
-def extract_duration(text: str) -> Optional[str]:
-    doc = get_doc(text)
+def duration_from_doc(doc: Any) -> Optional[str]:
     for token in doc:
         if token.text in ["for", "since", "over"] and token.i + 2 < len(doc):
             phrase = f"{token.text} {doc[token.i + 1].text} {doc[token.i + 2].text}"
@@ -52,62 +47,64 @@ def extract_duration(text: str) -> Optional[str]:
     return None
 
 
-@lru_cache(maxsize=1000)
-def detect_severity(text: str) -> Optional[str]:
-    doc = get_doc(text)
+def severity_from_doc(doc: Any) -> Optional[str]:
     severity_terms = ["severe", "acute", "chronic", "intense", "mild", "moderate"]
     for term in severity_terms:
-        if term in text.lower():
+        if term in doc.text:  # Docs are parsed from lowercased text
             for token in doc:
-                if token.text == term and token.head.text in symptom_list:
+                if token.text == term and token.head.text in symptom_keywords:
                     return term
     return None
 
 
-def get_symptom_data(symptom: str, user_input: str) -> Optional[Dict[str, Any]]:
-    try:
-        # Convert to lowercase to ensure case-insensitive matching
-        symptom_lower = symptom.lower()
-        matches = df_symptoms[df_symptoms['symptom_keyword'].str.lower() == symptom_lower]
+@lru_cache(maxsize=1000)
+def extract_duration(text: str) -> Optional[str]:
+    return duration_from_doc(get_doc(text))
 
-        if len(matches) == 0:
+
+@lru_cache(maxsize=1000)
+def detect_severity(text: str) -> Optional[str]:
+    return severity_from_doc(get_doc(text))
+
+
+def get_symptom_data(symptom: str, user_input: str, doc: Optional[Any] = None) -> Optional[Dict[str, Any]]:
+    try:
+        record = risk_table.get(symptom)  # case-insensitive, O(1)
+        if record is None or not record.listed:
             print(f"Warning: No matching symptom found for: {symptom}")  # Debug print
             return None
 
-        row = matches.iloc[0]
+        if doc is None:
+            doc = get_doc(user_input)
         return {
-            **row.to_dict(),
-            "duration": extract_duration(user_input),
-            "severity": detect_severity(user_input)
+            "symptom_keyword": record.keyword,
+            "risk_weight": record.risk_weight,
+            "common_drugs": list(record.common_drugs),
+            "duration": duration_from_doc(doc),
+            "severity": severity_from_doc(doc)
         }
     except Exception as e:
         print(f"Error getting symptom data for {symptom}: {str(e)}")  # Debug print
         return None
 
 
-@lru_cache(maxsize=1000)
-def match_symptom(user_input: str, threshold: int = 50) -> Optional[Dict[str, Any]]:
+def match_symptom_doc(user_input: str, doc: Any, threshold: int = 50) -> Optional[Dict[str, Any]]:
+    """match_symptom on an already parsed Doc of user_input"""
     try:
-        doc = get_doc(user_input)
-        if any(e._.negex for e in doc.ents):
+        if is_negated(doc):
             return None
 
-        input_lower = user_input.lower()
-        reverse_synonyms = load_reverse_synonyms()
-
-        # 1. Check direct matches and synonyms first
-        for term in symptom_list:
-            if term.lower() in input_lower:
-                result = get_symptom_data(term, user_input)
-                if result:  # Only return if valid data was found
-                    return result
-
-        # Check reverse synonym mapping
-        for syn, term in reverse_synonyms.items():
-            if syn.lower() in input_lower:
-                result = get_symptom_data(term, user_input)
-                if result:
-                    return result
+        # 1. Direct keyword and synonym hits (whole words), found in one pass
+        priorities = load_symptom_priorities()
+        candidates = sorted(
+            candidate
+            for phrase in load_symptom_matcher().phrases(user_input)
+            for candidate in priorities.get(phrase, ())
+        )
+        for _, _, term in candidates:
+            result = get_symptom_data(term, user_input, doc)
+            if result:  # Only return if valid data was found
+                return result
 
         # 2. Try fuzzy matching
         def scorer(s1: str, s2: str, **kwargs: Any) -> float:
@@ -121,41 +118,34 @@ def match_symptom(user_input: str, threshold: int = 50) -> Optional[Dict[str, An
         )
 
         if match and match[1] >= threshold:
-            result = get_symptom_data(match[0], user_input)
-        if result:
-            return result
+            return get_symptom_data(match[0], user_input, doc)
 
         return None
     except Exception as e:
         print(f"Error matching symptom: {str(e)}")  # Debug print
         return None
 
+
+@lru_cache(maxsize=1000)
+def match_symptom(user_input: str, threshold: int = 50) -> Optional[Dict[str, Any]]:
+    return match_symptom_doc(user_input, get_doc(user_input), threshold)
+
+
 # --- Diagnosis Function ---
-def diagnose(symptoms: List[str]) -> Dict[str, Any]:
+def _diagnosis(symptoms: Sequence[str], docs: Dict[str, Any],
+               matches: Dict[str, Optional[Dict[str, Any]]]) -> Dict[str, Any]:
     matched: List[Dict[str, Any]] = []
-    max_risk = 0
     negated: List[str] = []
 
     for symptom in symptoms:
-        res = match_symptom(symptom)
-        if not res:
+        res = matches[symptom]
+        if not res:  # including every negated input (see match_symptom_doc)
             continue
 
-        doc = get_doc(symptom)
-        if any(e._.negex for e in doc.ents):
+        if is_negated(docs[symptom]):
             negated.append(symptom)
             continue
 
-        risk = int(res['risk_weight'])
-        duration = res.get("duration", "")
-        severity = res.get("severity", "")
-
-        if duration and ("week" in duration or "month" in duration):
-            risk *= 1.5
-        if severity in ["severe", "acute"]:
-            risk *= 1.8
-        risk = min(risk, 100)
-
         clean_drugs: List[str] = [d.strip() for d in res['common_drugs']] if res['common_drugs'] and isinstance(
             res['common_drugs'], list) else []
         clean_drugs = [d for d in clean_drugs if len(d) > 1]
@@ -163,12 +153,22 @@ def diagnose(symptoms: List[str]) -> Dict[str, Any]:
         matched.append({
             "input": symptom,
             "matched_symptom": res['symptom_keyword'],
-            "risk_weight": risk,
+            "risk_weight": int(res['risk_weight']),
             "common_drugs": clean_drugs,
-            "duration": duration,
-            "severity": severity
+            "duration": res.get("duration", ""),
+            "severity": res.get("severity", "")
         })
-        max_risk = max(max_risk, risk)
+
+    # Context multipliers for every matched symptom at once, untruncated (e.g. 67.5)
+    risks = contextual_weights(
+        [m["risk_weight"] for m in matched],
+        long_duration=[is_long_duration(m["duration"]) for m in matched],
+        severe=[is_severe(m["severity"]) for m in matched],
+        truncate=False
+    ).tolist()
+    for m, risk in zip(matched, risks):
+        m["risk_weight"] = int(risk) if risk.is_integer() else risk
+    max_risk = max((m["risk_weight"] for m in matched), default=0)
 
     risk_level = "High" if max_risk >= 80 else "Moderate" if max_risk >= 50 else "Low"
 
@@ -182,4 +182,20 @@ def diagnose(symptoms: List[str]) -> Dict[str, Any]:
         ),
         "matched_symptoms": matched,
         "negated_symptoms": negated
-    }
\ No newline at end of file
+    }
+
+
+def diagnose_batch(inputs: Sequence[Sequence[str]], threshold: int = 50) -> List[Dict[str, Any]]:
+    """
+    diagnose() for many inputs at once (e.g. several users' symptom lists).
+    Every distinct symptom string is parsed in one nlp.pipe call, and its
+    Doc is reused for negation, matching, duration and severity.
+    """
+    texts = list(dict.fromkeys(symptom for symptoms in inputs for symptom in symptoms))
+    docs = dict(zip(texts, nlp_pipe(texts, symptom_only=True)))
+    matches = {text: match_symptom_doc(text, doc, threshold) for text, doc in docs.items()}
+    return [_diagnosis(symptoms, docs, matches) for symptoms in inputs]
+
+
+def diagnose(symptoms: List[str]) -> Dict[str, Any]:
+    return diagnose_batch([symptoms])[0]
@@ -0,0 +1,60 @@
+from typing import Dict, Iterable, List, Set
+
+import numpy as np
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of each word, padded so short words still index"""
+    grams = set()
+    for token in text.split():
+        padded = f" {token} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class TrigramIndex:
+    """
+    Character-trigram postings over a fixed list of texts, for typo-tolerant
+    candidate lookups ranked by Dice similarity. Rows are positions in the
+    indexed list. Postings are sorted int32 row arrays: cheap to merge, and
+    shared copy-on-write after fork.
+    """
+
+    def __init__(self, texts: Iterable[str]):
+        postings: Dict[str, List[int]] = {}
+        sizes = []
+        for row, text in enumerate(texts):
+            grams = trigrams(text or "")
+            for gram in grams:
+                postings.setdefault(gram, []).append(row)
+            sizes.append(len(grams))
+        self.postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+        self.sizes = np.array(sizes, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def search(self, query: str, limit: int, min_similarity: float = 0.0,
+               stop_fraction: float = 1.0) -> List[int]:
+        """
+        Top rows by trigram Dice similarity to the query, best first (ties by
+        row). Trigrams shared by more than stop_fraction of the rows are
+        skipped unless they are all the query has.
+        """
+        query_grams = trigrams(query)
+        grams = [g for g in query_grams if g in self.postings]
+        if not grams:
+            return []
+
+        max_postings = max(1, int(len(self) * stop_fraction))
+        selective = [g for g in grams if len(self.postings[g]) <= max_postings]
+        if selective:
+            grams = selective
+
+        # Count shared trigrams per row
+        rows, overlap = np.unique(np.concatenate([self.postings[g] for g in grams]), return_counts=True)
+        dice = 2.0 * overlap / (len(query_grams) + self.sizes[rows])
+
+        order = np.lexsort((rows, -dice))[:limit]
+        return [int(rows[i]) for i in order if dice[i] >= min_similarity]
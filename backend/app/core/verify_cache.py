@@ -0,0 +1,195 @@
+import os
+import json
+import asyncio
+import time
+import pickle
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Protocol
+
+logger = logging.getLogger(__name__)
+
+VERIFY_CACHE_SIZE = int(os.getenv("VERIFY_CACHE_SIZE", 2048))
+VERIFY_SHARED_CACHE_PATH = os.getenv("VERIFY_SHARED_CACHE_PATH")  # unset = in-process tier only
+VERIFY_SHARED_CACHE_TTL = int(os.getenv("VERIFY_SHARED_CACHE_TTL", 24 * 3600))
+
+
+class SharedCacheBackend(Protocol):
+    """Cross-worker cache tier. Any store with these three methods can be plugged in (e.g. Redis)."""
+
+    def get(self, key: str) -> Optional[bytes]: ...
+
+    def set(self, key: str, value: bytes, version: str, ttl: int) -> None: ...
+
+    def prune(self, keep_version: str) -> None: ...
+
+
+class SQLiteSharedCache:
+    """
+    Local stand-in for a shared cache: one SQLite file on the host,
+    so every uvicorn worker on the machine shares hits.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS verify_cache (
+                    key TEXT PRIMARY KEY,
+                    version TEXT,
+                    value BLOB,
+                    expires_at REAL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=1.0, check_same_thread=False)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM verify_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, version: str, ttl: int) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO verify_cache (key, version, value, expires_at) VALUES (?, ?, ?, ?)",
+                (key, version, value, time.time() + ttl)
+            )
+
+    def prune(self, keep_version: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM verify_cache WHERE version != ? OR expires_at <= ?",
+                (keep_version, time.time())
+            )
+
+
+class VerificationCache:
+    """
+    Two-tier cache of full verify_drug responses keyed on the normalized request:
+    an in-process LRU in front of an optional shared tier. Keys include the
+    drug dataset version, so loading a new dataset invalidates every entry.
+    """
+
+    def __init__(self, maxsize: int = VERIFY_CACHE_SIZE, shared: Optional[SharedCacheBackend] = None,
+                 shared_ttl: int = VERIFY_SHARED_CACHE_TTL):
+        self.maxsize = maxsize
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self.version: Optional[str] = None
+        self._local: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0}
+
+    def set_version(self, version: str) -> None:
+        """Drop entries from any other dataset version"""
+        if version == self.version:
+            return
+        with self._lock:
+            if self.version is not None:
+                self._stats["invalidations"] += 1
+            self._local.clear()
+            self.version = version
+        if self.shared is not None:
+            try:
+                self.shared.prune(version)
+            except Exception as e:
+                logger.warning(f"Shared verification cache prune failed: {e}")
+
+    def make_key(self, normalized_inputs: Dict[str, Any]) -> str:
+        return json.dumps([self.version, *(normalized_inputs[k] or "" for k in sorted(normalized_inputs))])
+
+    def get(self, key: str) -> Optional[Dict]:
+        value = self._get_local(key)
+        if value is None and self.shared is not None:
+            value = self._get_shared(key)
+        if value is None:
+            self._count_miss()
+        return value
+
+    async def get_async(self, key: str) -> Optional[Dict]:
+        """get() for the event loop: the shared tier is read in a worker thread"""
+        value = self._get_local(key)
+        if value is None and self.shared is not None:
+            value = await asyncio.to_thread(self._get_shared, key)
+        if value is None:
+            self._count_miss()
+        return value
+
+    def set(self, key: str, value: Dict) -> None:
+        self._store_local(key, value)
+        if self.shared is not None:
+            self._set_shared(key, value)
+
+    async def set_async(self, key: str, value: Dict) -> None:
+        """set() for the event loop: the shared tier is written in a worker thread"""
+        self._store_local(key, value)
+        if self.shared is not None:
+            await asyncio.to_thread(self._set_shared, key, value)
+
+    def _get_local(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            if key in self._local:
+                self._local.move_to_end(key)
+                self._stats["local_hits"] += 1
+                return self._local[key]
+        return None
+
+    def _get_shared(self, key: str) -> Optional[Dict]:
+        try:
+            blob = self.shared.get(key)
+        except Exception as e:
+            logger.warning(f"Shared verification cache read failed: {e}")
+            return None
+        if blob is None:
+            return None
+        value = pickle.loads(blob)
+        self._store_local(key, value)
+        with self._lock:
+            self._stats["shared_hits"] += 1
+        return value
+
+    def _set_shared(self, key: str, value: Dict) -> None:
+        try:
+            self.shared.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                            self.version or "", self.shared_ttl)
+        except Exception as e:
+            logger.warning(f"Shared verification cache write failed: {e}")
+
+    def _count_miss(self) -> None:
+        with self._lock:
+            self._stats["misses"] += 1
+
+    def _store_local(self, key: str, value: Dict) -> None:
+        with self._lock:
+            self._local[key] = value
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["local_hits"] + self._stats["shared_hits"] + self._stats["misses"]
+            hits = lookups - self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "local_size": len(self._local),
+                "maxsize": self.maxsize,
+                "shared_tier": type(self.shared).__name__ if self.shared is not None else None,
+                "version": self.version
+            }
+
+
+verification_cache = VerificationCache(
+    shared=SQLiteSharedCache(VERIFY_SHARED_CACHE_PATH) if VERIFY_SHARED_CACHE_PATH else None
+)
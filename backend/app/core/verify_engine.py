@@ -1,22 +1,57 @@
-import re
+import asyncio
+import hashlib
 import logging
-import unicodedata
-from typing import Dict, List, Optional, Tuple, Set, Any
+from typing import Dict, List, Optional, Tuple, Set, Any, Iterable
 from rapidfuzz import fuzz, process
 from functools import lru_cache
 import jellyfish
+import numpy as np
 from collections import defaultdict
-from app.core.db import db
 import heapq
+from app.core.drug_store import DrugRecord, DrugLike, to_records
+from app.core.normalize import normalize_text, normalize_manufacturer, normalize_nafdac, canonical_nafdac
+from app.core.nafdac_index import NafdacIndex
+from app.core.trigram_index import TrigramIndex
 
 logger = logging.getLogger(__name__)
 
 
 class DrugVerificationEngine:
-    def __init__(self, drug_db: List[Dict]):
-        # Initialize DB and indexes
-        self.drug_db = drug_db
-        self.indexes = self._build_indexes()
+    # Trigram candidate generation (used when no exact index key matches)
+    TRIGRAM_CANDIDATE_LIMIT = 50
+    TRIGRAM_MIN_SIMILARITY = 0.1
+    TRIGRAM_STOP_FRACTION = 0.2  # ignore trigrams shared by >20% of the catalogue
+
+    # Typo'd NAFDAC numbers considered when no index key matches exactly
+    NAFDAC_MAX_DISTANCE = 2
+    NAFDAC_CANDIDATE_LIMIT = 20
+
+    # No-match suggestions: fuzzy-scored over a bounded, index-pruned pool
+    SUGGESTION_POOL_LIMIT = 200
+    SUGGESTION_LIMIT = 5
+    SUGGESTION_MIN_SIMILARITY = 40
+
+    # Weighted fields: (response field, input key, DB column, weight key)
+    FIELD_SPECS = [
+        ("nafdac_reg_no", "nafdac", "nafdac", "nafdac_weight"),
+        ("manufacturer", "manufacturer", "manufacturer", "manufacturer_weight"),
+        ("product_name", "product_name", "product_name", "product_name_weight"),
+        ("generic_name", "generic_name", "generic_name", "generic_name_weight"),
+    ]
+
+    # Firestore fallback bounds (used only by verify_drug_async)
+    FIRESTORE_PAGE_LIMIT = 20
+    FIRESTORE_TIMEOUT = 3.0  # seconds
+
+    def __init__(self, drug_db: Iterable[DrugLike], indexes: Optional[Dict[str, Any]] = None,
+                 columns: Optional[Dict[str, Any]] = None, dataset_version: Optional[str] = None):
+        # Raw drug documents are reduced to compact DrugRecords as they stream in.
+        # indexes/columns may be passed prebuilt (e.g. from an on-disk snapshot)
+        self.drug_db: List[DrugRecord] = list(to_records(drug_db))
+
+        # Identifies the loaded dataset; result caches are keyed on it. Derived from
+        # the records, so every process holding the same catalogue agrees on it
+        self.dataset_version = dataset_version or self.content_version(self.drug_db)
 
         # Scoring configuration
         self.SCORES = {
@@ -39,19 +74,6 @@ class DrugVerificationEngine:
             "partial_match_bonus": 5
         }
 
-        # Common corporate suffixes for manufacturer matching
-        self.CORP_SUFFIXES = [
-            r"\bltd\b", r"\blimited\b", r"\bplc\b", r"\binc\b", r"\bincorporated\b",
-            r"\bco\b", r"\bcompany\b", r"\bcorp\b", r"\bcorporation\b", r"\bllc\b",
-            r"\bllp\b", r"\bpartners\b", r"\bgroup\b", r"\bholdings\b",
-            r"\bsa\b", r"\bag\b", r"\bgmbh\b", r"\bsp\.?z\.?o\.?o\.?\b",
-            r"\bindustries\b", r"\bpharma\b", r"\bpharmaceuticals\b", r"\bpharmacies\b",
-            r"\bhealthcare\b", r"\bbiotech\b", r"\bbiotechnology\b", r"\bmedicines\b",
-            r"\blaboratories\b", r"\blabs\b", r"\bresearch\b", r"\btherapeutics\b",
-            r"\bsciences\b", r"\bformulations\b",
-            r"\bnigeria\b", r"\bnig\.?\b", r"\bng\b"
-        ]
-
         # Common drug name variations
         self.DRUG_VARIANTS = {
             "paracetamol": ["panadol", "acetaminophen", "tylenol"],
@@ -62,6 +84,10 @@ class DrugVerificationEngine:
             "omeprazole": ["prilosec", "losec"],
         }
 
+        # Build indexes last, once the scoring configuration is in place
+        self.indexes = indexes if indexes is not None else self._build_indexes()
+        self.columns = columns if columns is not None else self._build_columns()
+
     @lru_cache(maxsize=1024)
     def _cached_find_candidates(self, product_name: str, manufacturer: str, nafdac: str):
         inputs = {
@@ -71,12 +97,21 @@ class DrugVerificationEngine:
         }
         return self._find_candidates(inputs)
 
+    @staticmethod
+    def content_version(records: Iterable[DrugRecord]) -> str:
+        """Digest of the records' contents, in catalogue order"""
+        digest = hashlib.sha256()
+        for record in records:
+            digest.update(repr(record).encode("utf-8"))
+        return digest.hexdigest()[:16]
+
     @lru_cache(maxsize=1024)
-    def _get_drug_by_id(self, drug_id: int) -> Optional[Dict]:
+    def _get_drug_by_id(self, drug_id: int) -> Optional[DrugRecord]:
         """Fetch full drug record by ID with caching"""
         return self.indexes["by_id"].get(drug_id)
 
-    def find_candidates_local(self, product_name: str = "", manufacturer: str = "", nafdac: str = "") -> Set[int]:
+    def find_candidates_local(self, product_name: str = "", manufacturer: str = "", nafdac: str = "",
+                              generic_name: str = "") -> Set[int]:
         """
         Optional local candidate search using built indexes.
         This is safe to cache and avoids repeated Firestore queries.
@@ -85,9 +120,7 @@ class DrugVerificationEngine:
         
         # NAFDAC exact match
         if nafdac:
-            norm_nafdac = self._normalize_nafdac(nafdac)
-            if norm_nafdac in self.indexes["by_nafdac"]:
-                candidate_ids.add(self.indexes["by_nafdac"][norm_nafdac])
+            candidate_ids.update(self.indexes["nafdac_index"].exact(nafdac))
 
         # Product name
         if product_name:
@@ -99,58 +132,81 @@ class DrugVerificationEngine:
             norm_manu = self._normalize_manufacturer(manufacturer)
             candidate_ids.update(self.indexes["by_manufacturer"].get(norm_manu, []))
 
-        # Fallback: all drugs if nothing matches
+        # Fuzzy fallback: typo'd NAFDAC numbers, plus bounded top-K from the trigram index
         if not candidate_ids:
-            candidate_ids.update(self.indexes["by_id"].keys())
+            if nafdac:
+                nafdac_index = self.indexes["nafdac_index"]
+                for key, _ in nafdac_index.fuzzy(nafdac, max_distance=self.NAFDAC_MAX_DISTANCE,
+                                                 limit=self.NAFDAC_CANDIDATE_LIMIT):
+                    candidate_ids.update(nafdac_index.values(key))
+            query = " ".join(filter(None, [
+                self._normalize_text(product_name),
+                self._normalize_text(generic_name),
+                self._normalize_manufacturer(manufacturer),
+                self._normalize_nafdac(nafdac).replace("-", "")
+            ]))
+            candidate_ids.update(self._trigram_candidates(query))
+
+        # Last resort: registrations starting with a partial NAFDAC number (bounded).
+        # A query sharing nothing with the catalogue yields no candidates, never a full scan
+        if not candidate_ids and nafdac:
+            nafdac_index = self.indexes["nafdac_index"]
+            for key in nafdac_index.prefix(nafdac, limit=self.NAFDAC_CANDIDATE_LIMIT):
+                candidate_ids.update(nafdac_index.values(key))
 
         return candidate_ids
 
+    def _trigram_candidates(self, query: str, limit: Optional[int] = None,
+                            min_similarity: Optional[float] = None) -> List[int]:
+        """Return the top-K drug IDs ranked by trigram Dice similarity to the query"""
+        if min_similarity is None:
+            min_similarity = self.TRIGRAM_MIN_SIMILARITY
+        rows = self.indexes["trigram_index"].search(
+            query, limit=limit or self.TRIGRAM_CANDIDATE_LIMIT, min_similarity=min_similarity,
+            stop_fraction=self.TRIGRAM_STOP_FRACTION
+        )
+        ids = self.columns["ids"]
+        return [ids[row] for row in rows]
+
     def _build_indexes(self) -> Dict[str, Any]:
         """Build comprehensive search indexes"""
         indexes = {
             "by_id": {},
-            "by_nafdac": {},
             "by_product_name": defaultdict(list),
             "by_generic_name": defaultdict(list),
             "by_manufacturer": defaultdict(list),
             "by_dosage_form": defaultdict(list),
-            "search_texts": []
+            "search_text_by_id": {}
         }
+        trigram_texts = {}
         
         for drug in self.drug_db:
             try:
-                drug_id = drug.get("nexahealth_id")
-                if not drug_id:
-                    continue
-                    
+                drug_id = drug.nexahealth_id
                 indexes["by_id"][drug_id] = drug
                 
-                # Index by NAFDAC
-                nafdac = (drug.get("identifiers") or {}).get("nafdac_reg_no")
-                if nafdac:
-                    normalized_nafdac = self._normalize_nafdac(nafdac)
-                    indexes["by_nafdac"][normalized_nafdac] = drug_id
+                nafdac = drug.nafdac_reg_no
                 
                 # Index by product name
-                product_name = drug.get("product_name")
+                product_name = drug.product_name
                 if product_name:
                     normalized = self._normalize_text(product_name)
                     indexes["by_product_name"][normalized].append(drug_id)
                 
                 # Index by generic name
-                generic_name = drug.get("generic_name")
+                generic_name = drug.generic_name
                 if generic_name:
                     normalized = self._normalize_text(generic_name)
                     indexes["by_generic_name"][normalized].append(drug_id)
                 
                 # Index by manufacturer
-                manufacturer = (drug.get("manufacturer") or {}).get("name")
+                manufacturer = drug.manufacturer
                 if manufacturer:
                     normalized = self._normalize_manufacturer(manufacturer)
                     indexes["by_manufacturer"][normalized].append(drug_id)
                 
                 # Index by dosage form
-                dosage_form = drug.get("dosage_form")
+                dosage_form = drug.dosage_form
                 if dosage_form:
                     normalized = self._normalize_text(dosage_form)
                     indexes["by_dosage_form"][normalized].append(drug_id)
@@ -163,56 +219,76 @@ class DrugVerificationEngine:
                     self._normalize_text(dosage_form),
                     self._normalize_nafdac(nafdac)
                 ]))
-                indexes["search_texts"].append((search_text, drug_id))
+                indexes["search_text_by_id"][drug_id] = search_text
+
+                # Index by character trigrams for typo-tolerant candidate lookup
+                trigram_text = " ".join(filter(None, [
+                    self._normalize_text(product_name),
+                    self._normalize_text(generic_name),
+                    self._normalize_manufacturer(manufacturer),
+                    self._normalize_nafdac(nafdac).replace("-", "")
+                ]))
+                trigram_texts[drug_id] = trigram_text
                 
             except Exception as e:
                 logger.warning(f"Error indexing drug: {e}")
                 continue
+
+        # Index by NAFDAC (exact, prefix and typo-tolerant lookups)
+        indexes["nafdac_index"] = NafdacIndex(
+            (drug.nafdac_reg_no, drug_id) for drug_id, drug in indexes["by_id"].items()
+        )
+
+        # Trigram postings; rows follow by_id order, as in the columns
+        indexes["trigram_index"] = TrigramIndex(trigram_texts.get(drug_id, "") for drug_id in indexes["by_id"])
                 
         return indexes
 
+    def _build_columns(self) -> Dict[str, Any]:
+        """Build per-field column arrays (raw + normalized) aligned by row for batch scoring"""
+        columns = {
+            "ids": [],
+            "row": {},
+            "nafdac": [],
+            "nafdac_norm": [],
+            "manufacturer": [],
+            "manufacturer_norm": [],
+            "product_name": [],
+            "product_name_norm": [],
+            "generic_name": [],
+            "generic_name_norm": []
+        }
+
+        for drug_id, drug in self.indexes["by_id"].items():
+            nafdac = drug.nafdac_reg_no or ""
+            manufacturer = drug.manufacturer or ""
+            product_name = drug.product_name or ""
+            generic_name = drug.generic_name or ""
+
+            columns["row"][drug_id] = len(columns["ids"])
+            columns["ids"].append(drug_id)
+            columns["nafdac"].append(nafdac)
+            columns["nafdac_norm"].append(self._normalize_nafdac(nafdac))
+            columns["manufacturer"].append(manufacturer)
+            columns["manufacturer_norm"].append(self._normalize_manufacturer(manufacturer))
+            columns["product_name"].append(product_name)
+            columns["product_name_norm"].append(self._normalize_text(product_name))
+            columns["generic_name"].append(generic_name)
+            columns["generic_name_norm"].append(self._normalize_text(generic_name))
+
+        return columns
+
     def _normalize_text(self, text: Optional[str]) -> str:
         """Normalize text for comparison"""
-        if not text:
-            return ""
-            
-        # Convert to lowercase and remove accents
-        text = unicodedata.normalize('NFKD', text.lower())
-        text = ''.join([c for c in text if not unicodedata.combining(c)])
-        
-        # Remove special characters and extra spaces
-        text = re.sub(r'[^\w\s]', ' ', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        return normalize_text(text)
 
     def _normalize_manufacturer(self, manufacturer: Optional[str]) -> str:
         """Normalize manufacturer name by removing corporate suffixes"""
-        if not manufacturer:
-            return ""
-            
-        normalized = self._normalize_text(manufacturer)
-        
-        # Remove common corporate suffixes
-        for suffix in self.CORP_SUFFIXES:
-            normalized = re.sub(suffix, '', normalized)
-        
-        # Remove extra spaces and return
-        return re.sub(r'\s+', ' ', normalized).strip()
+        return normalize_manufacturer(manufacturer)
 
     def _normalize_nafdac(self, nafdac: Optional[str]) -> str:
         """Normalize NAFDAC number"""
-        if not nafdac:
-            return ""
-            
-        # Remove spaces and convert to uppercase
-        normalized = re.sub(r'[^\w]', '', nafdac.upper())
-        
-        # Format as XX-XXXX if possible
-        if len(normalized) == 6 and normalized[:2].isdigit() and normalized[2:].isdigit():
-            return f"{normalized[:2]}-{normalized[2:]}"
-            
-        return normalized
+        return normalize_nafdac(nafdac)
 
     def _score_nafdac_match(self, input_nafdac: str, db_nafdac: str) -> Tuple[int, str]:
         """Score NAFDAC number match"""
@@ -302,35 +378,81 @@ class DrugVerificationEngine:
         else:
             return 0, "no_match"
 
-    def verify_drug(self, request: Dict) -> Dict:
-        """Main verification method"""
-        # Normalize inputs
-        inputs = {
+    def _normalize_inputs(self, request: Dict) -> Dict:
+        """Normalize request fields into the engine's input dict"""
+        return {
             "product_name": self._normalize_text(request.get("product_name")),
             "generic_name": self._normalize_text(request.get("generic_name")),
-            "nafdac": request.get("nafdac_reg_no"),
+            "nafdac": self._nafdac_input(request.get("nafdac_reg_no")),
             "manufacturer": self._normalize_manufacturer(request.get("manufacturer")),
             "dosage_form": self._normalize_text(request.get("dosage_form")),
             "strength": self._normalize_text(request.get("strength"))
         }
-        
-        # Find candidate drugs
+
+    def _nafdac_input(self, nafdac: Optional[str]) -> str:
+        """
+        One spelling per registration number: the catalogue's when the number
+        is registered, else the normalized form. Spellings differing only in
+        case or separators then score, and cache, identically.
+        """
+        canonical = canonical_nafdac(nafdac)
+        if not canonical:
+            return ""
+        for drug_id in self.indexes["nafdac_index"].values(canonical):
+            drug = self._get_drug_by_id(drug_id)
+            if drug is not None and drug.nafdac_reg_no:
+                return drug.nafdac_reg_no
+        return self._normalize_nafdac(canonical)
+
+    def verify_drug(self, request: Dict) -> Dict:
+        """Main verification method (local indexes only)"""
+        inputs = self._normalize_inputs(request)
         candidate_ids = self._find_candidates(inputs)
-        
-        # Score each candidate
+        return self._verify_candidates(inputs, self._score_candidates(candidate_ids, inputs))
+
+    async def verify_drug_async(self, request: Dict) -> Dict:
+        """
+        Verification for async routes: same as verify_drug, but when no local
+        candidate reaches min_score (e.g. a drug added after the snapshot was
+        built), queries Firestore without blocking the event loop.
+        """
+        return self.verify_drug_local(request) or await self.verify_drug_remote_async(request)
+
+    def verify_drug_local(self, request: Dict) -> Optional[Dict]:
+        """
+        verify_drug, or None when no local candidate reaches min_score (the
+        caller then tries verify_drug_remote_async). CPU-bound with no I/O,
+        so it can run in a thread or a worker process.
+        """
+        inputs = self._normalize_inputs(request)
+        scored_results = self._score_candidates(self._find_candidates(inputs), inputs)
+        return self._verify_candidates(inputs, scored_results) if scored_results else None
+
+    async def verify_drug_remote_async(self, request: Dict) -> Dict:
+        """
+        Verification of a request no local candidate matched, against the
+        Firestore fallback. If that lookup failed, the no-match response
+        carries remote_lookup_failed, so it is not mistaken for a real miss.
+        """
+        inputs = self._normalize_inputs(request)
+        drugs, failed = await self._find_candidates_remote(inputs)
         scored_results = []
-        for drug_id in candidate_ids:
-            drug = self.indexes["by_id"].get(drug_id)
-            if not drug:
-                continue
-                
+        # Drugs fetched from Firestore are not in the columns; score them one by one
+        for drug in drugs:
             score, details, warnings = self._score_drug(drug, inputs)
             if score >= self.SCORES["min_score"]:
                 scored_results.append((score, drug, details, warnings))
-        
-        # Sort by score (descending)
         scored_results.sort(key=lambda x: x[0], reverse=True)
-        
+
+        result = self._verify_candidates(inputs, scored_results)
+        if failed:
+            result["message"] = "No direct match found; the online registry could not be checked"
+            result["remote_lookup_failed"] = True
+        return result
+
+    def _verify_candidates(self, inputs: Dict,
+                           scored_results: List[Tuple[float, DrugRecord, List[Dict], List[str]]]) -> Dict:
+        """Build the verification response from scored candidates, best first"""
         # Determine verification status
         if not scored_results:
             return self._create_no_match_response(inputs)
@@ -350,56 +472,72 @@ class DrugVerificationEngine:
         )
 
     def _find_candidates(self, inputs: Dict) -> Set[int]:
-        """
-        Find potential candidate drugs based on inputs using:
-        1. Local in-memory indexes first
-        2. Firestore as fallback if nothing is found locally
-        """
-        candidate_ids = set()
-
-        # --- 1. Search local indexes ---
-        candidate_ids.update(self.find_candidates_local(
+        """Find potential candidate drugs based on inputs using the in-memory indexes"""
+        return self.find_candidates_local(
             product_name=inputs.get("product_name", ""),
             manufacturer=inputs.get("manufacturer", ""),
-            nafdac=inputs.get("nafdac", "")
-        ))
-
-        # --- 2. Fallback to Firestore if no candidates found locally ---
-        if not candidate_ids:
-            drugs_ref = fs_db.collection("drugs")
-
-            # Priority 1: NAFDAC exact match
-            if inputs["nafdac"]:
-                norm_nafdac = self._normalize_nafdac(inputs["nafdac"])
-                docs = drugs_ref.where("identifiers.nafdac_reg_no", "==", norm_nafdac).stream()
-                for doc in docs:
-                    drug = doc.to_dict()
-                    if drug.get("nexahealth_id"):
-                        candidate_ids.add(drug["nexahealth_id"])
-
-            # Priority 2: Manufacturer match (Firestore can't do fuzzy search)
-            if inputs["manufacturer"]:
-                norm_manu = self._normalize_manufacturer(inputs["manufacturer"])
-                docs = drugs_ref.stream()
-                for doc in docs:
-                    drug = doc.to_dict()
-                    manu_name = (drug.get("manufacturer") or {}).get("name", "")
-                    if norm_manu in self._normalize_manufacturer(manu_name):
-                        if drug.get("nexahealth_id"):
-                            candidate_ids.add(drug["nexahealth_id"])
-
-            # Fallback: fetch all if still empty
-            if not candidate_ids:
-                docs = drugs_ref.stream()
-                for doc in docs:
-                    drug = doc.to_dict()
-                    if drug.get("nexahealth_id"):
-                        candidate_ids.add(drug["nexahealth_id"])
+            nafdac=inputs.get("nafdac", ""),
+            generic_name=inputs.get("generic_name", "")
+        )
 
-        return candidate_ids
+    async def _find_candidates_remote(self, inputs: Dict) -> Tuple[List[DrugRecord], bool]:
+        """
+        Firestore fallback for drugs missing from the local indexes.
+        Uses the async client, bounded queries (NAFDAC equality, then name and
+        manufacturer prefix ranges, FIRESTORE_PAGE_LIMIT docs each) and an
+        overall FIRESTORE_TIMEOUT. Returns the records not already indexed
+        locally, and whether the lookup failed (timed out or raised).
+        """
+        # Imported here so the engine can be built offline without Firebase
+        from app.core.db import get_async_firestore_client
+        drugs_ref = get_async_firestore_client().collection("drugs")
+        limit = self.FIRESTORE_PAGE_LIMIT
 
+        queries = []
 
-    def _score_drug(self, drug: Dict, inputs: Dict) -> Tuple[float, List[Dict], List[str]]:
+        # Priority 1: NAFDAC exact match (stored formatting varies)
+        if inputs["nafdac"]:
+            raw = inputs["nafdac"].strip()
+            canonical = canonical_nafdac(raw)
+            # Registrations are usually stored as XX-XXXX
+            for value in {raw, self._normalize_nafdac(raw), f"{canonical[:2]}-{canonical[2:]}"}:
+                queries.append(drugs_ref.where("identifiers.nafdac_reg_no", "==", value).limit(limit))
+
+        # Priority 2: product name / manufacturer prefix (Firestore can't do fuzzy search)
+        for field, value in (("product_name", inputs["product_name"]),
+                             ("manufacturer.name", inputs["manufacturer"])):
+            if not value:
+                continue
+            for prefix in {value, value.title(), value.upper()}:
+                queries.append(
+                    drugs_ref.where(field, ">=", prefix).where(field, "<", prefix + "\uf8ff").limit(limit)
+                )
+
+        if not queries:
+            return [], False
+
+        async def run(query) -> List[Dict]:
+            return [doc.to_dict() async for doc in query.stream()]
+
+        try:
+            pages = await asyncio.wait_for(
+                asyncio.gather(*(run(q) for q in queries)),
+                timeout=self.FIRESTORE_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Firestore candidate fallback timed out after {self.FIRESTORE_TIMEOUT}s")
+            return [], True
+        except Exception as e:
+            logger.warning(f"Firestore candidate fallback failed: {e}")
+            return [], True
+
+        found = {}
+        for record in to_records(doc for page in pages for doc in page):
+            if record.nexahealth_id not in self.indexes["by_id"]:
+                found[record.nexahealth_id] = record
+        return list(found.values()), False
+
+    def _score_drug(self, drug: DrugRecord, inputs: Dict) -> Tuple[float, List[Dict], List[str]]:
         """Score a drug against input criteria"""
         total_score = 0.0
         details = []
@@ -410,7 +548,7 @@ class DrugVerificationEngine:
         
         # NAFDAC scoring
         if inputs["nafdac"]:
-            db_nafdac = (drug.get("identifiers") or {}).get("nafdac_reg_no")
+            db_nafdac = drug.nafdac_reg_no
             if db_nafdac:
                 score, reason = self._score_nafdac_match(inputs["nafdac"], db_nafdac)
                 weighted_score = score * self.SCORES["nafdac_weight"]
@@ -426,7 +564,7 @@ class DrugVerificationEngine:
         
         # Manufacturer scoring
         if inputs["manufacturer"]:
-            db_manu = (drug.get("manufacturer") or {}).get("name")
+            db_manu = drug.manufacturer
             if db_manu:
                 score, reason = self._score_manufacturer_match(inputs["manufacturer"], db_manu)
                 weighted_score = score * self.SCORES["manufacturer_weight"]
@@ -442,7 +580,7 @@ class DrugVerificationEngine:
         
         # Product name scoring
         if inputs["product_name"]:
-            db_product = drug.get("product_name")
+            db_product = drug.product_name
             if db_product:
                 score, reason = self._score_name_match(inputs["product_name"], db_product)
                 weighted_score = score * self.SCORES["product_name_weight"]
@@ -458,7 +596,7 @@ class DrugVerificationEngine:
         
         # Generic name scoring
         if inputs["generic_name"]:
-            db_generic = drug.get("generic_name")
+            db_generic = drug.generic_name
             if db_generic:
                 score, reason = self._score_name_match(inputs["generic_name"], db_generic, is_generic=True)
                 weighted_score = score * self.SCORES["generic_name_weight"]
@@ -484,7 +622,175 @@ class DrugVerificationEngine:
         
         return total_score, details, warnings
 
-    def _check_conflicts(self, inputs: Dict, drug: Dict, field_scores: Dict, warnings: List[str]):
+    @staticmethod
+    def _batch_similarity(query: str, choices: List[str], scorers: List[Any]) -> np.ndarray:
+        """Best score of several rapidfuzz scorers for one query against many choices"""
+        best = np.zeros(len(choices), dtype=np.float64)
+        for scorer in scorers:
+            scores = process.cdist([query], choices, scorer=scorer, dtype=np.float64)[0]
+            np.maximum(best, scores, out=best)
+        return best
+
+    def _batch_nafdac_scores(self, input_nafdac: str, rows: List[int]) -> Tuple[np.ndarray, List[str]]:
+        """Vectorized equivalent of _score_nafdac_match over candidate rows"""
+        norm_input = self._normalize_nafdac(input_nafdac)
+        input_no_dash = norm_input.replace("-", "")
+        db_norms = [self.columns["nafdac_norm"][r] for r in rows]
+        db_no_dash = [n.replace("-", "") for n in db_norms]
+
+        fuzzy = self._batch_similarity(input_no_dash, db_no_dash, [fuzz.ratio])
+        scores = np.zeros(len(rows), dtype=np.float64)
+        reasons = []
+        for i, (norm_db, no_dash) in enumerate(zip(db_norms, db_no_dash)):
+            if norm_input == norm_db:
+                scores[i], reason = 100, "exact_match"
+            elif input_no_dash == no_dash:
+                scores[i], reason = 95, "format_normalized"
+            elif input_no_dash.startswith(no_dash[:4]) or no_dash.startswith(input_no_dash[:4]):
+                scores[i], reason = 80, "partial_match"
+            elif fuzzy[i] > 70:
+                scores[i], reason = fuzzy[i], "fuzzy_match"
+            else:
+                reason = "no_match"
+            reasons.append(reason)
+        return scores, reasons
+
+    def _batch_manufacturer_scores(self, input_manu: str, rows: List[int]) -> Tuple[np.ndarray, List[str]]:
+        """Vectorized equivalent of _score_manufacturer_match over candidate rows"""
+        norm_input = self._normalize_manufacturer(input_manu)
+        db_norms = [self.columns["manufacturer_norm"][r] for r in rows]
+
+        fuzzy = self._batch_similarity(norm_input, db_norms, [fuzz.token_set_ratio, fuzz.partial_ratio])
+        scores = np.zeros(len(rows), dtype=np.float64)
+        reasons = []
+        for i, norm_db in enumerate(db_norms):
+            if norm_input == norm_db:
+                scores[i], reason = 100, "exact_match"
+            elif norm_input in norm_db or norm_db in norm_input:
+                scores[i], reason = 90, "contains_match"
+            elif fuzzy[i] >= 80:
+                scores[i], reason = fuzzy[i], "high_similarity"
+            elif fuzzy[i] >= 60:
+                scores[i], reason = fuzzy[i], "medium_similarity"
+            else:
+                reason = "no_match"
+            reasons.append(reason)
+        return scores, reasons
+
+    def _batch_name_scores(self, input_name: str, rows: List[int], field: str,
+                           is_generic: bool = False) -> Tuple[np.ndarray, List[str]]:
+        """Vectorized equivalent of _score_name_match over candidate rows"""
+        norm_input = self._normalize_text(input_name)
+        db_raw = [self.columns[field][r] for r in rows]
+        db_norms = [self.columns[f"{field}_norm"][r] for r in rows]
+
+        # Names that count as a common variant of the input (generic names only)
+        variant_norms = set()
+        if is_generic:
+            for base, variants in self.DRUG_VARIANTS.items():
+                norm_base = self._normalize_text(base)
+                norm_variants = [self._normalize_text(v) for v in variants]
+                if norm_input == norm_base:
+                    variant_norms.update(norm_variants)
+                if norm_input in norm_variants:
+                    variant_norms.add(norm_base)
+
+        # Fuzzy scores use the raw DB value, as in the scalar path
+        fuzzy = self._batch_similarity(input_name, db_raw, [fuzz.token_set_ratio, fuzz.partial_ratio])
+        scores = np.zeros(len(rows), dtype=np.float64)
+        reasons = []
+        for i, norm_db in enumerate(db_norms):
+            if norm_input == norm_db:
+                scores[i], reason = 100, "exact_match"
+            elif norm_db in variant_norms:
+                scores[i], reason = 90, "common_variant"
+            elif fuzzy[i] >= 90:
+                scores[i], reason = fuzzy[i], "high_similarity"
+            elif fuzzy[i] >= 75:
+                scores[i], reason = fuzzy[i], "medium_similarity"
+            elif fuzzy[i] >= 50:
+                scores[i], reason = fuzzy[i], "low_similarity"
+            else:
+                reason = "no_match"
+            reasons.append(reason)
+        return scores, reasons
+
+    def _field_scores(self, rows: List[int], inputs: Dict) -> List[Tuple]:
+        """
+        Unweighted per-field scores for each provided input field over candidate rows:
+        (field, input key, DB column, weight key, scores, reasons, present) tuples
+        """
+        fields = []
+        for field, key, column, weight_key in self.FIELD_SPECS:
+            if not inputs[key]:
+                continue
+            if key == "nafdac":
+                scores, reasons = self._batch_nafdac_scores(inputs[key], rows)
+            elif key == "manufacturer":
+                scores, reasons = self._batch_manufacturer_scores(inputs[key], rows)
+            else:
+                scores, reasons = self._batch_name_scores(
+                    inputs[key], rows, column, is_generic=(key == "generic_name")
+                )
+
+            # Fields only count where the DB record has a value
+            present = np.array([bool(self.columns[column][r]) for r in rows], dtype=bool)
+            scores = np.where(present, scores, 0.0)
+            fields.append((field, key, column, weight_key, scores, reasons, present))
+        return fields
+
+    def _score_candidates(self, candidate_ids: Set[int], inputs: Dict) -> List[Tuple[float, DrugRecord, List[Dict], List[str]]]:
+        """
+        Score all candidates at once, one cdist pass per field.
+        Returns the same (score, drug, details, warnings) tuples as _score_drug,
+        filtered by min_score and sorted by score (descending).
+        """
+        row_of = self.columns["row"]
+        # Catalogue order, so ties rank as in the scalar path (not in set iteration order)
+        rows = sorted(row_of[drug_id] for drug_id in candidate_ids if drug_id in row_of)
+        if not rows:
+            return []
+
+        total = np.zeros(len(rows), dtype=np.float64)
+        matched_count = np.zeros(len(rows), dtype=np.int64)
+        fields = self._field_scores(rows, inputs)
+        for field, key, column, weight_key, scores, reasons, present in fields:
+            total += scores * self.SCORES[weight_key]
+            matched_count += (present & (scores >= 70)).astype(np.int64)
+
+        # Complete-match bonus when every provided input field matched
+        provided_count = len([f for f in inputs if inputs[f]])
+        total = np.where(matched_count == provided_count,
+                         total + self.SCORES["complete_match_bonus"], total)
+
+        # Stable sort: ties keep catalogue order
+        keep = [i for i in range(len(rows)) if total[i] >= self.SCORES["min_score"]]
+        keep.sort(key=lambda i: total[i], reverse=True)
+
+        scored_results = []
+        for i in keep:
+            drug = self.indexes["by_id"][self.columns["ids"][rows[i]]]
+            details = []
+            field_scores = {}
+            for field, key, column, _, scores, reasons, present in fields:
+                if not present[i]:
+                    continue
+                score = float(scores[i])
+                field_scores[key] = score
+                details.append({
+                    "field": field,
+                    "score": score,
+                    "reason": reasons[i],
+                    "input": inputs[key],
+                    "matched": self.columns[column][rows[i]]
+                })
+            warnings = []
+            self._check_conflicts(inputs, drug, field_scores, warnings)
+            scored_results.append((float(total[i]), drug, details, warnings))
+
+        return scored_results
+
+    def _check_conflicts(self, inputs: Dict, drug: DrugRecord, field_scores: Dict, warnings: List[str]):
         """Check for conflicts between matched fields"""
         # Check if manufacturer conflicts with high-scoring name matches
         if (field_scores.get("manufacturer", 0) < 60 and 
@@ -497,7 +803,7 @@ class DrugVerificationEngine:
              field_scores.get("product_name", 0) >= 80)):
             warnings.append("nafdac_conflict")
 
-    def _determine_status(self, inputs: Dict, best_score: float, best_drug: Dict, warnings: List[str]) -> Tuple[str, str]:
+    def _determine_status(self, inputs: Dict, best_score: float, best_drug: DrugRecord, warnings: List[str]) -> Tuple[str, str]:
         """Determine verification status based on score and warnings"""
         provided_fields = [f for f in inputs if inputs[f]]
         
@@ -514,34 +820,55 @@ class DrugVerificationEngine:
         else:
             return "unknown", "❌ No reliable match found"
 
+    def _suggestion_pool(self, inputs: Dict) -> List[int]:
+        """Candidate IDs for suggestions: exact index hits, then trigram neighbours"""
+        pool = dict.fromkeys(self.indexes["by_product_name"].get(inputs.get("product_name") or "", []))
+        pool.update(dict.fromkeys(self.indexes["by_generic_name"].get(inputs.get("generic_name") or "", [])))
+        pool.update(dict.fromkeys(self.indexes["by_manufacturer"].get(inputs.get("manufacturer") or "", [])))
+
+        query = " ".join(filter(None, [
+            inputs.get("product_name"),
+            inputs.get("generic_name"),
+            inputs.get("manufacturer"),
+            self._normalize_nafdac(inputs.get("nafdac")).replace("-", "")
+        ]))
+        # Any shared trigram qualifies; partial_ratio decides what is shown
+        pool.update(dict.fromkeys(self._trigram_candidates(query, limit=self.SUGGESTION_POOL_LIMIT,
+                                                           min_similarity=0.0)))
+        return list(pool)[:self.SUGGESTION_POOL_LIMIT]
+
     def _create_no_match_response(self, inputs: Dict) -> Dict:
         """Create response when no matches are found"""
-        # Try to find similar products for suggestions
-        suggestions = []
+        # Suggest similar products from a bounded pool instead of the whole catalogue
         search_terms = " ".join(filter(None, inputs.values()))
-        
-        for search_text, drug_id in self.indexes["search_texts"]:
-            similarity = fuzz.partial_ratio(search_terms, search_text)
-            if similarity > 40:  # Lower threshold for suggestions
-                drug = self.indexes["by_id"][drug_id]
-                suggestions.append({
-                    "product_name": drug.get("product_name"),
-                    "generic_name": drug.get("generic_name"),
-                    "manufacturer": (drug.get("manufacturer") or {}).get("name"),
-                    "similarity": similarity
-                })
-        
-        suggestions.sort(key=lambda x: x["similarity"], reverse=True)
+        search_texts = self.indexes["search_text_by_id"]
+        rows = self.columns["row"]
+
+        scored = []
+        for drug_id in self._suggestion_pool(inputs):
+            similarity = fuzz.partial_ratio(search_terms, search_texts.get(drug_id, ""))
+            if similarity > self.SUGGESTION_MIN_SIMILARITY:  # Lower threshold for suggestions
+                scored.append((similarity, -rows.get(drug_id, 0), drug_id))
+
+        suggestions = []
+        for similarity, _, drug_id in heapq.nlargest(self.SUGGESTION_LIMIT, scored):
+            drug = self.indexes["by_id"][drug_id]
+            suggestions.append({
+                "product_name": drug.product_name,
+                "generic_name": drug.generic_name,
+                "manufacturer": drug.manufacturer,
+                "similarity": similarity
+            })
         
         return {
             "status": "unknown",
             "message": "No direct match found",
             "match_score": 0,
             "confidence": "low",
-            "suggestions": suggestions[:5]
+            "suggestions": suggestions
         }
 
-    def _build_response(self, status: str, message: str, best_drug: Dict, 
+    def _build_response(self, status: str, message: str, best_drug: DrugRecord, 
                        best_score: float, best_details: List[Dict], 
                        all_results: List, inputs: Dict) -> Dict:
         """Build the final response object"""
@@ -562,10 +889,10 @@ class DrugVerificationEngine:
         possible_matches = []
         for score, drug, _, _ in all_results[1:6]:  # Next 5 best matches
             possible_matches.append({
-                "product_name": drug.get("product_name"),
-                "generic_name": drug.get("generic_name"),
-                "manufacturer": (drug.get("manufacturer") or {}).get("name"),
-                "nafdac_reg_no": (drug.get("identifiers") or {}).get("nafdac_reg_no"),
+                "product_name": drug.product_name,
+                "generic_name": drug.generic_name,
+                "manufacturer": drug.manufacturer,
+                "nafdac_reg_no": drug.nafdac_reg_no,
                 "match_score": int(score)
             })
         
@@ -584,16 +911,16 @@ class DrugVerificationEngine:
         return {
             "status": status,
             "message": message,
-            "product_name": best_drug.get("product_name"),
-            "generic_name": best_drug.get("generic_name"),
-            "dosage_form": best_drug.get("dosage_form"),
-            "strength": best_drug.get("strength"),
-            "nafdac_reg_no": (best_drug.get("identifiers") or {}).get("nafdac_reg_no"),
-            "manufacturer": (best_drug.get("manufacturer") or {}).get("name"),
+            "product_name": best_drug.product_name,
+            "generic_name": best_drug.generic_name,
+            "dosage_form": best_drug.dosage_form,
+            "strength": best_drug.strength,
+            "nafdac_reg_no": best_drug.nafdac_reg_no,
+            "manufacturer": best_drug.manufacturer,
             "match_score": int(best_score),
             "confidence": "high" if best_score >= 85 else "medium" if best_score >= 70 else "low",
-            "pil_id": best_drug.get("nexahealth_id"),
-            "last_verified": best_drug.get("approval", {}).get("approval_date"),
+            "pil_id": best_drug.nexahealth_id,
+            "last_verified": best_drug.approval_date,
             "match_details": match_details,
             "possible_matches": possible_matches,
             "requires_confirmation": requires_confirmation,
@@ -601,7 +928,7 @@ class DrugVerificationEngine:
             "verification_notes": self._generate_notes(inputs, best_drug, best_score)
         }
 
-    def _generate_notes(self, inputs: Dict, best_drug: Dict, score: float) -> List[str]:
+    def _generate_notes(self, inputs: Dict, best_drug: DrugRecord, score: float) -> List[str]:
         """Generate helpful verification notes"""
         notes = []
         
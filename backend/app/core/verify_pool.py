@@ -0,0 +1,81 @@
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.core.verify_engine import DrugVerificationEngine
+from app.core.verify_snapshot import SNAPSHOT_PATH, load_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Local scoring for batch verification, spread over worker processes that
+# each load the engine snapshot once. Processes come from a forkserver, not
+# fork(): a serving worker has gRPC and executor threads that a fork would
+# copy mid-state. Set VERIFY_BATCH_WORKERS=0 to score batches in a thread.
+
+VERIFY_BATCH_WORKERS = int(os.getenv("VERIFY_BATCH_WORKERS", min(4, os.cpu_count() or 1)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_version: Optional[str] = None
+_failed_version: Optional[str] = None
+
+# Set in pool processes only
+_engine: Optional[DrugVerificationEngine] = None
+
+
+class StaleWorkerEngine(RuntimeError):
+    """A pool process holds another dataset version than the one being served"""
+
+
+def _init_worker(path: str) -> None:
+    global _engine
+    loaded = load_snapshot(Path(path))
+    _engine = loaded[0] if loaded else None
+
+
+def verify_local(dataset_version: str, request: Dict) -> Optional[Dict]:
+    """engine.verify_drug_local in a pool process, for the given dataset version"""
+    if _engine is None or _engine.dataset_version != dataset_version:
+        loaded = _engine.dataset_version if _engine is not None else None
+        raise StaleWorkerEngine(f"Worker engine is v{loaded}, batch needs v{dataset_version}")
+    return _engine.verify_drug_local(request)
+
+
+def get_pool(dataset_version: str, path: Path = SNAPSHOT_PATH) -> Optional[ProcessPoolExecutor]:
+    """
+    Pool whose processes load the snapshot at path, which must hold
+    dataset_version. Recreated when the version changes; None when disabled,
+    unsupported here, or already failed for this version.
+    """
+    global _pool, _pool_version
+    if VERIFY_BATCH_WORKERS < 1 or "forkserver" not in multiprocessing.get_all_start_methods():
+        return None
+    if dataset_version == _failed_version:
+        return None
+    if _pool is None or _pool_version != dataset_version:
+        shutdown()
+        _pool = ProcessPoolExecutor(
+            max_workers=VERIFY_BATCH_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver"),
+            initializer=_init_worker,
+            initargs=(str(path),)
+        )
+        _pool_version = dataset_version
+    return _pool
+
+
+def mark_failed(dataset_version: str, reason: Exception) -> None:
+    """Stop using pools for this version (e.g. the snapshot on disk changed); callers fall back to threads"""
+    global _failed_version
+    logger.warning(f"Batch verification pool unusable for v{dataset_version}, scoring in threads: {reason}")
+    _failed_version = dataset_version
+    shutdown()
+
+
+def shutdown() -> None:
+    global _pool, _pool_version
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool, _pool_version = None, None
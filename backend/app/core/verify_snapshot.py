@@ -0,0 +1,134 @@
+import os
+import pickle
+import hashlib
+import tempfile
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple, Any
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, every worker refreshes on its own
+    fcntl = None
+
+from app.core.verify_engine import DrugVerificationEngine
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the engine's index/column layout changes so stale snapshots are ignored
+SNAPSHOT_FORMAT = 1
+
+DEFAULT_SNAPSHOT_PATH = Path(__file__).parent.parent / "data" / "verify_engine.snapshot"
+SNAPSHOT_PATH = Path(os.getenv("VERIFY_SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH))
+
+
+def save_snapshot(engine: DrugVerificationEngine, path: Path = SNAPSHOT_PATH, *,
+                  exported_at: datetime, source: str = "", source_sha256: str = "") -> Dict[str, Any]:
+    """
+    Write the engine's records and prebuilt indexes to disk.
+    The header is pickled separately so it can be read without loading the body.
+    exported_at is when its data was read from Firestore (for a JSON source,
+    when that was exported); Firestore changes after it are fetched as deltas.
+    """
+    ids = [r.nexahealth_id for r in engine.drug_db if isinstance(r.nexahealth_id, int)]
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "version": engine.dataset_version,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "exported_at": exported_at.isoformat(),
+        "source": source,
+        "source_sha256": source_sha256,
+        "drug_count": len(engine.drug_db),
+        "max_nexahealth_id": max(ids) if ids else 0
+    }
+    body = {
+        "drug_db": engine.drug_db,
+        "indexes": engine.indexes,
+        "columns": engine.columns
+    }
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique temp file per writer, so concurrent saves never interleave in one file
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp", delete=False) as f:
+        tmp_path = Path(f.name)
+        try:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(body, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except BaseException:
+            f.close()
+            tmp_path.unlink(missing_ok=True)
+            raise
+    os.replace(tmp_path, path)  # atomic: readers never see a partial file
+
+    logger.info(f"Saved verification snapshot v{meta['version']} ({meta['drug_count']} drugs) to {path}")
+    return meta
+
+
+@contextmanager
+def snapshot_lock(path: Path = SNAPSHOT_PATH) -> Iterator[None]:
+    """
+    Exclusive lock, across the processes on this host, on refreshing the
+    snapshot at path: the first worker to start fetches deltas and rewrites
+    it, the others wait and then load the refreshed file.
+    """
+    if fcntl is None:
+        yield
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + ".lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_snapshot_meta(path: Path = SNAPSHOT_PATH) -> Optional[Dict[str, Any]]:
+    """Read only the snapshot header, or None if missing/unreadable"""
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Unreadable verification snapshot {path}: {e}")
+        return None
+
+
+def load_snapshot(path: Path = SNAPSHOT_PATH) -> Optional[Tuple[DrugVerificationEngine, Dict[str, Any]]]:
+    """Load an engine from a snapshot; returns None if missing or of another format"""
+    try:
+        with open(path, "rb") as f:
+            meta = pickle.load(f)
+            if meta.get("format") != SNAPSHOT_FORMAT:
+                logger.warning(
+                    f"Ignoring verification snapshot format {meta.get('format')} "
+                    f"(expected {SNAPSHOT_FORMAT}); rebuild it"
+                )
+                return None
+            body = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Failed to load verification snapshot {path}: {e}")
+        return None
+
+    engine = DrugVerificationEngine(
+        drug_db=body["drug_db"],
+        indexes=body["indexes"],
+        columns=body["columns"],
+        dataset_version=meta["version"]
+    )
+    return engine, meta
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
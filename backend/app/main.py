@@ -1,9 +1,15 @@
 # app/main.py
+import asyncio
+import gc
+import time
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from app.core.middleware import AuthMiddleware
 from app.core.db import firebase_manager
+from app.core.drug_catalog import get_catalog, catalog_stats, UNIFIED_DRUGS_PATH
+from app.core import pils_manager, nlp, ml
+from app.core.pil_interactions import interaction_recorder
 
 load_dotenv()
 
@@ -40,7 +46,7 @@ from app.routers import (
     auth, guest, verify, report, map, nearby, 
     ai_companion, feedback, pils, dashboard, test_verify, test_report, test_pil,
     count, referral, whatsapp, pharmacy_auth, pharmacy_email, pharmacy_profile, user_pharmacies,
-    nearby, pharmacy_report
+    nearby, pharmacy_report, risk
 )
 
 app.include_router(auth.router)
@@ -66,6 +72,89 @@ app.include_router(pharmacy_email.router, prefix="/pharmacy")
 app.include_router(user_pharmacies.router)
 app.include_router(nearby.router)
 app.include_router(pharmacy_report.router)
+app.include_router(risk.router)
+
+# Set by preload_catalogs: catalogs were built before fork, workers only read them
+preloaded = False
+
+def preload_catalogs():
+    """
+    Build the immutable catalogs in this process before workers are forked
+    (see run.py), then freeze the GC heap so collections in the workers do
+    not write to, and so un-share, the inherited pages. Firestore deltas are
+    merged into the verification engine here, once, so workers only read it
+    (run.py enables gRPC fork support for the channel this opens).
+    """
+    global preloaded
+    steps = [
+        ("verification engine", lambda: verify.engine or verify.load_engine_snapshot()),
+        ("drug catalog", lambda: get_catalog(UNIFIED_DRUGS_PATH).drugs),
+        ("test_verify indexes", test_verify.get_indexed_drugs),
+        ("PILs", lambda: pils_manager.pil_manager.summaries),
+        ("PIL responses", pils_manager.pil_manager.warm_from_env),
+        ("spaCy pipeline", nlp.warm_up),
+        ("symptom classifier", ml.load_symptom_classifier),
+    ]
+    for name, load in steps:
+        start = time.perf_counter()
+        try:
+            load()
+            print(f"Preloaded {name} in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            print(f"Preloading {name} failed: {e}")
+
+    preloaded = True
+    gc.collect()
+    gc.freeze()
+
+@app.on_event("startup")
+async def preload_verification_engine():
+    # Only loads from the on-disk snapshot; a full Firestore load stays lazy.
+    # An engine preloaded before fork already has its deltas and is left as is
+    try:
+        if verify.engine is None:
+            await asyncio.to_thread(verify.load_engine_snapshot)
+    except Exception as e:
+        print(f"Verification snapshot preload failed: {e}")
+
+@app.on_event("startup")
+async def warm_pil_responses():
+    # Rendered before fork when preloaded: rendering here would un-share the pages
+    if preloaded:
+        return
+    try:
+        start = time.perf_counter()
+        count = pils_manager.pil_manager.warm_from_env()
+        print(f"Pre-rendered {count} PIL responses in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        print(f"PIL response warm-up failed: {e}")
+
+@app.on_event("startup")
+async def warm_risk_classifier():
+    # Without PRELOAD, build it at startup rather than in the first risk request
+    if preloaded:
+        return
+    try:
+        start = time.perf_counter()
+        ml.load_symptom_classifier()
+        print(f"Loaded symptom classifier in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        print(f"Symptom classifier warm-up failed: {e}")
+
+@app.on_event("startup")
+async def report_drug_catalogs():
+    # Runs after the warm-up hooks: reports every catalog loaded so far
+    for stats in catalog_stats():
+        if not stats["loaded"]:
+            continue
+        rss = f", +{stats['load_rss_mb']} MB RSS" if stats["load_rss_mb"] is not None else ""
+        print(f"Drug catalog {stats['path']}: {stats['drugs']} drugs, loaded in {stats['load_seconds']}s{rss}")
+
+@app.on_event("shutdown")
+async def flush_pil_interactions():
+    # Buffered view counts (write-behind) must reach the store before the worker exits
+    flushed = await asyncio.to_thread(interaction_recorder.flush)
+    print(f"Flushed {flushed} pending PIL interactions")
 
 # Static files
 from fastapi.staticfiles import StaticFiles
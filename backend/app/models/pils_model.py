@@ -109,6 +109,21 @@ class PILInDB(PILBase):
     def __hash__(self):
         return hash(self.id)
 
+class PILSummary(BaseModel):
+    """Search and list projection of a PIL; the full leaflet is PILInDB"""
+    id: str
+    nexahealth_id: int
+    product_name: str
+    generic_name: str
+    dosage_form: str
+    strength: str
+    description: Optional[str] = ""
+    category: Optional[DrugCategory] = None
+    identifiers: Optional[Identifiers] = Field(default_factory=Identifiers)
+    manufacturer: Optional[Manufacturer] = Field(default_factory=Manufacturer)
+    featured: Optional[bool] = False
+    tags: Optional[List[str]] = Field(default_factory=list)
+
 class UserInteractionBase(BaseModel):
     user_id: str
     pil_id: str
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, validator
 from typing import List, Optional
 
 class SuggestedDrug(BaseModel):
@@ -9,11 +9,21 @@ class SuggestedDrug(BaseModel):
 class SymptomInput(BaseModel):
     symptoms: str
 
+MAX_BATCH_INPUTS = 200
+
+class BatchSymptomInput(BaseModel):
+    inputs: List[SymptomInput] = Field(..., description="Symptom descriptions to assess in one batch")
+
+    @validator("inputs")
+    def check_batch_size(cls, v):
+        if not v:
+            raise ValueError("Batch must contain at least one input")
+        if len(v) > MAX_BATCH_INPUTS:
+            raise ValueError(f"Batch cannot exceed {MAX_BATCH_INPUTS} inputs")
+        return v
+
 class RiskPredictionResponse(BaseModel):
     matched_keywords: Optional[List[str]] = []
     risk: str
     risk_score: int
     suggested_drugs: List[SuggestedDrug]
-
-
-
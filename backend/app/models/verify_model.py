@@ -43,6 +43,19 @@ class DrugVerificationRequest(BaseModel):
     dosage_form: Optional[str] = Field(None, description="Tablet, syrup, capsule, etc.")
     strength: Optional[str] = Field(None, description="Dosage strength")
 
+MAX_BATCH_ITEMS = 500
+
+class BatchDrugVerificationRequest(BaseModel):
+    items: List[DrugVerificationRequest] = Field(..., description="Drugs to verify in one batch")
+
+    @validator("items")
+    def check_batch_size(cls, v):
+        if not v:
+            raise ValueError("Batch must contain at least one item")
+        if len(v) > MAX_BATCH_ITEMS:
+            raise ValueError(f"Batch cannot exceed {MAX_BATCH_ITEMS} items")
+        return v
+
 class DrugVerificationResponse(BaseModel):
     status: VerificationStatus
     message: str
@@ -61,6 +74,8 @@ class DrugVerificationResponse(BaseModel):
     requires_confirmation: bool = False
     requires_nafdac: bool = False
     verification_notes: List[str] = []
+    # The Firestore fallback was needed but failed: "unknown" may not be a real miss
+    remote_lookup_failed: bool = False
     
     class Config:
         use_enum_values = True
@@ -1,6 +1,7 @@
 # diagnosis.py
 from fastapi import APIRouter
-from app.core.ml import calculate_risk, verified_drugs
+from app.core.ml import calculate_risk
+from app.core.drug_catalog import get_catalog, VERIFIED_DRUGS_PATH
 from app.models.diagnosis_model import SymptomInput, SuggestedDrug, DiagnosisResponse
 
 router = APIRouter()
@@ -12,10 +13,7 @@ async def diagnose(request: SymptomInput):
     suggested_drugs = []
 
     for drug_name in result["recommended_drugs"]:
-        match = next(
-            (drug for drug in verified_drugs if drug["product_name"].lower() == drug_name.lower()),
-            None
-        )
+        match = get_catalog(VERIFIED_DRUGS_PATH).find_by_product_name(drug_name)
         if match:
             use_case = f"Used for treatment involving: {', '.join(match.get('ingredients', []))}"
             suggested_drugs.append(SuggestedDrug(
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
 from typing import Optional, List, Dict
 from fastapi.security import OAuth2PasswordBearer
-from app.models.pils_model import PILInDB, UserInteractionBase, UserInteractionInDB
+from app.models.pils_model import PILInDB, PILSummary, UserInteractionBase, UserInteractionInDB
 from app.core.pils_manager import pil_manager
+from app.core.http_cache import cached_json_response
 from app.models.pils_model import DrugCategory
 from app.models.auth_model import UserInDB
 from app.core.auth import get_current_active_user
 from datetime import datetime
+import asyncio
 import logging
 
 router = APIRouter(
@@ -27,12 +29,17 @@ async def search_pils(
     manufacturer: Optional[str] = Query(None, description="Filter by manufacturer"),
     dosage_form: Optional[str] = Query(None, description="Filter by dosage form"),
     nafdac_no: Optional[str] = Query(None, description="Search by NAFDAC registration number"),
-    limit: int = Query(10, ge=1, le=100, description="Maximum number of results")
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of results"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    full_text: bool = Query(False, description="Also return weaker full-text matches (e.g. on indications)")
 ):
     """
     Search drug leaflets by:
     - NAFDAC number (most accurate, unique)
     - or fallback to fuzzy search (names, generic, etc.)
+    - with full_text=true, also leaflets that only mention the search words
+      elsewhere (description, indications), after the name matches
+    Results are PIL summaries; GET /api/pils/{pil_id} returns the full leaflet.
     """
     try:
         search_result = pil_manager.search_pils(
@@ -41,21 +48,25 @@ async def search_pils(
             manufacturer=manufacturer,
             dosage_form=dosage_form,
             nafdac_no=nafdac_no,
-            limit=limit
+            limit=limit,
+            cursor=cursor,
+            full_text=full_text
         )
         
-        response = {"results": search_result["results"]}
+        response = {"results": search_result["results"], "next_cursor": search_result["next_cursor"]}
         if search_result["suggestions"]:
             response["suggestions"] = search_result["suggestions"]
             logger.info(f"Suggestions for '{search}': {search_result['suggestions']}")
         
         return response
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     except Exception as e:
         logger.error(f"Search error: {str(e)}")
         raise HTTPException(status_code=500, detail="Error searching drug leaflets")
 
 
-@router.get("/featured", response_model=List[PILInDB])
+@router.get("/featured", response_model=List[PILSummary])
 async def get_featured_pils(
     limit: int = Query(5, ge=1, le=10, description="Number of featured leaflets")
 ):
@@ -66,12 +77,13 @@ async def get_featured_pils(
         raise HTTPException(status_code=500, detail="Error getting featured leaflets")
 
 @router.get("/{pil_id}", response_model=PILInDB)
-async def get_pil_details(pil_id: str):
+async def get_pil_details(pil_id: str, request: Request):
+    # Pre-rendered JSON with an ETag: unchanged leaflets revalidate as a bodiless 304
     try:
-        pil = pil_manager.get_pil(pil_id)
-        if not pil:
+        rendered = pil_manager.get_rendered_pil(pil_id)
+        if not rendered:
             raise HTTPException(status_code=404, detail="Drug leaflet not found")
-        return pil
+        return cached_json_response(request, rendered.etag, rendered.body_gzip)
     except HTTPException:
         raise
     except Exception as e:
@@ -79,20 +91,21 @@ async def get_pil_details(pil_id: str):
         raise HTTPException(status_code=500, detail="Error getting leaflet details")
 
 # Authenticated endpoints - require valid user token
-@router.get("/recent", response_model=List[PILInDB])
+@router.get("/recent", response_model=List[PILSummary])
 async def get_recently_viewed(
     limit: int = Query(10, ge=1, le=20),
     current_user: UserInDB = Depends(get_current_active_user)
 ):
     try:
-        interactions = pil_manager.get_user_interactions(
+        interactions = await asyncio.to_thread(
+            pil_manager.get_user_interactions,
             user_id=current_user.id,
             saved=False,
             limit=limit
         )
         pils = []
         for interaction in interactions:
-            pil = pil_manager.get_pil(interaction.pil_id)
+            pil = pil_manager.get_summary(interaction.pil_id)
             if pil:
                 pils.append(pil)
         return pils
@@ -100,13 +113,14 @@ async def get_recently_viewed(
         logger.error(f"Recent error: {str(e)}")
         raise HTTPException(status_code=500, detail="Error getting recently viewed")
 
-@router.get("/saved", response_model=List[PILInDB])
+@router.get("/saved", response_model=List[PILSummary])
 async def get_saved_pils(
     limit: int = Query(10, ge=1, le=20),
     current_user: UserInDB = Depends(get_current_active_user)
 ):
     try:
-        interactions = pil_manager.get_user_interactions(
+        interactions = await asyncio.to_thread(
+            pil_manager.get_user_interactions,
             user_id=current_user.id,
             saved=True,
             limit=limit
@@ -114,7 +128,7 @@ async def get_saved_pils(
         
         pils = []
         for interaction in interactions:
-            pil = pil_manager.get_pil(interaction.pil_id)
+            pil = pil_manager.get_summary(interaction.pil_id)
             if pil:
                 pils.append(pil)
                 
@@ -133,7 +147,7 @@ async def record_pil_view(
 ):
     try:
         # Verify PIL exists
-        if not pil_manager.get_pil(pil_id):
+        if not pil_manager.has_pil(pil_id):
             raise HTTPException(status_code=404, detail="Drug leaflet not found")
         
         interaction = UserInteractionBase(
@@ -142,7 +156,7 @@ async def record_pil_view(
             last_viewed=datetime.now(),
             view_count=1
         )
-        return pil_manager.record_interaction(interaction)
+        return await asyncio.to_thread(pil_manager.record_interaction, interaction)
     except HTTPException:
         raise
     except Exception as e:
@@ -156,20 +170,18 @@ async def save_pil(
 ):
     try:
         # Verify PIL exists
-        if not pil_manager.get_pil(pil_id):
+        if not pil_manager.has_pil(pil_id):
             raise HTTPException(status_code=404, detail="Drug leaflet not found")
         
-        # First get existing interaction if any
-        existing = pil_manager.get_user_interaction(current_user.id, pil_id)
-        
+        # view_count is added to the stored count, so saving counts as one more view
         interaction = UserInteractionBase(
             user_id=current_user.id,
             pil_id=pil_id,
             saved=True,
             last_viewed=datetime.now(),
-            view_count=existing.view_count + 1 if existing else 1
+            view_count=1
         )
-        return pil_manager.record_interaction(interaction)
+        return await asyncio.to_thread(pil_manager.record_interaction, interaction)
     except HTTPException:
         raise
     except Exception as e:
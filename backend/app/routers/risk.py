@@ -1,14 +1,14 @@
 from app.models.guest_model import GuestSession
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Cookie, Response, Header
-from app.core.symptom_matcher import diagnose
-from app.models.risk_model import SymptomInput, SuggestedDrug, RiskPredictionResponse
+from app.core.symptom_matcher import diagnose, diagnose_batch
+from app.models.risk_model import SymptomInput, BatchSymptomInput, SuggestedDrug, RiskPredictionResponse
 from app.dependencies.auth import guest_or_auth
-from functools import lru_cache
-import json
-from pathlib import Path
+from app.core.auth import get_current_active_user
+from app.models.auth_model import UserInDB
+from app.core.drug_catalog import DrugCatalog, get_catalog, VERIFIED_DRUGS_PATH
 from datetime import datetime
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
 from app.core.guest import (
     load_guest_session,
     increment_guest_usage,
@@ -18,13 +18,10 @@ from fastapi.responses import JSONResponse
 
 router = APIRouter()
 
-@lru_cache(maxsize=1)
-def load_verified_drugs():
-    drugs_file = Path(__file__).parent.parent.parent / "app" / "data" / "verified_drugs.json"
-    with open(drugs_file, "r") as f:
-        return json.load(f)
+def load_verified_drugs() -> DrugCatalog:
+    return get_catalog(VERIFIED_DRUGS_PATH)
 
-def get_suggested_drugs(result, verified_drugs):
+def get_suggested_drugs(result, verified_drugs: DrugCatalog):
     suggested_drugs = []
     processed_drugs = set()
     for symptom in result["matched_symptoms"]:
@@ -33,10 +30,7 @@ def get_suggested_drugs(result, verified_drugs):
             if not clean_name or len(clean_name) <= 1 or clean_name.lower() in processed_drugs:
                 continue
             processed_drugs.add(clean_name.lower())
-            match = next(
-                (d for d in verified_drugs if d["product_name"].lower() == clean_name.lower()),
-                None
-            )
+            match = verified_drugs.find_by_product_name(clean_name)
             suggested_drugs.append(
                 SuggestedDrug(
                     name=match["product_name"] if match else clean_name,
@@ -46,6 +40,14 @@ def get_suggested_drugs(result, verified_drugs):
             )
     return suggested_drugs
 
+def build_risk_response(result, verified_drugs: DrugCatalog) -> RiskPredictionResponse:
+    return RiskPredictionResponse(
+        risk=result["risk_level"],
+        risk_score=result["highest_risk_score"],
+        matched_keywords=[s["matched_symptom"] for s in result["matched_symptoms"]],
+        suggested_drugs=get_suggested_drugs(result, verified_drugs)
+    )
+
 @router.post("/predict-risk", response_model=RiskPredictionResponse)
 async def predict_risk(
     request: SymptomInput,
@@ -70,13 +72,7 @@ async def predict_risk(
         response.delete_cookie("guest_session_id")
         verified_drugs = load_verified_drugs()
         result = diagnose([request.symptoms])
-
-        return RiskPredictionResponse(
-            risk=result["risk_level"],
-            risk_score=result["highest_risk_score"],
-            matched_keywords=[s["matched_symptom"] for s in result["matched_symptoms"]],
-            suggested_drugs=get_suggested_drugs(result, verified_drugs)
-        )
+        return build_risk_response(result, verified_drugs)
 
     guest_session: GuestSession = identity
     current_session_id = guest_session.id
@@ -119,3 +115,24 @@ async def predict_risk(
             )
         }
     )
+
+@router.post("/predict-risk/batch", response_model=List[RiskPredictionResponse])
+async def predict_risk_batch(
+    request: BatchSymptomInput,
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    """
+    Risk assessment for many symptom descriptions at once, e.g. queued
+    inputs from several users. All inputs go through one nlp.pipe call;
+    results are returned in input order. Signed-in users only.
+    """
+    try:
+        verified_drugs = load_verified_drugs()
+        results = diagnose_batch([[item.symptoms] for item in request.inputs])
+        return [build_risk_response(result, verified_drugs) for result in results]
+    except Exception as e:
+        print(f"Error processing symptom batch: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error analyzing symptoms"
+        )
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
 from typing import Optional, List, Dict
 from fastapi.security import OAuth2PasswordBearer
-from app.models.pils_model import PILInDB, UserInteractionBase, UserInteractionInDB
+from app.models.pils_model import PILInDB, PILSummary, UserInteractionBase, UserInteractionInDB
 from app.core.pils_manager import pil_manager
+from app.core.http_cache import cached_json_response
 from app.models.pils_model import DrugCategory
 from app.models.auth_model import UserInDB
 from app.core.auth import get_current_active_user
@@ -29,13 +30,16 @@ async def search_pils(
     dosage_form: Optional[str] = Query(None,
                                      description="Filter by dosage form"),
     limit: int = Query(10, ge=1, le=100, 
-                      description="Maximum number of results")
+                      description="Maximum number of results"),
+    cursor: Optional[str] = Query(None,
+                                  description="next_cursor from the previous page")
 ):
     """
     Search drug leaflets with fuzzy matching.
     Returns:
     {
-        "results": List[PILInDB],
+        "results": List[PILSummary],
+        "next_cursor": Optional[str] (pass as cursor for the next page),
         "suggestions": List[str] (optional spelling suggestions)
     }
     """
@@ -45,20 +49,23 @@ async def search_pils(
             category=category.value if category else None,
             manufacturer=manufacturer,
             dosage_form=dosage_form,
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
         
-        response = {"results": search_result["results"]}
+        response = {"results": search_result["results"], "next_cursor": search_result["next_cursor"]}
         if search_result["suggestions"]:
             response["suggestions"] = search_result["suggestions"]
             logger.info(f"Suggestions for '{search}': {search_result['suggestions']}")
         
         return response
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     except Exception as e:
         logger.error(f"Search error: {str(e)}")
         raise HTTPException(status_code=500, detail="Error searching drug leaflets")
 
-@router.get("/featured", response_model=List[PILInDB])
+@router.get("/featured", response_model=List[PILSummary])
 async def get_featured_pils(
     limit: int = Query(5, ge=1, le=10, description="Number of featured leaflets")
 ):
@@ -69,12 +76,13 @@ async def get_featured_pils(
         raise HTTPException(status_code=500, detail="Error getting featured leaflets")
 
 @router.get("/{pil_id}", response_model=PILInDB)
-async def get_pil_details(pil_id: str):
+async def get_pil_details(pil_id: str, request: Request):
+    # Pre-rendered JSON with an ETag: unchanged leaflets revalidate as a bodiless 304
     try:
-        pil = pil_manager.get_pil(pil_id)
-        if not pil:
+        rendered = pil_manager.get_rendered_pil(pil_id)
+        if not rendered:
             raise HTTPException(status_code=404, detail="Drug leaflet not found")
-        return pil
+        return cached_json_response(request, rendered.etag, rendered.body_gzip)
     except HTTPException:
         raise
     except Exception as e:
@@ -1,7 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends
 from typing import Optional, List, Dict, Tuple
-import json
-from pathlib import Path
 from datetime import datetime
 from fastapi.security import OAuth2PasswordBearer
 from app.models.verify_model import (
@@ -12,10 +10,12 @@ from app.models.verify_model import (
     SimpleDrugVerificationRequest
 )
 from rapidfuzz import fuzz, process
+from app.core.normalize import normalize_label_text, canonical_nafdac
+from app.core.nafdac_index import NafdacIndex
+from app.core.trigram_index import TrigramIndex
+from app.core.drug_catalog import get_catalog, UNIFIED_DRUGS_PATH
 import logging
 import re
-from collections import defaultdict
-import string
 from functools import lru_cache
 
 router = APIRouter(
@@ -26,16 +26,9 @@ router = APIRouter(
 
 logger = logging.getLogger(__name__)
 
-# Load drug database with error handling
-DRUG_DB_FILE = Path(__file__).parent.parent / "data" / "unified_drugs_with_pils_v.json"
-
-try:
-    with open(DRUG_DB_FILE, encoding="utf-8") as f:
-        content = f.read().strip()
-        drug_db = json.loads(content) if content else []
-except (json.JSONDecodeError, FileNotFoundError) as e:
-    logger.error(f"Failed to load drug database: {e}")
-    drug_db = []
+# Drug database, shared with the PIL modules (load errors are logged and yield an empty catalog)
+DRUG_DB_FILE = UNIFIED_DRUGS_PATH
+drug_db = get_catalog(DRUG_DB_FILE).drugs
 
 # Enhanced common name mappings with Nigerian-specific variations
 COMMON_NAME_MAPPINGS = {
@@ -61,66 +54,92 @@ MANUFACTURER_VARIANTS = {
     "swiss pharma": ["swiss pharmaceutical"]
 }
 
+# Candidate bounds: drugs per NAFDAC lookup, per name variant, and suggestion pool size
+PARTIAL_REG_LIMIT = 50
+NAME_CANDIDATE_LIMIT = 50
+SUGGESTION_POOL_LIMIT = 200
+
 # Preprocess and index the drug database
 @lru_cache(maxsize=1)
 def get_indexed_drugs():
-    """Create optimized indexes for faster searching"""
-    indexed = {
-        "name_index": defaultdict(list),
-        "reg_index": {},
-        "manufacturer_index": defaultdict(list),
-        "generic_index": defaultdict(list)
-    }
-    
+    """
+    Candidate indexes over the drug database: the shared NAFDAC index
+    (exact, prefix and typo-tolerant lookups, as used by the engine and
+    PILs), generic-name words -> drug_db rows, and trigram postings of
+    product names, per drug (in drug_db order) and per distinct name (for
+    suggestions).
+    """
+    nafdac_index = NafdacIndex(
+        (drug.get("identifiers", {}).get("nafdac_reg_no"), drug) for drug in drug_db
+    )
+
+    generic_index = {}
+    for row, drug in enumerate(drug_db):
+        for part in dict.fromkeys(normalize_text(drug.get("generic_name", "")).split()):
+            generic_index.setdefault(part, []).append(row)
+    normalized_names = [normalize_text(drug.get("product_name", "")) for drug in drug_db]
+
+    # Name list for fuzzy suggestions, and each name's first drug
+    drug_by_name = {}
     for drug in drug_db:
-        # Index by name parts
-        name = drug.get("product_name", "").lower()
-        for part in name.split():
-            indexed["name_index"][part].append(drug)
-        
-        # Index by registration number
-        raw_reg = drug.get("identifiers", {}).get("nafdac_reg_no", "").lower()
-        clean_reg = re.sub(r"[-/ ]", "", raw_reg)
-        if clean_reg:
-            indexed["reg_index"][clean_reg] = drug
-
-        if reg_no := drug.get("identifiers", {}).get("nafdac_reg_no", "").lower():
-            reg_key = re.sub(r"[-/ ]", "", reg_no)
-            indexed["reg_index"][reg_key] = drug
-        
-        # Index by manufacturer
-        if manu := drug.get("manufacturer", {}).get("name", "").lower():
-            indexed["manufacturer_index"][manu].append(drug)
-        
-        # Index by generic name parts
-        if generic := drug.get("generic_name", "").lower():
-            for part in generic.split():
-                indexed["generic_index"][part].append(drug)
-    
-    return indexed
+        if drug.get("product_name"):
+            drug_by_name.setdefault(drug["product_name"], drug)
+    product_names = list(drug_by_name)
+
+    return {
+        "nafdac_index": nafdac_index,
+        "nafdac_max_len": max(map(len, nafdac_index.keys), default=0),
+        "generic_index": generic_index,
+        "normalized_names": normalized_names,
+        "name_trigrams": TrigramIndex(normalized_names),
+        "drug_by_name": drug_by_name,
+        "product_names": product_names,
+        "product_name_trigrams": TrigramIndex(map(normalize_text, product_names))
+    }
+
+def find_name_matches(name: str, indexes: Dict, limit: int = NAME_CANDIDATE_LIMIT) -> List[Dict]:
+    """Drugs whose product names share the most trigrams with name, best first"""
+    return [drug_db[row] for row in indexes["name_trigrams"].search(name, limit=limit)]
+
+def find_generic_matches(name: str, indexes: Dict, limit: int = NAME_CANDIDATE_LIMIT) -> List[Dict]:
+    """
+    Drugs whose generic name contains a word of name. Per word, at most
+    limit drugs: those whose product names best match name (token set ratio).
+    """
+    names = indexes["normalized_names"]
+    rows = {}
+    for part in name.split():
+        posting = indexes["generic_index"].get(part, [])
+        if len(posting) > limit:
+            ranked = process.extract(name, {row: names[row] for row in posting},
+                                     scorer=fuzz.token_set_ratio, limit=limit)
+            posting = sorted(row for _, _, row in ranked)
+        rows.update(dict.fromkeys(posting))
+    return [drug_db[row] for row in rows]
+
+def find_partial_reg_matches(reg_key: str, indexes: Dict, limit: int = PARTIAL_REG_LIMIT) -> List[Dict]:
+    """
+    Drugs whose canonical registration number starts with reg_key, contains
+    it, or occurs inside it (e.g. "NAFDACA41234"), through the NAFDAC index.
+    """
+    nafdac_index = indexes["nafdac_index"]
+    keys = dict.fromkeys(nafdac_index.prefix(reg_key, limit=limit))
+    for key in nafdac_index.contains(reg_key, limit=limit):
+        if len(keys) >= limit:
+            break
+        keys.setdefault(key)
+
+    # Registration numbers inside the input: exact lookups of its substrings
+    for start in range(len(reg_key)):
+        for end in range(start + 1, min(len(reg_key), start + indexes["nafdac_max_len"]) + 1):
+            if nafdac_index.values(reg_key[start:end]):
+                keys.setdefault(reg_key[start:end])
+
+    return [drug for key in list(keys)[:limit] for drug in nafdac_index.values(key)]
 
 def normalize_text(text: str) -> str:
     """Normalize text for matching"""
-    if not text:
-        return ""
-    
-    # Remove punctuation and special characters
-    text = re.sub(f"[{string.punctuation}]", "", text.lower())
-    
-    # Common Nigerian drug name normalizations
-    replacements = {
-        "tab": "tablet",
-        "cap": "capsule",
-        "susp": "suspension",
-        "inj": "injection",
-        "supp": "suppository",
-        "pcm": "paracetamol"
-    }
-    
-    for short, long in replacements.items():
-        text = re.sub(rf"\b{short}\b", long, text)
-    
-    return text.strip()
+    return normalize_label_text(text)
 
 def expand_common_names(input_name: str) -> List[str]:
     """Expand common drug names to their possible variants"""
@@ -227,10 +246,13 @@ async def verify_drug(request: SimpleDrugVerificationRequest):
 
         indexes = get_indexed_drugs()
 
+        reg_key = canonical_nafdac(request.nafdac_reg_no)
+        reg_matches = indexes["nafdac_index"].values(reg_key)
+        exact_reg_match = reg_matches[-1] if reg_matches else None  # last listed wins
+
         # ✅ Handle NAFDAC-only lookup directly
         if input_reg and not input_name:
-            normalized_reg = re.sub(r"[-/ ]", "", input_reg.lower())
-            drug = indexes["reg_index"].get(normalized_reg)
+            drug = exact_reg_match
             if drug:
                 return DrugVerificationResponse(
                     status=VerificationStatus(drug.get("verification", {}).get("status", "unknown")),
@@ -260,40 +282,37 @@ async def verify_drug(request: SimpleDrugVerificationRequest):
         seen_ids = set()
 
         # 🟢 1. NAFDAC match (exact)
-        if input_reg:
-            normalized_reg = re.sub(r"[-/ ]", "", input_reg.lower())
-            if exact_reg_match := indexes["reg_index"].get(normalized_reg):
-                potential_matches.append(exact_reg_match)
-                seen_ids.add(exact_reg_match["nexahealth_id"])
+        if input_reg and exact_reg_match:
+            potential_matches.append(exact_reg_match)
+            seen_ids.add(exact_reg_match["nexahealth_id"])
 
-        # 🟢 2. Product name matches (name index + generic index)
+        # 🟢 2. Product name matches (trigram index, for the name and its common variants)
+        #    and generic name matches (generic-name word index)
         if input_name:
-            for part in input_name.split():
-                for drug in indexes["name_index"].get(part, []):
+            for variant in expand_common_names(input_name):
+                for drug in find_name_matches(variant, indexes):
                     if drug["nexahealth_id"] not in seen_ids:
                         potential_matches.append(drug)
                         seen_ids.add(drug["nexahealth_id"])
-            if " " in input_name:
-                for part in input_name.split():
-                    for drug in indexes["generic_index"].get(part, []):
-                        if drug["nexahealth_id"] not in seen_ids:
-                            potential_matches.append(drug)
-                            seen_ids.add(drug["nexahealth_id"])
+            for drug in find_generic_matches(input_name, indexes):
+                if drug["nexahealth_id"] not in seen_ids:
+                    potential_matches.append(drug)
+                    seen_ids.add(drug["nexahealth_id"])
 
         # 🟡 3. Partial NAFDAC match (if exact wasn't found above)
-        if input_reg and not exact_reg_match:
-            for reg_no, drug in indexes["reg_index"].items():
-                if (input_reg in reg_no or reg_no in input_reg) and drug["nexahealth_id"] not in seen_ids:
+        if reg_key and not exact_reg_match:
+            for drug in find_partial_reg_matches(reg_key, indexes):
+                if drug["nexahealth_id"] not in seen_ids:
                     potential_matches.append(drug)
                     seen_ids.add(drug["nexahealth_id"])
 
-        # 🔴 4. Fallback: use entire DB only if still empty
-        if not potential_matches:
-            potential_matches = drug_db
-
-
-        if not potential_matches:
-            potential_matches = drug_db
+            # Typo'd numbers: within two edits of a registered number
+            nafdac_index = indexes["nafdac_index"]
+            for key, _ in nafdac_index.fuzzy(reg_key, max_distance=2, limit=PARTIAL_REG_LIMIT):
+                for drug in nafdac_index.values(key):
+                    if drug["nexahealth_id"] not in seen_ids:
+                        potential_matches.append(drug)
+                        seen_ids.add(drug["nexahealth_id"])
 
         best_match = None
         highest_score = 0
@@ -384,10 +403,14 @@ async def verify_drug(request: SimpleDrugVerificationRequest):
 
         if not best_match or highest_score < 50:
             if input_name:
-                all_names = [d["product_name"] for d in drug_db]
+                # Rank a trigram-bounded pool of names, not the whole catalogue
+                pool = [
+                    indexes["product_names"][row]
+                    for row in indexes["product_name_trigrams"].search(input_name, limit=SUGGESTION_POOL_LIMIT)
+                ]
                 matches = process.extract(
                     request.product_name,
-                    all_names,
+                    pool,
                     scorer=fuzz.token_set_ratio,
                     limit=5
                 )
@@ -395,7 +418,7 @@ async def verify_drug(request: SimpleDrugVerificationRequest):
                 if matches and matches[0][1] > 60:
                     suggested_drugs = []
                     for name, score, _ in matches:
-                        drug = next(d for d in drug_db if d["product_name"] == name)
+                        drug = indexes["drug_by_name"][name]
                         suggested_drugs.append({
                             "product_name": drug["product_name"],
                             "dosage_form": drug["dosage_form"],
@@ -1,54 +1,235 @@
 # app/routers/verify.py
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict
-from app.models.verify_model import DrugVerificationRequest, DrugVerificationResponse
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.datastructures import UploadFile
+from typing import Dict, Iterator, List, Optional, Tuple
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import csv
+import hashlib
+import io
+import json
+from app.models.verify_model import (
+    DrugVerificationRequest,
+    DrugVerificationResponse,
+    BatchDrugVerificationRequest
+)
 from app.models.auth_model import UserInDB
 from app.core.auth import get_current_active_user
 from app.routers.count import increment_user_stat
 from app.core.db import db
 from app.core.verify_engine import DrugVerificationEngine
+from app.core.verify_snapshot import SNAPSHOT_PATH, load_snapshot, save_snapshot, snapshot_lock
+from app.core.verify_cache import verification_cache
+from app.core import verify_pool
+from app.core.drug_store import merge_records
+from app.core.normalize import canonical_nafdac
+from datetime import datetime, timezone
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/verify", tags=["Drug Verification"])
 
-# Lazy-initialized engine
+# Lazy-initialized engine (and the header of the snapshot it was loaded from)
 engine: DrugVerificationEngine = None
+engine_meta: Dict = None
 
-async def get_engine() -> DrugVerificationEngine:
+# Serializes the lazy engine load in this worker
+_engine_load_lock = asyncio.Lock()
+
+# Unique batch items verified concurrently (bounds pool tasks and Firestore queries in flight)
+BATCH_CONCURRENCY = 8
+
+def _fetch_drug_deltas(meta: Dict) -> List[Dict]:
+    """
+    Pull drugs added or updated in Firestore since the snapshot was built:
+    IDs above the snapshot's highest nexahealth_id, plus any document whose
+    updated_at is newer than the snapshot's exported_at.
+    """
+    drugs_ref = db.collection("drugs")
+    deltas = {}
+    batch_size = 1000
+
+    last_doc = None
+    while True:
+        query = (drugs_ref.where("nexahealth_id", ">", meta.get("max_nexahealth_id", 0))
+                 .order_by("nexahealth_id").limit(batch_size))
+        if last_doc:
+            query = query.start_after(last_doc)
+        docs = list(query.stream())
+        if not docs:
+            break
+        for doc in docs:
+            drug = doc.to_dict()
+            deltas[drug.get("nexahealth_id")] = drug
+        last_doc = docs[-1]
+
+    exported_at = datetime.fromisoformat(meta["exported_at"])
+    for doc in drugs_ref.where("updated_at", ">", exported_at).stream():
+        drug = doc.to_dict()
+        deltas[drug.get("nexahealth_id")] = drug
+
+    return list(deltas.values())
+
+def _delta_version(snapshot_version: str, deltas: List[Dict]) -> str:
     """
-    Lazy-load the DrugVerificationEngine to avoid long startup times
-    and Firestore timeouts for large datasets.
+    Dataset version of a snapshot plus deltas: the snapshot version, the
+    latest delta timestamp and the delta IDs. Workers that fetched the same
+    deltas agree on it, so they share the result cache.
     """
+    latest = max((str(d.get("updated_at") or "") for d in deltas), default="")
+    ids = sorted(str(d.get("nexahealth_id")) for d in deltas)
+    digest = hashlib.sha256("|".join([snapshot_version, latest, *ids]).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+def load_engine_snapshot(apply_deltas: bool = True) -> Optional[DrugVerificationEngine]:
+    """
+    Load the prebuilt engine snapshot from disk (see
+    app/scripts/build_verify_snapshot.py) and, unless apply_deltas is False,
+    apply Firestore deltas. Returns None if there is no usable snapshot.
+    Blocking (file and Firestore I/O): call it from a thread in async code.
+    """
+    if not apply_deltas:
+        return _load_snapshot_file()
+    # One process per host refreshes at a time; later ones load its rewrite,
+    # whose exported_at is recent, so they fetch few or no deltas
+    with snapshot_lock(SNAPSHOT_PATH):
+        if _load_snapshot_file() is None:
+            return None
+        return apply_engine_deltas()
+
+def _load_snapshot_file() -> Optional[DrugVerificationEngine]:
+    global engine, engine_meta
+    loaded = load_snapshot(SNAPSHOT_PATH)
+    if not loaded:
+        return None
+    engine, engine_meta = loaded
+    logger.info(f"Loaded verification snapshot v{engine_meta['version']} ({engine_meta['drug_count']} drugs)")
+    return engine
+
+def apply_engine_deltas() -> Optional[DrugVerificationEngine]:
+    """
+    Merge drugs added or updated in Firestore since the loaded snapshot's
+    data was exported, then re-save the snapshot so the next start needs no
+    deltas. With PRELOAD (run.py) this runs once, before workers are forked;
+    otherwise under snapshot_lock (see load_engine_snapshot).
+    """
+    global engine, engine_meta
+    if engine is None or engine_meta is None:
+        return engine
+
+    fetched_at = datetime.now(timezone.utc)
+    try:
+        deltas = _fetch_drug_deltas(engine_meta)
+    except Exception:
+        logger.exception("Failed to fetch drug deltas; serving snapshot as-is")
+        deltas = []
+
+    if deltas:
+        logger.info(f"Applying {len(deltas)} drug deltas to snapshot")
+        engine = DrugVerificationEngine(drug_db=merge_records(engine.drug_db, deltas),
+                                        dataset_version=_delta_version(engine_meta["version"], deltas))
+        try:
+            engine_meta = save_snapshot(engine, SNAPSHOT_PATH, exported_at=fetched_at,
+                                        source=f"{engine_meta.get('source', '')}+firestore",
+                                        source_sha256=engine_meta.get("source_sha256", ""))
+        except Exception:
+            logger.exception("Failed to write updated verification snapshot")
+
+    return engine
+
+def _stream_firestore_drugs(batch_size: int = 1000) -> Iterator[Dict]:
+    """
+    Yield every drug document page by page. The engine reduces each one to
+    a compact DrugRecord as it arrives, so only one page of raw documents
+    is held in memory at a time.
+    """
+    last_doc = None
+    while True:
+        query = db.collection("drugs").order_by("nexahealth_id").limit(batch_size)
+        if last_doc:
+            query = query.start_after(last_doc)
+        docs = list(query.stream())
+
+        if not docs:
+            break
+
+        for doc in docs:
+            yield doc.to_dict()
+
+        last_doc = docs[-1]
+
+def _load_engine() -> DrugVerificationEngine:
+    """The snapshot engine with deltas, else a full Firestore load (blocking)"""
     global engine
+    if engine is None:
+        load_engine_snapshot()
     if engine is None:
         logger.info("Initializing DrugVerificationEngine with Firestore drugs (lazy load)...")
-        drugs = []
-        batch_size = 1000  # smaller batches for large collections
-        last_doc = None
+        engine = DrugVerificationEngine(drug_db=_stream_firestore_drugs())
+        logger.info(f"Loaded {len(engine.drug_db)} drugs into engine.")
+    return engine
 
-        while True:
-            query = db.collection("drugs").order_by("nexahealth_id").limit(batch_size)
-            if last_doc:
-                query = query.start_after(last_doc)
-            docs = list(query.stream())
+async def get_engine() -> DrugVerificationEngine:
+    """
+    Lazy-load the DrugVerificationEngine, preferring the on-disk snapshot
+    and falling back to a full Firestore load. The load runs in a thread,
+    once, however many requests arrive while it is in progress.
+    """
+    if engine is not None:
+        return engine
+    async with _engine_load_lock:
+        return await asyncio.to_thread(_load_engine)
 
-            if not docs:
-                break
+def _engine_on_disk(engine_instance: DrugVerificationEngine) -> bool:
+    """Whether the snapshot file holds this engine, so pool processes can load it"""
+    return engine_meta is not None and engine_meta.get("version") == engine_instance.dataset_version
 
-            for doc in docs:
-                drugs.append(doc.to_dict())
+async def _verify_off_loop(engine_instance: DrugVerificationEngine, request_dict: Dict) -> Dict:
+    """
+    verify_drug_async with the CPU-bound local scoring off the event loop:
+    in the batch process pool when the served engine is the on-disk
+    snapshot, else in a thread. The Firestore fallback stays on the loop.
+    """
+    version = engine_instance.dataset_version
+    pool = verify_pool.get_pool(version) if _engine_on_disk(engine_instance) else None
+    if pool is not None:
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                pool, verify_pool.verify_local, version, request_dict
+            )
+            return result or await engine_instance.verify_drug_remote_async(request_dict)
+        except (verify_pool.StaleWorkerEngine, BrokenProcessPool) as e:
+            verify_pool.mark_failed(version, e)
 
-            last_doc = docs[-1]
+    result = await asyncio.to_thread(engine_instance.verify_drug_local, request_dict)
+    return result or await engine_instance.verify_drug_remote_async(request_dict)
 
-            # Avoid memory overload if dataset is huge
-            if len(drugs) >= 10000:  # configurable max
-                logger.warning("Loaded 10k drugs, stopping batch load to prevent memory issues")
-                break
+async def cached_verify(engine_instance: DrugVerificationEngine, request_dict: Dict,
+                        offload: bool = False) -> Dict:
+    """
+    Verify through the result cache. Keys are the engine's normalized inputs
+    (NAFDAC numbers in canonical form) plus its dataset version, so a reloaded
+    dataset never serves stale results. Shared-tier I/O runs off the event loop,
+    and with offload so does scoring (see _verify_off_loop). Results of a
+    failed Firestore fallback are not cached: the next request retries it.
+    """
+    if verification_cache.version != engine_instance.dataset_version:
+        await asyncio.to_thread(verification_cache.set_version, engine_instance.dataset_version)
+    inputs = engine_instance._normalize_inputs(request_dict)
+    key = verification_cache.make_key({**inputs, "nafdac": canonical_nafdac(inputs["nafdac"])})
 
-        engine = DrugVerificationEngine(drug_db=drugs)
-        logger.info(f"Loaded {len(drugs)} drugs into engine.")
-    return engine
+    result = await verification_cache.get_async(key)
+    if result is None:
+        if offload:
+            result = await _verify_off_loop(engine_instance, request_dict)
+        else:
+            result = await engine_instance.verify_drug_async(request_dict)
+        if not result.get("remote_lookup_failed"):
+            await verification_cache.set_async(key, result)
+    return result
 
 @router.post("/drug", response_model=DrugVerificationResponse)
 async def verify_drug(
@@ -62,8 +243,8 @@ async def verify_drug(
         # Lazy-load engine
         engine_instance = await get_engine()
 
-        # Run verification
-        result = engine_instance.verify_drug(request_dict)
+        # Run verification (identical normalized requests are served from cache)
+        result = await cached_verify(engine_instance, request_dict)
 
         try:
             increment_user_stat(current_user.id, "verifications")
@@ -80,3 +261,121 @@ async def verify_drug(
             status_code=500,
             detail=f"Drug verification failed: {str(e)}"
         )
+
+
+@router.get("/cache/stats")
+async def verification_cache_stats(
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    """Hit/miss counters for the verification result cache (this worker)"""
+    return verification_cache.stats()
+
+
+async def _parse_batch_items(request: Request) -> List[DrugVerificationRequest]:
+    """Read batch items from a JSON body, a raw CSV body or an uploaded CSV file"""
+    content_type = request.headers.get("content-type", "")
+
+    if "multipart/form-data" in content_type:
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None:
+            raise HTTPException(status_code=400, detail="CSV upload must use the 'file' field")
+        if not isinstance(upload, UploadFile):
+            raise HTTPException(status_code=422, detail="The 'file' field must be an uploaded CSV file")
+        data = await upload.read()
+    elif "text/csv" in content_type:
+        data = await request.body()
+    else:
+        try:
+            payload = await request.json()
+            if isinstance(payload, list):
+                payload = {"items": payload}
+            return BatchDrugVerificationRequest(**payload).items
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=422, detail=f"Invalid batch request: {str(e)}")
+
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Batch CSV must be UTF-8 encoded")
+
+    fields = DrugVerificationRequest.__fields__.keys()
+    rows = [
+        {k: (v.strip() or None) for k, v in row.items() if k in fields and v is not None}
+        for row in csv.DictReader(io.StringIO(text))
+    ]
+    try:
+        return BatchDrugVerificationRequest(items=rows).items
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid batch CSV: {str(e)}")
+
+def _dedupe_key(request_dict: Dict) -> Tuple:
+    return tuple((request_dict.get(f) or "").strip().lower() for f in sorted(request_dict))
+
+@router.post("/batch")
+async def verify_drug_batch(
+    request: Request,
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    """
+    Verify many drugs at once (JSON {"items": [...]} or CSV with
+    DrugVerificationRequest columns). Identical inputs are scored once.
+    Results are streamed as NDJSON, one line per input row, followed by
+    a summary line.
+    """
+    items = await _parse_batch_items(request)
+    logger.info(f"Batch verification of {len(items)} items by user: {current_user.email}")
+
+    # Deduplicate identical inputs, remembering which rows share each one
+    unique: Dict[Tuple, int] = {}
+    unique_requests: List[Dict] = []
+    row_to_unique: List[int] = []
+    for item in items:
+        request_dict = item.dict()
+        key = _dedupe_key(request_dict)
+        if key not in unique:
+            unique[key] = len(unique_requests)
+            unique_requests.append(request_dict)
+        row_to_unique.append(unique[key])
+
+    engine_instance = await get_engine()
+
+    try:
+        increment_user_stat(current_user.id, "verifications")
+    except Exception:
+        logger.exception("Failed to increment verification stat")
+
+    async def stream_results():
+        rows_by_unique: Dict[int, List[int]] = {}
+        for row, u in enumerate(row_to_unique):
+            rows_by_unique.setdefault(u, []).append(row)
+
+        # Each unique item goes through the same cache and Firestore fallback
+        # as /drug; scoring runs in the batch pool, off the event loop
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+        async def run_item(u: int):
+            async with semaphore:
+                try:
+                    result = await cached_verify(engine_instance, unique_requests[u], offload=True)
+                    return u, {"result": jsonable_encoder(DrugVerificationResponse(**result))}
+                except Exception as e:
+                    logger.exception("Batch verification item failed")
+                    return u, {"error": f"Drug verification failed: {str(e)}"}
+
+        errors = 0
+        tasks = [run_item(u) for u in range(len(unique_requests))]
+        for next_done in asyncio.as_completed(tasks):
+            u, outcome = await next_done
+            if "error" in outcome:
+                errors += len(rows_by_unique[u])
+            for row in rows_by_unique[u]:
+                yield json.dumps({"index": row, **outcome}) + "\n"
+
+        yield json.dumps({"summary": {
+            "total": len(items),
+            "unique": len(unique_requests),
+            "errors": errors
+        }}) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
@@ -0,0 +1,51 @@
+# scripts/bench_drug_store.py
+# Report memory per drug for raw drug documents vs compact DrugRecords:
+#   python -m app.scripts.bench_drug_store --json_path app/data/unified_drugs_with_pils_v3.json
+import argparse
+import gc
+import json
+import tracemalloc
+from pathlib import Path
+
+from app.core.drug_store import to_records
+
+DEFAULT_JSON = Path(__file__).parent.parent / "data" / "unified_drugs_with_pils_v3.json"
+
+
+def measure(build):
+    """Bytes still allocated after build() returns (its result kept alive)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json_path", default=str(DEFAULT_JSON), help="Path to JSON drug DB")
+    args = parser.parse_args()
+
+    text = Path(args.json_path).read_text(encoding="utf-8")
+
+    # Before: the engine held the full decoded documents
+    raw, raw_bytes = measure(lambda: json.loads(text))
+    count = len(raw)
+    del raw
+
+    # After: documents are reduced to records as they are decoded
+    records, record_bytes = measure(lambda: list(to_records(json.loads(text))))
+    kept = len(records)
+    del records
+
+    print(f"[INFO] Drugs: {count} ({kept} with a nexahealth_id)")
+    print(f"[RESULT] raw documents: {raw_bytes / max(count, 1):,.0f} bytes/drug ({raw_bytes / 1e6:.1f} MB)")
+    print(f"[RESULT] DrugRecord:    {record_bytes / max(kept, 1):,.0f} bytes/drug ({record_bytes / 1e6:.1f} MB)")
+    if record_bytes:
+        print(f"[RESULT] reduction: {raw_bytes / record_bytes:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# scripts/bench_normalize.py
+# Micro-benchmark of the shared normalizers against the previous per-suffix loop:
+#   python -m app.scripts.bench_normalize
+import argparse
+import random
+import re
+import timeit
+
+from app.core.normalize import CORP_SUFFIXES, _CORP_SUFFIX_RE, normalize_text, normalize_manufacturer
+
+LEGACY_SUFFIXES = [rf"\b{s}\b" for s in CORP_SUFFIXES]
+
+SAMPLE_MANUFACTURERS = [
+    "Emzor Pharmaceutical Industries Ltd", "Fidson Healthcare Plc", "May & Baker Nigeria Plc",
+    "Swiss Pharma Nigeria Ltd", "GlaxoSmithKline Pharmaceuticals Nigeria Limited",
+    "Juhel Nigeria Limited", "Evans Medical Plc", "Neimeth International Pharmaceuticals Plc",
+    "Sanofi-Aventis Nig. Ltd", "Greenlife Pharmaceuticals Limited", "Shalina Healthcare Nig Ltd",
+    "Drugfield Pharmaceuticals Ltd", "Bond Chemical Industries Ltd", "Pfizer Laboratories Ltd",
+]
+
+
+def legacy_normalize_manufacturer(manufacturer):
+    """The previous implementation: one re.sub per corporate suffix"""
+    if not manufacturer:
+        return ""
+    normalized = normalize_text.__wrapped__(manufacturer)
+    for suffix in LEGACY_SUFFIXES:
+        normalized = re.sub(suffix, '', normalized)
+    return re.sub(r'\s+', ' ', normalized).strip()
+
+
+def single_pass_normalize_manufacturer(manufacturer):
+    """The shared normalizer with both LRU layers bypassed"""
+    if not manufacturer:
+        return ""
+    normalized = _CORP_SUFFIX_RE.sub('', normalize_text.__wrapped__(manufacturer))
+    return re.sub(r'\s+', ' ', normalized).strip()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20000, help="Normalization calls per variant")
+    args = parser.parse_args()
+
+    random.seed(0)
+    inputs = [random.choice(SAMPLE_MANUFACTURERS) for _ in range(args.calls)]
+
+    mismatches = [m for m in SAMPLE_MANUFACTURERS
+                  if legacy_normalize_manufacturer(m) != normalize_manufacturer(m)]
+    print(f"[INFO] Output mismatches vs legacy: {len(mismatches)}")
+
+    variants = [
+        ("legacy (re.sub per suffix)", lambda: [legacy_normalize_manufacturer(m) for m in inputs]),
+        ("single-pass regex", lambda: [single_pass_normalize_manufacturer(m) for m in inputs]),
+        ("single-pass + LRU", lambda: [normalize_manufacturer(m) for m in inputs]),
+    ]
+
+    baseline = None
+    for name, run in variants:
+        elapsed = min(timeit.repeat(run, number=1, repeat=3))
+        per_call = elapsed / args.calls * 1e6
+        baseline = baseline or per_call
+        print(f"[RESULT] {name:28s} {per_call:8.2f} us/call  ({baseline / per_call:5.1f}x)")
+
+    print(f"[INFO] LRU cache: {normalize_manufacturer.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# scripts/bench_verify.py
+# Latency and accuracy regression benchmark for DrugVerificationEngine.verify_drug:
+#   python -m app.scripts.bench_verify --output bench.json
+#   python -m app.scripts.bench_verify --baseline bench.json --fail_on_regression
+import argparse
+import json
+import platform
+import random
+import statistics
+import string
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.core.drug_store import to_records
+from app.core.verify_engine import DrugVerificationEngine
+
+DEFAULT_JSON = Path(__file__).parent.parent / "data" / "unified_drugs_with_pils_v3.json"
+
+QUERY_CLASSES = ["exact", "typo", "missing_nafdac", "wrong_manufacturer"]
+
+
+def load_records(json_path):
+    with open(json_path, encoding="utf-8") as f:
+        return list(to_records(json.load(f)))
+
+
+def typo(text, rng):
+    """Apply one random edit (substitute, delete, insert or transpose) to a word character"""
+    positions = [i for i, c in enumerate(text) if c.isalnum()]
+    if len(positions) < 4:
+        return text
+    i = rng.choice(positions[1:])  # keep the first character, as real typos mostly do
+    op = rng.choice(["substitute", "delete", "insert", "transpose"])
+    letter = rng.choice(string.ascii_lowercase)
+    if op == "substitute":
+        return text[:i] + letter + text[i + 1:]
+    if op == "delete":
+        return text[:i] + text[i + 1:]
+    if op == "insert":
+        return text[:i] + letter + text[i:]
+    if i + 1 < len(text):
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    return text[:i - 1] + text[i] + text[i - 1]
+
+
+def build_query_set(records, per_class=200, seed=0):
+    """
+    Labelled queries derived from catalogue entries:
+      exact              - every field as stored
+      typo               - one edit in product name, manufacturer and NAFDAC number
+      missing_nafdac     - names and manufacturer only
+      wrong_manufacturer - product name and NAFDAC with another drug's manufacturer
+    """
+    rng = random.Random(seed)
+    usable = [r for r in records if r.product_name and r.nafdac_reg_no and r.manufacturer]
+    manufacturers = sorted({r.manufacturer for r in usable})
+
+    queries = []
+    for query_class in QUERY_CLASSES:
+        for drug in rng.sample(usable, min(per_class, len(usable))):
+            request = {
+                "product_name": drug.product_name,
+                "generic_name": drug.generic_name,
+                "dosage_form": drug.dosage_form,
+                "strength": drug.strength,
+                "nafdac_reg_no": drug.nafdac_reg_no,
+                "manufacturer": drug.manufacturer
+            }
+            if query_class == "typo":
+                request["product_name"] = typo(drug.product_name, rng)
+                request["manufacturer"] = typo(drug.manufacturer, rng)
+                request["nafdac_reg_no"] = typo(drug.nafdac_reg_no, rng)
+            elif query_class == "missing_nafdac":
+                request["nafdac_reg_no"] = None
+            elif query_class == "wrong_manufacturer":
+                others = [m for m in manufacturers if m != drug.manufacturer]
+                if others:
+                    request["manufacturer"] = rng.choice(others)
+            queries.append({
+                "class": query_class,
+                "request": request,
+                "expected_id": drug.nexahealth_id
+            })
+    return queries
+
+
+def ranked_ids(engine, request, k=5):
+    """Top-k drug IDs as ranked by the engine's local scoring"""
+    inputs = engine._normalize_inputs(request)
+    scored = engine._score_candidates(engine._find_candidates(inputs), inputs)
+    return [drug.nexahealth_id for _, drug, _, _ in scored[:k]]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, top1, top5):
+    latencies = sorted(latencies)
+    total = len(latencies)
+    return {
+        "queries": total,
+        "p50_ms": round(percentile(latencies, 50) * 1e3, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1e3, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1e3, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1e3, 3) if total else 0.0,
+        "throughput_qps": round(total / sum(latencies), 1) if total and sum(latencies) else 0.0,
+        "top1_accuracy": round(top1 / total, 4) if total else 0.0,
+        "top5_accuracy": round(top5 / total, 4) if total else 0.0
+    }
+
+
+def run_benchmark(engine, queries, warmup=20):
+    for query in queries[:warmup]:
+        engine.verify_drug(query["request"])
+
+    per_class = {c: {"latencies": [], "top1": 0, "top5": 0} for c in QUERY_CLASSES}
+    for query in queries:
+        start = time.perf_counter()
+        engine.verify_drug(query["request"])
+        elapsed = time.perf_counter() - start
+
+        ranking = ranked_ids(engine, query["request"])
+        stats = per_class[query["class"]]
+        stats["latencies"].append(elapsed)
+        stats["top1"] += int(ranking[:1] == [query["expected_id"]])
+        stats["top5"] += int(query["expected_id"] in ranking)
+
+    results = {c: summarize(s["latencies"], s["top1"], s["top5"]) for c, s in per_class.items()}
+    results["overall"] = summarize(
+        [t for s in per_class.values() for t in s["latencies"]],
+        sum(s["top1"] for s in per_class.values()),
+        sum(s["top5"] for s in per_class.values())
+    )
+    return results
+
+
+def compare(results, baseline, max_accuracy_drop, max_latency_ratio):
+    """Print deltas against a previous run; return the list of regressions"""
+    regressions = []
+    for query_class, current in results.items():
+        previous = baseline.get(query_class)
+        if not previous:
+            continue
+        for metric in ("top1_accuracy", "top5_accuracy"):
+            delta = current[metric] - previous[metric]
+            print(f"[COMPARE] {query_class:18s} {metric:14s} {previous[metric]:.4f} -> {current[metric]:.4f} ({delta:+.4f})")
+            if delta < -max_accuracy_drop:
+                regressions.append(f"{query_class} {metric} dropped {-delta:.4f}")
+        for metric in ("p50_ms", "p95_ms"):
+            ratio = current[metric] / previous[metric] if previous[metric] else 1.0
+            print(f"[COMPARE] {query_class:18s} {metric:14s} {previous[metric]:.3f} -> {current[metric]:.3f} ({ratio:.2f}x)")
+            if ratio > max_latency_ratio:
+                regressions.append(f"{query_class} {metric} rose {ratio:.2f}x")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json_path", default=str(DEFAULT_JSON), help="Path to JSON drug DB")
+    parser.add_argument("--per_class", type=int, default=200, help="Queries generated per query class")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for query generation")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured warm-up queries")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Previous --output file to compare against")
+    parser.add_argument("--max_accuracy_drop", type=float, default=0.01)
+    parser.add_argument("--max_latency_ratio", type=float, default=1.25)
+    parser.add_argument("--fail_on_regression", action="store_true", help="Exit 1 if the baseline comparison regresses")
+    args = parser.parse_args()
+
+    print(f"[INFO] Loading drugs from {args.json_path}...")
+    start = time.perf_counter()
+    engine = DrugVerificationEngine(drug_db=load_records(args.json_path))
+    build_seconds = time.perf_counter() - start
+    print(f"[INFO] Engine built with {len(engine.drug_db)} drugs in {build_seconds:.2f}s")
+
+    queries = build_query_set(engine.drug_db, per_class=args.per_class, seed=args.seed)
+    print(f"[INFO] Running {len(queries)} labelled queries...")
+    results = run_benchmark(engine, queries, warmup=args.warmup)
+
+    for query_class, r in results.items():
+        print(f"[RESULT] {query_class:18s} p50={r['p50_ms']:.2f}ms p95={r['p95_ms']:.2f}ms p99={r['p99_ms']:.2f}ms "
+              f"qps={r['throughput_qps']:.0f} top1={r['top1_accuracy']:.3f} top5={r['top5_accuracy']:.3f}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "json_path": str(args.json_path),
+            "drug_count": len(engine.drug_db),
+            "engine_build_s": round(build_seconds, 3),
+            "per_class": args.per_class,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "scores": engine.SCORES
+        },
+        "results": results
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[INFO] Results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline.get("results", {}), args.max_accuracy_drop, args.max_latency_ratio)
+        for regression in regressions:
+            print(f"[REGRESSION] {regression}")
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# scripts/build_symptom_classifier.py
+# Build the zero-shot symptom classifier (calculate_risk's fallback) offline:
+#   python -m app.scripts.build_symptom_classifier
+import argparse
+import time
+from pathlib import Path
+
+from app.core.ml import RISK_MAP_PATH, MESH_PATH, symptom_label_phrases
+from app.core.symptom_classifier import CLASSIFIER_PATH, SymptomClassifier, sources_sha256
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", default=str(CLASSIFIER_PATH), help="Classifier output path")
+    parser.add_argument("--query", action="append", default=[], help="Sample input to classify (repeatable)")
+    args = parser.parse_args()
+
+    start = time.time()
+    label_phrases = symptom_label_phrases()
+    source_sha256 = sources_sha256(path for path in (RISK_MAP_PATH, MESH_PATH) if path.exists())
+    classifier = SymptomClassifier.build(label_phrases, source_sha256=source_sha256)
+    print(f"[INFO] Built {len(classifier)} labels ({sum(map(len, label_phrases.values()))} phrases, "
+          f"{len(classifier.features)} features) in {time.time() - start:.1f}s")
+
+    classifier.save(Path(args.out))
+    print(f"[INFO] Wrote {args.out} ({Path(args.out).stat().st_size / 1024:.0f} KB)")
+
+    start = time.time()
+    classifier = SymptomClassifier.load(Path(args.out), source_sha256=source_sha256)
+    print(f"[INFO] Load time: {(time.time() - start) * 1000:.0f} ms")
+
+    for query in args.query:
+        start = time.perf_counter()
+        top = classifier.classify(query, top_k=3)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"[RESULT] {query!r} -> {[(label, round(score, 3)) for label, score in top]} ({elapsed:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
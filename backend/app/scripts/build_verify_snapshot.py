@@ -0,0 +1,59 @@
+# scripts/build_verify_snapshot.py
+# Build the on-disk verification engine snapshot offline:
+#   python -m app.scripts.build_verify_snapshot --json_path app/data/unified_drugs_with_pils_v3.json
+# Firestore changes made after the JSON was exported are applied as deltas at
+# startup; pass --exported_at when the file's modification time is not the export time.
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.core.verify_engine import DrugVerificationEngine
+from app.core.verify_snapshot import SNAPSHOT_PATH, save_snapshot, load_snapshot, file_sha256
+
+DEFAULT_JSON = Path(__file__).parent.parent / "data" / "unified_drugs_with_pils_v3.json"
+
+
+def parse_exported_at(value: str) -> datetime:
+    """ISO 8601 timestamp; naive values are taken as UTC"""
+    exported_at = datetime.fromisoformat(value)
+    return exported_at if exported_at.tzinfo else exported_at.replace(tzinfo=timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json_path", default=str(DEFAULT_JSON), help="Path to JSON drug DB")
+    parser.add_argument("--out", default=str(SNAPSHOT_PATH), help="Snapshot output path")
+    parser.add_argument("--exported_at", type=parse_exported_at,
+                        help="When the JSON was exported from Firestore (ISO 8601; default: its modification time)")
+    args = parser.parse_args()
+
+    exported_at = args.exported_at or datetime.fromtimestamp(Path(args.json_path).stat().st_mtime, timezone.utc)
+
+    start = time.time()
+    print(f"[INFO] Loading JSON data from {args.json_path}...")
+    with open(args.json_path, encoding="utf-8") as f:
+        drugs = json.load(f)
+    print(f"[INFO] Total records in JSON: {len(drugs)}")
+
+    engine = DrugVerificationEngine(drug_db=drugs)
+    print(f"[INFO] Built indexes in {time.time() - start:.1f}s")
+
+    meta = save_snapshot(
+        engine,
+        path=Path(args.out),
+        exported_at=exported_at,
+        source=Path(args.json_path).name,
+        source_sha256=file_sha256(Path(args.json_path))
+    )
+    print(f"[INFO] Wrote {args.out} (version {meta['version']}, {meta['drug_count']} drugs, "
+          f"exported {meta['exported_at']})")
+
+    start = time.time()
+    load_snapshot(Path(args.out))
+    print(f"[INFO] Snapshot load time: {(time.time() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
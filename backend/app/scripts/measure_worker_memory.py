@@ -0,0 +1,66 @@
+# scripts/measure_worker_memory.py
+# Shared vs private memory of a server process and its workers (Linux):
+#   PRELOAD=1 WEB_CONCURRENCY=4 python run.py &
+#   python -m app.scripts.measure_worker_memory <run.py pid>
+# Compare against PRELOAD=0 to see what copy-on-write preloading saves.
+import argparse
+import json
+from pathlib import Path
+
+FIELDS = ["Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"]
+
+
+def children(pid):
+    """Direct child PIDs, from /proc/<pid>/task/*/children"""
+    found = []
+    for task in Path(f"/proc/{pid}/task").iterdir():
+        text = (task / "children").read_text().split()
+        found.extend(int(p) for p in text)
+    return found
+
+
+def memory(pid):
+    """smaps_rollup totals in MB"""
+    values = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+        key, _, rest = line.partition(":")
+        if key in FIELDS:
+            values[key] = int(rest.split()[0]) / 1024  # kB -> MB
+    values["Shared"] = values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0)
+    values["Private"] = values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pid", type=int, help="PID of the master (run.py) process")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    processes = {"master": args.pid}
+    processes.update({f"worker {i}": pid for i, pid in enumerate(children(args.pid), 1)})
+    report = {name: {"pid": pid, **memory(pid)} for name, pid in processes.items()}
+
+    workers = [r for name, r in report.items() if name != "master"]
+    report["total"] = {
+        "rss_sum_mb": round(sum(r["Rss"] for r in report.values()), 1),
+        "pss_sum_mb": round(sum(r["Pss"] for r in report.values()), 1),  # real footprint
+        "private_per_worker_mb": round(sum(r["Private"] for r in workers) / max(len(workers), 1), 1)
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'process':10s} {'pid':>7s} {'RSS':>9s} {'PSS':>9s} {'shared':>9s} {'private':>9s}")
+    for name, r in report.items():
+        if name == "total":
+            continue
+        print(f"{name:10s} {r['pid']:7d} {r['Rss']:8.1f}M {r['Pss']:8.1f}M {r['Shared']:8.1f}M {r['Private']:8.1f}M")
+    totals = report["total"]
+    print(f"[RESULT] Sum of RSS {totals['rss_sum_mb']} MB, sum of PSS {totals['pss_sum_mb']} MB, "
+          f"private per worker {totals['private_per_worker_mb']} MB")
+
+
+if __name__ == "__main__":
+    main()
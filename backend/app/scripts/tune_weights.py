@@ -1,111 +1,264 @@
-# scripts/tune_weights_from_json.py
-import itertools
+# scripts/tune_weights.py
+# Tune DrugVerificationEngine.SCORES field weights against labelled queries:
+#   python -m app.scripts.tune_weights --search grid
+#   python -m app.scripts.tune_weights --search random --trials 20000
+#   python -m app.scripts.tune_weights --search bayes --trials 2000   (needs optuna)
+#
+# Per-field similarities are computed once per (query, candidate) pair; each
+# weight setting is then just a matrix product, evaluated in parallel chunks.
 import argparse
+import itertools
 import json
+import multiprocessing
+import os
 import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from app.routers.verify import build_indexes, score_drug_against_input, normalize_text_ultra, WEIGHTS
-
-# CLI args
-parser = argparse.ArgumentParser()
-parser.add_argument("--json_path", required=True, help="Path to JSON drug DB")
-parser.add_argument("--limit_tests", type=int, default=200, help="Limit number of eval rows to run")
-args = parser.parse_args()
-
-def load_eval_rows_from_json(json_path, limit=None):
-    print(f"[INFO] Loading JSON data from {json_path}...")
-    rows = []
-    with open(json_path, encoding="utf-8") as f:
-        data = json.load(f)
-    print(f"[INFO] Total records in JSON: {len(data)}")
-    for i, drug in enumerate(data):
-        rows.append({
-            "input_product": drug.get("product_name", ""),
-            "input_generic": drug.get("generic_name", ""),
-            "input_manufacturer": drug.get("manufacturer", {}).get("name", ""),
-            "input_nafdac": drug.get("identifiers", {}).get("nafdac_reg_no", ""),
-            "expected_nexahealth_id": str(drug.get("nexahealth_id", ""))
-        })
-        if limit and i + 1 >= limit:
-            break
-    print(f"[INFO] Loaded {len(rows)} evaluation rows from JSON")
-    return rows
-
-def evaluate_setting(rows, idx):
-    correct = 0
-    total = len(rows)
-    start_eval = time.time()
-    for i, row in enumerate(rows, 1):
-        inputs = {
-            "product_name": normalize_text_ultra(row.get("input_product", "") or ""),
-            "raw_product_name": row.get("input_product", "") or "",
-            "generic_name": normalize_text_ultra(row.get("input_generic", "") or ""),
-            "raw_generic_name": row.get("input_generic", "") or "",
-            "manufacturer": normalize_text_ultra(row.get("input_manufacturer", "") or ""),
-            "raw_manufacturer": row.get("input_manufacturer", "") or "",
-            "nafdac": (row.get("input_nafdac", "") or "").replace(" ", "").replace("-", ""),
-            "raw_nafdac": row.get("input_nafdac", "") or ""
-        }
-        best_nid = None
-        best_score = -1
-        for nid, drug in idx["id_map"].items():
-            score, _ = score_drug_against_input(drug, inputs)
-            if score > best_score:
-                best_score = score
-                best_nid = nid
-        expected = str(row.get("expected_nexahealth_id", "")).strip()
-        if str(best_nid) == expected:
-            correct += 1
-
-        if i % max(1, total // 10) == 0 or i == total:
-            pct = (i / total) * 100
-            print(f"[DEBUG] Eval progress: {i}/{total} ({pct:.1f}%) done")
-
-    accuracy = correct / total if total else 0
-    elapsed = time.time() - start_eval
-    print(f"[DEBUG] Evaluation done: {correct}/{total} correct => accuracy={accuracy:.3f} (time: {elapsed:.1f}s)")
-    return accuracy
 
-def main():
-    print("[INFO] Building indexes for evaluation...")
-    idx = build_indexes()
-    rows = load_eval_rows_from_json(args.json_path, limit=args.limit_tests)
-
-    product_range = [0.3, 0.35, 0.4, 0.45]
-    generic_range = [0.3, 0.35, 0.4, 0.45]
-    manu_range = [0.1, 0.15, 0.2]
-    nafdac_add_range = [0.2, 0.25, 0.3, 0.35]
-
-    best = []
-    total_iters = len(product_range) * len(generic_range) * len(manu_range) * len(nafdac_add_range)
-    print("[INFO] Starting weight grid search tuning...")
-    start_total = time.time()
-
-    for i, (p, g, m, nadd) in enumerate(itertools.product(product_range, generic_range, manu_range, nafdac_add_range), 1):
-        if p + g + m > 1.2:
-            print(f"[SKIP] Skipping weights p={p} g={g} m={m} nadd={nadd} because sum exceeds 1.2")
+import numpy as np
+
+from app.core.verify_engine import DrugVerificationEngine
+from app.scripts.bench_verify import DEFAULT_JSON, QUERY_CLASSES, build_query_set, load_records
+
+WEIGHT_KEYS = [spec[3] for spec in DrugVerificationEngine.FIELD_SPECS]
+PARAM_KEYS = WEIGHT_KEYS + ["complete_match_bonus"]
+
+# (low, high, grid step) per tuned parameter
+SEARCH_SPACE = {
+    "nafdac_weight": (0.20, 0.60, 0.05),
+    "manufacturer_weight": (0.05, 0.40, 0.05),
+    "product_name_weight": (0.05, 0.40, 0.05),
+    "generic_name_weight": (0.00, 0.25, 0.05),
+    "complete_match_bonus": (0.0, 20.0, 5.0),
+}
+
+MAX_CELLS_PER_CHUNK = 20_000_000  # candidate rows x settings per evaluation chunk
+
+_data = None  # precomputed matrices, set in each worker
+
+
+def precompute(engine, queries):
+    """
+    Score every query against its candidates once. Returns flat arrays:
+      field_scores  (rows, fields) unweighted per-field scores
+      complete      (rows,) 1.0 where every provided input field matched
+      offsets       (queries,) start row of each query's candidates
+      expected      (queries,) global row of the expected drug, or -1
+      classes       (queries,) query class index
+    Queries without candidates are dropped and counted as misses via `total`.
+    Candidates are in catalogue order, as the engine ranks them.
+    """
+    field_index = {key: i for i, key in enumerate(WEIGHT_KEYS)}
+    blocks, complete, offsets, expected, classes = [], [], [], [], []
+    start = 0
+
+    for query in queries:
+        inputs = engine._normalize_inputs(query["request"])
+        row_of = engine.columns["row"]
+        rows = sorted(row_of[i] for i in engine._find_candidates(inputs) if i in row_of)
+        if not rows:
             continue
-        WEIGHTS["product_name"] = p
-        WEIGHTS["generic_name"] = g
-        WEIGHTS["manufacturer"] = m
-        WEIGHTS["nafdac_additive"] = nadd
-
-        iter_start = time.time()
-        acc = evaluate_setting(rows, idx)
-        iter_elapsed = time.time() - iter_start
-
-        print(f"[RESULT] ({i}/{total_iters}) p={p} g={g} m={m} nadd={nadd} => accuracy={acc:.3f} (eval time: {iter_elapsed:.1f}s)")
-        best.append((acc, dict(WEIGHTS)))
-
-        pct_done = (i / total_iters) * 100
-        print(f"[INFO] Progress: {pct_done:.1f}% completed")
-
-    total_elapsed = time.time() - start_total
-    print(f"\n[INFO] Grid search done in {total_elapsed:.1f}s")
-    best.sort(reverse=True, key=lambda x: x[0])
-    print("\n[INFO] Top 5 weight settings:")
-    for acc, w in best[:5]:
-        print(f"Accuracy: {acc:.3f} Weights: {w}")
+
+        matrix = np.zeros((len(rows), len(WEIGHT_KEYS)), dtype=np.float64)
+        matched = np.zeros(len(rows), dtype=np.int64)
+        for _, _, _, weight_key, scores, _, present in engine._field_scores(rows, inputs):
+            matrix[:, field_index[weight_key]] = scores
+            matched += (present & (scores >= 70)).astype(np.int64)
+        provided_count = len([f for f in inputs if inputs[f]])
+
+        expected_row = engine.columns["row"].get(query["expected_id"])
+        position = rows.index(expected_row) if expected_row in rows else -1
+
+        blocks.append(matrix)
+        complete.append((matched == provided_count).astype(np.float64))
+        offsets.append(start)
+        expected.append(start + position if position >= 0 else -1)
+        classes.append(QUERY_CLASSES.index(query["class"]))
+        start += len(rows)
+
+    if not blocks:
+        raise SystemExit(f"[ERROR] None of the {len(queries)} labelled queries has a candidate; "
+                         f"is the catalogue empty?")
+
+    return {
+        "field_scores": np.vstack(blocks),
+        "complete": np.concatenate(complete),
+        "offsets": np.array(offsets, dtype=np.int64),
+        "expected": np.array(expected, dtype=np.int64),
+        "classes": np.array(classes, dtype=np.int64),
+        "total": np.bincount([QUERY_CLASSES.index(q["class"]) for q in queries], minlength=len(QUERY_CLASSES)),
+        "min_score": engine.SCORES["min_score"],
+    }
+
+
+def evaluate(data, params):
+    """
+    Top-1/top-5 hit counts per query class for each parameter row
+    (columns ordered as PARAM_KEYS). Ties rank in catalogue order, as in the engine.
+    """
+    field_scores, offsets, expected = data["field_scores"], data["offsets"], data["expected"]
+    n_rows = len(field_scores)
+    lengths = np.diff(np.append(offsets, n_rows))
+    row_ids = np.arange(n_rows)[:, None]
+    has_expected = expected >= 0
+    safe_expected = np.where(has_expected, expected, 0)
+    expected_rep = np.repeat(safe_expected, lengths)[:, None]
+
+    top1 = np.zeros((len(QUERY_CLASSES), len(params)), dtype=np.int64)
+    top5 = np.zeros_like(top1)
+    chunk = max(1, MAX_CELLS_PER_CHUNK // max(n_rows, 1))
+
+    for lo in range(0, len(params), chunk):
+        p = params[lo:lo + chunk]
+        totals = field_scores @ p[:, :len(WEIGHT_KEYS)].T + data["complete"][:, None] * p[:, -1][None, :]
+
+        best = np.maximum.reduceat(totals, offsets, axis=0)
+        first_best = np.minimum.reduceat(
+            np.where(totals == np.repeat(best, lengths, axis=0), row_ids, n_rows), offsets, axis=0
+        )
+        expected_total = totals[safe_expected]
+        expected_total_rep = np.repeat(expected_total, lengths, axis=0)
+        ahead = (totals > expected_total_rep) | ((totals == expected_total_rep) & (row_ids < expected_rep))
+        rank = np.add.reduceat(ahead.astype(np.int64), offsets, axis=0)
+
+        passes = has_expected[:, None] & (expected_total >= data["min_score"])
+        hit1 = passes & (first_best == safe_expected[:, None])
+        hit5 = passes & (rank < 5)
+        for c in range(len(QUERY_CLASSES)):
+            mask = data["classes"] == c
+            top1[c, lo:lo + chunk] = hit1[mask].sum(axis=0)
+            top5[c, lo:lo + chunk] = hit5[mask].sum(axis=0)
+
+    return top1, top5
+
+
+def _init_worker(data):
+    global _data
+    _data = data
+
+
+def _evaluate_chunk(params):
+    return evaluate(_data, params)
+
+
+def objective(top1, top5, total):
+    """Macro-averaged top-1 accuracy, with top-5 as a small tie-breaker"""
+    total = np.maximum(total, 1)[:, None]
+    return (top1 / total).mean(axis=0) + 1e-3 * (top5 / total).mean(axis=0)
+
+
+def grid_params():
+    axes = [np.arange(lo, hi + step / 2, step) for lo, hi, step in (SEARCH_SPACE[k] for k in PARAM_KEYS)]
+    return np.array(list(itertools.product(*axes)), dtype=np.float64)
+
+
+def random_params(trials, rng):
+    lows = np.array([SEARCH_SPACE[k][0] for k in PARAM_KEYS])
+    highs = np.array([SEARCH_SPACE[k][1] for k in PARAM_KEYS])
+    return lows + rng.random((trials, len(PARAM_KEYS))) * (highs - lows)
+
+
+def run_parallel(pool, params, workers):
+    """Evaluate parameter rows across the pool; returns top1, top5 (classes x settings)"""
+    pieces = np.array_split(params, max(1, min(len(params), workers * 4)))
+    results = list(pool.map(_evaluate_chunk, pieces))
+    return np.hstack([r[0] for r in results]), np.hstack([r[1] for r in results])
+
+
+def bayes_search(pool, workers, trials, batch_size, seed, total):
+    try:
+        import optuna
+    except ImportError:
+        raise SystemExit("[ERROR] --search bayes requires optuna (pip install optuna)")
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.create_study(direction="maximize", sampler=optuna.samplers.TPESampler(seed=seed))
+    all_params, all_top1, all_top5 = [], [], []
+
+    for done in range(0, trials, batch_size):
+        batch = [study.ask() for _ in range(min(batch_size, trials - done))]
+        params = np.array([
+            [trial.suggest_float(k, SEARCH_SPACE[k][0], SEARCH_SPACE[k][1]) for k in PARAM_KEYS]
+            for trial in batch
+        ])
+        top1, top5 = run_parallel(pool, params, workers)
+        for trial, value in zip(batch, objective(top1, top5, total)):
+            study.tell(trial, float(value))
+        all_params.append(params)
+        all_top1.append(top1)
+        all_top5.append(top5)
+        print(f"[INFO] {done + len(batch)}/{trials} trials, best objective {study.best_value:.4f}")
+
+    return np.vstack(all_params), np.hstack(all_top1), np.hstack(all_top5)
+
+
+def describe(params_row, top1, top5, total):
+    return {
+        "scores": {k: round(float(v), 4) for k, v in zip(PARAM_KEYS, params_row)},
+        "top1_accuracy": {c: round(int(top1[i]) / max(int(total[i]), 1), 4) for i, c in enumerate(QUERY_CLASSES)},
+        "top5_accuracy": {c: round(int(top5[i]) / max(int(total[i]), 1), 4) for i, c in enumerate(QUERY_CLASSES)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json_path", default=str(DEFAULT_JSON), help="Path to JSON drug DB")
+    parser.add_argument("--per_class", type=int, default=200, help="Labelled queries per query class")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--search", choices=["grid", "random", "bayes"], default="grid")
+    parser.add_argument("--trials", type=int, default=5000, help="Settings tried by random/bayes search")
+    parser.add_argument("--batch_size", type=int, default=64, help="Bayes trials proposed per parallel round")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", help="Write the best settings as JSON to this path")
+    args = parser.parse_args()
+
+    print(f"[INFO] Loading drugs from {args.json_path}...")
+    try:
+        records = load_records(args.json_path)
+    except ValueError as e:
+        raise SystemExit(f"[ERROR] {args.json_path} is not a JSON drug list ({e}); "
+                         f"if it is a Git LFS pointer, run git lfs pull")
+    engine = DrugVerificationEngine(drug_db=records)
+    queries = build_query_set(engine.drug_db, per_class=args.per_class, seed=args.seed)
+
+    start = time.time()
+    data = precompute(engine, queries)
+    print(f"[INFO] Precomputed {len(data['field_scores'])} query/candidate pairs "
+          f"for {len(queries)} queries in {time.time() - start:.1f}s")
+
+    current = np.array([[engine.SCORES[k] for k in PARAM_KEYS]], dtype=np.float64)
+    cur_top1, cur_top5 = evaluate(data, current)
+    baseline = describe(current[0], cur_top1[:, 0], cur_top5[:, 0], data["total"])
+    print(f"[INFO] Current weights: {baseline}")
+
+    start = time.time()
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context,
+                             initializer=_init_worker, initargs=(data,)) as pool:
+        if args.search == "bayes":
+            params, top1, top5 = bayes_search(pool, args.workers, args.trials, args.batch_size,
+                                              args.seed, data["total"])
+        else:
+            params = grid_params() if args.search == "grid" else random_params(args.trials, np.random.default_rng(args.seed))
+            print(f"[INFO] Evaluating {len(params)} settings on {args.workers} workers...")
+            top1, top5 = run_parallel(pool, params, args.workers)
+    elapsed = time.time() - start
+
+    scores = objective(top1, top5, data["total"])
+    order = np.argsort(-scores, kind="stable")
+    print(f"\n[INFO] {args.search} search over {len(params)} settings done in {elapsed:.1f}s "
+          f"({len(params) / max(elapsed, 1e-9):.0f} settings/s)")
+    print("[INFO] Top 5 weight settings:")
+    for i in order[:5]:
+        result = describe(params[i], top1[:, i], top5[:, i], data["total"])
+        print(f"Objective: {scores[i]:.4f} {result}")
+
+    if args.output:
+        best = describe(params[order[0]], top1[:, order[0]], top5[:, order[0]], data["total"])
+        report = {"search": args.search, "settings_tried": len(params), "current": baseline, "best": best}
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"[INFO] Best settings written to {args.output}")
+
 
 if __name__ == "__main__":
     main()
@@ -1,9 +1,59 @@
 import os
+import signal
+import socket
 import uvicorn
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# PRELOAD=1 with WEB_CONCURRENCY>1 builds the catalogs once in this process and
+# forks the workers from it, so they share those pages copy-on-write.
+# Measure with: python -m app.scripts.measure_worker_memory <this pid>
+PRELOAD = os.getenv("PRELOAD", "0").lower() in ("1", "true", "yes")
+WORKERS = int(os.getenv("WEB_CONCURRENCY", 1))
+
+
+def serve_preforked(host: str, port: int, workers: int):
+    # preload_catalogs() fetches Firestore deltas, opening a gRPC channel before
+    # fork; gRPC only supports that with fork support on (read at grpc import)
+    os.environ.setdefault("GRPC_ENABLE_FORK_SUPPORT", "1")
+    from app.main import app, preload_catalogs
+
+    preload_catalogs()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            uvicorn.Server(uvicorn.Config(app, host=host, port=port)).run(sockets=[sock])
+            os._exit(0)
+        children.append(pid)
+    print(f"Serving on {host}:{port} with {workers} preforked workers: {children}")
+
+    def stop(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for child in children:
+        os.waitpid(child, 0)
+
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8080))
-    uvicorn.run("app.main:app", host="0.0.0.0", port=port)  # no reload
+    if PRELOAD and WORKERS > 1 and hasattr(os, "fork"):
+        serve_preforked("0.0.0.0", port, WORKERS)
+    else:
+        uvicorn.run("app.main:app", host="0.0.0.0", port=port)  # no reload
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from app.core.bm25_index import BM25Index
+
+weights = {"name": 3.0, "text": 1.0}
+documents = [
+    {"name": "Coartem", "text": "artemether lumefantrine for malaria"},
+    {"name": "Lonart", "text": "artemether for malaria malaria"},
+    {"name": "Paracetamol", "text": "pain and fever"},
+    {"name": "Emzor Paracetamol", "text": "fever"},
+    {"name": None, "text": ""},
+]
+
+
+@pytest.fixture
+def index():
+    return BM25Index(documents, weights)
+
+
+def test_rows_must_match_every_word_as_a_prefix(index):
+    assert sorted(row for row, _ in index.search("artem malaria")) == [0, 1]
+    assert [row for row, _ in index.search("emzor para")] == [3]
+    assert index.search("artemether paracetamol") == []
+    assert index.search("cetamol") == []  # prefixes only
+    assert index.search("") == []
+
+
+def test_ranking_weights_fields_and_term_frequency(index):
+    # A name hit outweighs a hit in the text field
+    assert [row for row, _ in index.search("paracetamol")] == [2, 3]
+    assert [row for row, _ in index.search("fever")] == [2, 3]  # same weight: the shorter document wins
+    # Repeated words score higher, up to saturation
+    assert [row for row, _ in index.search("malaria")] == [1, 0]
+
+    scores = [score for _, score in index.search("artemether malaria")]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_search_limit_and_allowed_rows(index):
+    assert index.search("fever", limit=1) == index.search("fever")[:1]
+    assert [row for row, _ in index.search("fever", allowed_rows=np.array([2], dtype=np.int32))] == [2]
+
+
+def test_expand_lists_indexed_terms_by_prefix(index):
+    assert index.expand("arte") == ["artemether"]
+    assert index.expand("f") == ["fever", "for"]
+    assert index.expand("zz") == []
+    assert len(index) == 5
@@ -0,0 +1,62 @@
+import pytest
+from app.core import ml
+from app.core.risk_table import RiskRecord, RiskTable
+
+risk_table = RiskTable([
+    RiskRecord(keyword="Fever", risk_weight=40, common_drugs=("Paracetamol", "Ibuprofen"), listed=True),
+    RiskRecord(keyword="headache", risk_weight=30, common_drugs=("Ibuprofen", "Panadol Extra"), listed=True),
+    RiskRecord(keyword="chest pain", risk_weight=70, common_drugs=(), listed=True),
+])
+verified_drugs = (
+    {"product_name": "Panadol Extra", "dosage_form": "Tablet"},
+    {"product_name": "Ibuprofen"},
+    {"product_name": "Paracetamol", "dosage_form": "Syrup"},
+    {"product_name": "Amoxil", "dosage_form": "Capsule"},
+)
+
+
+class ParsedText:
+    """Stands in for a spaCy Doc without entities or duration phrases"""
+    ents = ()
+
+    def __iter__(self):
+        return iter(())
+
+
+@pytest.fixture(autouse=True)
+def tables(monkeypatch):
+    monkeypatch.setattr(ml, "risk_table", risk_table)
+    monkeypatch.setattr(ml, "verified_drugs", verified_drugs)
+    monkeypatch.setattr(ml, "get_doc", lambda text: ParsedText())
+
+
+def with_keywords(monkeypatch, keywords):
+    monkeypatch.setattr(ml, "extract_keywords", lambda text: list(keywords))
+
+
+def test_suggested_drugs_name_the_keyword_that_suggested_them(monkeypatch):
+    with_keywords(monkeypatch, ["Fever", "headache"])
+    result = ml.calculate_risk("fever and headache")
+
+    assert result["risk_score"] == 40
+    assert result["risk_level"] == "Low"
+    # Verified drug order; a drug listed by several keywords names the first
+    assert result["suggested_drugs"] == [
+        {"name": "Panadol Extra", "dosage_form": "Tablet", "use_case": "Treats headache"},
+        {"name": "Ibuprofen", "dosage_form": "N/A", "use_case": "Treats Fever"},
+        {"name": "Paracetamol", "dosage_form": "Syrup", "use_case": "Treats Fever"},
+    ]
+
+
+def test_severity_raises_the_score_without_suggestions(monkeypatch):
+    with_keywords(monkeypatch, ["chest pain"])
+    result = ml.calculate_risk("severe chest pain")
+    assert result["risk_score"] == 100
+    assert result["risk_level"] == "High"
+    assert result["suggested_drugs"] == []
+
+
+def test_no_keywords_no_suggestions(monkeypatch):
+    with_keywords(monkeypatch, [])
+    result = ml.calculate_risk("ok")
+    assert (result["risk_score"], result["matched_keywords"], result["suggested_drugs"]) == (0, [], [])
@@ -0,0 +1,81 @@
+import random
+import pytest
+from rapidfuzz.distance import Levenshtein
+from app.core.nafdac_index import NafdacIndex
+
+registrations = [
+    ("A4-1234", "coartem"),
+    ("a4 1235", "coartem dispersible"),
+    ("04-5678", "lonart"),
+    ("04-0012", "emzor paracetamol"),
+    ("B4-0123", "amatem"),
+    ("A4-1234", "coartem (repack)"),
+    (None, "unregistered"),
+    ("--", "blank"),
+]
+
+
+@pytest.fixture
+def index():
+    return NafdacIndex(registrations)
+
+
+def test_exact_lookups_use_canonical_numbers(index):
+    assert len(index) == 5
+    assert index.exact("a4 1234") == ["coartem", "coartem (repack)"]
+    assert index.exact("A4-123") == []
+    assert index.exact(None) == []
+
+
+def test_prefix_returns_sorted_keys_within_the_limit(index):
+    assert index.prefix("a4-123") == ["A41234", "A41235"]
+    assert index.prefix("04") == ["040012", "045678"]
+    assert index.prefix("04", limit=1) == ["040012"]
+    assert index.prefix("C4") == []
+    assert index.prefix("") == []
+
+
+def test_contains_finds_numbers_anywhere(index):
+    assert index.contains("1234") == ["A41234"]
+    assert index.contains("012") == ["040012", "B40123"]
+    assert set(index.contains("4")) == set(index.keys)
+    assert len(index.contains("4", limit=2)) == 2
+    assert index.contains("X") == []
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("A41234", [("A41234", 0), ("A41235", 1)]),
+    ("A4-1243", [("A41234", 2), ("A41235", 2)]),    # transposition
+    ("A41Z34", [("A41234", 1), ("A41235", 2)]),     # substitution
+    ("A4134", [("A41234", 1), ("A41235", 2)]),      # deletion
+    ("045A678", [("045678", 1)]),                   # insertion
+])
+def test_fuzzy_finds_numbers_within_two_edits(index, query, expected):
+    assert index.fuzzy(query) == expected
+
+
+def test_fuzzy_caps_distance_and_limit(index):
+    assert index.fuzzy("A41Z34", max_distance=1) == [("A41234", 1)]
+    assert index.fuzzy("A41Z34", max_distance=5) == index.fuzzy("A41Z34", max_distance=2)
+    assert index.fuzzy("A41234", limit=1) == [("A41234", 0)]
+
+
+def test_fuzzy_matches_a_brute_force_scan():
+    rng = random.Random(7)
+    alphabet = "AB0123456789"
+    keys = {"".join(rng.choices(alphabet, k=rng.randint(4, 8))) for _ in range(300)}
+    index = NafdacIndex((key, key) for key in keys)
+    for _ in range(100):
+        query = "".join(rng.choices(alphabet, k=rng.randint(3, 9)))
+        expected = sorted(
+            ((key, Levenshtein.distance(query, key)) for key in keys if Levenshtein.distance(query, key) <= 2),
+            key=lambda r: (r[1], r[0])
+        )
+        assert index.fuzzy(query) == expected
+
+
+def test_lookup_falls_back_from_exact_to_prefix_to_fuzzy(index):
+    assert index.lookup("A4-1234") == ["coartem", "coartem (repack)"]
+    assert index.lookup("04") == ["emzor paracetamol", "lonart"]
+    assert index.lookup("04-5679") == ["lonart"]
+    assert index.lookup("04-5679", max_distance=0) == []
@@ -0,0 +1,59 @@
+import random
+import re
+import pytest
+from app.core.phrase_matcher import PhraseMatcher, normalize_phrase
+
+vocabulary = ["fever", "pain", "chest pain", "chest", "headache", "ache", "sore throat", "covid-19", "b12"]
+
+
+@pytest.fixture
+def matcher():
+    return PhraseMatcher(vocabulary)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I have a fever", ["fever"]),
+    ("feeling feverish", []),                       # no hit inside a longer word
+    ("a headache since monday", ["headache"]),      # "ache" is inside "headache"
+    ("my ache is bad", ["ache"]),
+    ("Chest Pain and FEVER", ["chest", "chest pain", "pain", "fever"]),
+    ("chestpain", []),
+    ("pain, fever; sore throat.", ["pain", "fever", "sore throat"]),
+    ("tested covid-19 positive", ["covid-19"]),
+    ("low b12", ["b12"]),
+    ("low b123", []),
+    ("fever_chart", []),                            # "_" is a word character, as in regex \b
+    ("", []),
+])
+def test_phrases_match_on_word_boundaries_only(matcher, text, expected):
+    assert matcher.phrases(text) == expected
+
+
+def test_find_reports_positions_of_every_hit(matcher):
+    text = "pain, then chest pain"
+    hits = matcher.find(text)
+    assert hits == [(0, 4, "pain"), (11, 16, "chest"), (11, 21, "chest pain"), (17, 21, "pain")]
+    assert all(text[start:end] == phrase for start, end, phrase in hits)
+    assert matcher.phrases(text) == ["pain", "chest", "chest pain"]
+
+
+def test_phrases_are_normalized():
+    matcher = PhraseMatcher(["  Sore   Throat ", "", "FEVER", "fever"])
+    assert len(matcher) == 2
+    assert normalize_phrase("  Sore   Throat ") == "sore throat"
+    assert matcher.phrases("SORE THROAT and Fever") == ["sore throat", "fever"]
+
+
+def test_matches_a_regex_word_boundary_scan():
+    rng = random.Random(3)
+    words = ["ab", "abc", "bc", "c", "a b", "b-c", "cab", "ba"]
+    matcher = PhraseMatcher(words)
+    for _ in range(300):
+        text = "".join(rng.choices("abc -", k=rng.randint(0, 12)))
+        # Overlapping whole-word occurrences: a lookahead at each boundary
+        expected = sorted(
+            (m.start(), m.start() + len(word), word)
+            for word in words
+            for m in re.finditer(r"(?<!\w)(?=" + re.escape(word) + r"(?!\w))", text)
+        )
+        assert sorted(matcher.find(text)) == expected
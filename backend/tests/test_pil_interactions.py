@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.core.pil_interactions import InteractionRecorder, SQLiteInteractionStore
+from app.models.pils_model import UserInteractionBase
+
+start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def view(pil_id, minutes, user_id="user-1", saved=False):
+    return UserInteractionBase(user_id=user_id, pil_id=pil_id, saved=saved,
+                               last_viewed=start + timedelta(minutes=minutes), view_count=1)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteInteractionStore(str(tmp_path / "runtime" / "pil_interactions.db"))
+
+
+@pytest.fixture
+def recorder(store):
+    # No background flushes: the tests flush explicitly
+    return InteractionRecorder(store, flush_seconds=3600, flush_size=100)
+
+
+def test_store_is_created_on_first_use(store):
+    assert not store.path.exists()
+    assert store.get("user-1", "p1") is None
+    assert store.path.exists()
+
+
+def test_views_are_buffered_and_merged_into_reads(recorder, store):
+    recorder.record(view("p1", 1))
+    recorder.record(view("p1", 5))
+    assert store.get("user-1", "p1") is None  # not flushed yet
+
+    merged = recorder.get("user-1", "p1")
+    assert (merged.view_count, merged.saved, merged.last_viewed) == (2, False, start + timedelta(minutes=5))
+
+    assert recorder.flush() == 1
+    assert recorder.flush() == 0
+    assert store.get("user-1", "p1")["view_count"] == 2
+
+    # Pending views add to the stored count
+    recorder.record(view("p1", 2))
+    merged = recorder.get("user-1", "p1")
+    assert (merged.view_count, merged.last_viewed) == (3, start + timedelta(minutes=5))
+    recorder.flush()
+    assert store.get("user-1", "p1")["view_count"] == 3
+
+
+def test_saves_write_through_and_stay_set(recorder, store):
+    recorder.record(view("p1", 1, saved=True))
+    assert store.get("user-1", "p1")["saved"] is True
+
+    recorder.record(view("p1", 2))
+    recorder.flush()
+    assert store.get("user-1", "p1")["saved"] is True
+    assert store.get("user-1", "p1")["view_count"] == 2
+
+
+def test_lists_merge_pending_and_stored_rows(recorder):
+    recorder.record(view("p1", 1))
+    recorder.record(view("p2", 2, saved=True))  # flushes p1 and p2
+    recorder.record(view("p3", 3))
+    recorder.record(view("p1", 4))
+    recorder.record(view("p9", 9, user_id="user-2"))
+
+    assert [i.pil_id for i in recorder.list_for_user("user-1")] == ["p1", "p3", "p2"]
+    assert [i.pil_id for i in recorder.list_for_user("user-1", limit=2)] == ["p1", "p3"]
+    assert [i.pil_id for i in recorder.list_for_user("user-1", saved=True)] == ["p2"]
+    assert [i.pil_id for i in recorder.list_for_user("user-1", saved=False)] == ["p1", "p3"]
+
+    # A pending save moves a stored unsaved row into the saved list
+    recorder.flush()
+    recorder._pending[("user-1", "p3")] = {"saved": True, "view_count": 0, "last_viewed": start}
+    assert [i.pil_id for i in recorder.list_for_user("user-1", saved=True)] == ["p3", "p2"]
+
+
+def test_flush_size_triggers_a_flush(store):
+    recorder = InteractionRecorder(store, flush_seconds=3600, flush_size=2)
+    recorder.record(view("p1", 1))
+    assert store.get("user-1", "p1") is None
+    recorder.record(view("p2", 2))
+    assert store.get("user-1", "p1")["view_count"] == 1
+    assert store.get("user-1", "p2")["view_count"] == 1
+
+
+def test_failed_flush_keeps_pending_changes(recorder, store, monkeypatch):
+    recorder.record(view("p1", 1))
+
+    def unavailable(deltas):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "upsert", unavailable)
+    assert recorder.flush() == 0
+    recorder.record(view("p1", 2))
+    monkeypatch.undo()
+
+    assert recorder.flush() == 1
+    assert store.get("user-1", "p1")["view_count"] == 2
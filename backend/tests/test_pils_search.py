@@ -0,0 +1,56 @@
+import pytest
+from app.core.pils_loader import pil_loader
+from app.core.pils_manager import PILManager
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    items = [
+        {
+            "nexahealth_id": i,
+            "product_name": f"Paracetamol {i * 100}mg",
+            "generic_name": "Paracetamol",
+            "dosage_form": "Tablet",
+            "strength": f"{i * 100}mg",
+            "category": "Other",
+            "description": "for pain" if i % 2 else "",
+            "identifiers": {"nafdac_reg_no": f"A4-{i:04d}"},
+            "manufacturer": {"name": "Emzor"},
+        }
+        for i in range(1, 26)
+    ]
+    monkeypatch.setattr(pil_loader, "_data", items)
+    monkeypatch.setattr(pil_loader, "_items", None)
+    return PILManager()
+
+
+def test_search_pages_follow_the_cursor_without_gaps(manager):
+    first = manager.search_pils(search="paracetamol", limit=10)
+    seen = [pil["nexahealth_id"] for pil in first["results"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        page = manager.search_pils(search="paracetamol", limit=10, cursor=cursor)
+        assert page["suggestions"] == []
+        seen += [pil["nexahealth_id"] for pil in page["results"]]
+        cursor = page["next_cursor"]
+
+    assert len(first["results"]) == 10
+    assert sorted(seen) == list(range(1, 26))
+
+
+def test_listing_pages_follow_catalogue_order(manager):
+    first = manager.search_pils(limit=20)
+    second = manager.search_pils(limit=20, cursor=first["next_cursor"])
+    assert [pil["nexahealth_id"] for pil in first["results"] + second["results"]] == list(range(1, 26))
+    assert second["next_cursor"] is None
+
+
+def test_search_falls_back_to_substrings(manager):
+    # Neither a word prefix nor spaced like the names: found by the compact substring scan
+    results = manager.search_pils(search="paracetamol2500mg")["results"]
+    assert [pil["nexahealth_id"] for pil in results][:1] == [25]
+
+
+def test_malformed_cursor_is_rejected(manager):
+    with pytest.raises(ValueError):
+        manager.search_pils(search="paracetamol", cursor="not-a-cursor")
@@ -0,0 +1,63 @@
+import random
+import pytest
+from app.core.trigram_index import TrigramIndex, trigrams
+
+names = [
+    "coartem",
+    "coartem dispersible",
+    "lonart",
+    "emzor paracetamol",
+    "paracetamol",
+    "",
+    "paracetamol",
+]
+
+
+@pytest.fixture
+def index():
+    return TrigramIndex(names)
+
+
+def test_trigrams_are_padded_per_word():
+    assert trigrams("ab") == {" ab", "ab "}
+    assert trigrams("abc de") == {" ab", "abc", "bc ", " de", "de "}
+    assert trigrams("") == set()
+
+
+def test_exact_and_mistyped_names_rank_first(index):
+    assert index.search("coartem", limit=2) == [0, 1]
+    assert index.search("coartam", limit=1) == [0]
+    assert index.search("paracetmol", limit=3) == [4, 6, 3]  # equal texts tie by row
+
+
+def test_limit_and_min_similarity(index):
+    assert len(index.search("paracetamol", limit=10)) == 3
+    assert index.search("paracetamol", limit=10, min_similarity=0.9) == [4, 6]
+    assert index.search("paracetamol", limit=1) == [4]
+    assert index.search("xyz", limit=10) == []
+    assert index.search("", limit=10) == []
+    assert len(index) == len(names)
+
+
+def test_common_trigrams_are_skipped_unless_they_are_all_there_is():
+    index = TrigramIndex(["tab one", "tab two", "tab three", "tab four", "ones"])
+    # " ta", "tab", "ab " are in 80% of rows: with stop_fraction=0.5 only "one" trigrams count
+    assert index.search("tab one", limit=5, stop_fraction=0.5) == [0, 4]
+    assert index.search("tab", limit=5, stop_fraction=0.5) == [0, 1, 3, 2]  # shorter texts first
+
+
+def dice(a, b):
+    ga, gb = trigrams(a), trigrams(b)
+    return 2 * len(ga & gb) / (len(ga) + len(gb))
+
+
+def test_matches_a_brute_force_dice_ranking():
+    rng = random.Random(5)
+    texts = [" ".join("".join(rng.choices("abcde", k=rng.randint(2, 6))) for _ in range(rng.randint(1, 3)))
+             for _ in range(200)]
+    index = TrigramIndex(texts)
+    for _ in range(50):
+        query = "".join(rng.choices("abcde", k=rng.randint(3, 8)))
+        scored = [(dice(query, text), row) for row, text in enumerate(texts) if trigrams(query) & trigrams(text)]
+        expected = [row for _, row in sorted(scored, key=lambda s: (-s[0], s[1]))[:10]]
+        assert index.search(query, limit=10) == expected
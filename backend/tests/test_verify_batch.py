@@ -0,0 +1,131 @@
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from app.routers import verify
+from app.core.verify_engine import DrugVerificationEngine
+
+catalog = [
+    {
+        "nexahealth_id": 1,
+        "product_name": "Coartem 20/120 Tablets",
+        "generic_name": "Artemether/Lumefantrine",
+        "identifiers": {"nafdac_reg_no": "A4-1234"},
+        "manufacturer": {"name": "Novartis Pharma AG"}
+    },
+    {
+        "nexahealth_id": 2,
+        "product_name": "Emzor Paracetamol",
+        "generic_name": "Paracetamol",
+        "identifiers": {"nafdac_reg_no": "04-0012"},
+        "manufacturer": {"name": "Emzor Pharmaceutical Industries Ltd"}
+    },
+]
+
+
+class MockUser:
+    id = "user-1"
+    email = "tester@example.com"
+
+
+app = FastAPI()
+app.include_router(verify.router)
+app.dependency_overrides[verify.get_current_active_user] = lambda: MockUser()
+client = TestClient(app)
+
+
+async def no_remote_candidates(self, inputs):
+    return [], False
+
+
+async def failed_remote_lookup(self, inputs):
+    return [], True
+
+
+@pytest.fixture(autouse=True)
+def engine():
+    # engine_meta None: the engine is not on disk, so batches score in a thread
+    with patch.object(verify, "engine", DrugVerificationEngine(catalog, dataset_version="batch-test")), \
+            patch.object(verify, "engine_meta", None), \
+            patch.object(DrugVerificationEngine, "_find_candidates_remote", no_remote_candidates), \
+            patch("app.routers.verify.increment_user_stat"):
+        yield verify.engine
+
+
+def read_lines(response):
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    return sorted(lines[:-1], key=lambda line: line["index"]), lines[-1]["summary"]
+
+
+def test_batch_json_rows_in_input_order_with_duplicates_scored_once():
+    items = [
+        {"product_name": "Coartem", "nafdac_reg_no": "A4-1234"},
+        {"product_name": "Emzor Paracetamol"},
+        {"product_name": "coartem", "nafdac_reg_no": "a4-1234"},
+    ]
+    response = client.post("/api/verify/batch", json={"items": items})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    rows, summary = read_lines(response)
+    assert [row["index"] for row in rows] == [0, 1, 2]
+    assert rows[0]["result"]["product_name"] == "Coartem 20/120 Tablets"
+    assert rows[1]["result"]["product_name"] == "Emzor Paracetamol"
+    assert rows[2]["result"] == rows[0]["result"]
+    assert summary == {"total": 3, "unique": 2, "errors": 0}
+
+
+def test_batch_json_list_body_matches_single_verification():
+    item = {"product_name": "Emzor Paracetamol", "manufacturer": "Emzor"}
+    rows, _ = read_lines(client.post("/api/verify/batch", json=[item]))
+    single = client.post("/api/verify/drug", json=item)
+    assert single.status_code == 200
+    assert rows[0]["result"] == single.json()
+
+
+def test_batch_csv_body_and_upload():
+    text = "product_name,nafdac_reg_no,unknown_column\nCoartem,A4-1234,x\nEmzor Paracetamol,,\n"
+    body = client.post("/api/verify/batch", content=text.encode("utf-8"),
+                       headers={"content-type": "text/csv"})
+    upload = client.post("/api/verify/batch", files={"file": ("drugs.csv", text.encode("utf-8-sig"), "text/csv")})
+
+    for response in (body, upload):
+        assert response.status_code == 200
+        rows, summary = read_lines(response)
+        assert [row["result"]["product_name"] for row in rows] == ["Coartem 20/120 Tablets", "Emzor Paracetamol"]
+        assert summary == {"total": 2, "unique": 2, "errors": 0}
+
+
+def test_batch_item_errors_are_reported_per_row():
+    with patch.object(DrugVerificationEngine, "verify_drug_local", side_effect=RuntimeError("boom")):
+        rows, summary = read_lines(client.post("/api/verify/batch", json={"items": [{"product_name": "Flagyl"}]}))
+    assert rows == [{"index": 0, "error": "Drug verification failed: boom"}]
+    assert summary["errors"] == 1
+
+
+def test_batch_flags_failed_remote_lookup():
+    with patch.object(DrugVerificationEngine, "_find_candidates_remote", failed_remote_lookup):
+        rows, _ = read_lines(client.post("/api/verify/batch", json={"items": [{"product_name": "Zzqx Unlisted"}]}))
+    assert rows[0]["result"]["status"] == "unknown"
+    assert rows[0]["result"]["remote_lookup_failed"] is True
+
+    # Not cached: once Firestore answers again, the same request is a plain miss
+    rows, _ = read_lines(client.post("/api/verify/batch", json={"items": [{"product_name": "Zzqx Unlisted"}]}))
+    assert rows[0]["result"]["remote_lookup_failed"] is False
+
+
+@pytest.mark.parametrize("kwargs, status_code", [
+    ({"json": {"items": []}}, 422),
+    ({"json": {"items": [{"product_name": "Coartem"}] * 501}}, 422),
+    ({"json": {"rows": []}}, 422),
+    ({"content": b"not json", "headers": {"content-type": "application/json"}}, 422),
+    ({"content": "product_name\nCo\xe9\n".encode("latin-1"), "headers": {"content-type": "text/csv"}}, 400),
+    ({"files": {"file": ("drugs.csv", b"\xff\xfeproduct_name", "text/csv")}}, 400),
+    ({"files": {"upload": ("drugs.csv", b"product_name\nCoartem\n", "text/csv")}}, 400),
+    ({"data": {"file": "product_name\nCoartem\n"}, "files": {"other": ("x", b"", "text/plain")}}, 422),
+    ({"content": b"product_name\n", "headers": {"content-type": "text/csv"}}, 422),
+])
+def test_batch_rejects_bad_input(kwargs, status_code):
+    response = client.post("/api/verify/batch", **kwargs)
+    assert response.status_code == status_code
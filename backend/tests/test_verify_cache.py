@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from app.core import verify_cache
+from app.core.verify_cache import SQLiteSharedCache, VerificationCache
+
+inputs = {"product_name": "coartem", "generic_name": "", "manufacturer": "novartis", "nafdac": "A41234"}
+result = {"status": "verified", "match_score": 95}
+
+
+@pytest.fixture
+def shared(tmp_path):
+    return SQLiteSharedCache(str(tmp_path / "verify_cache.db"))
+
+
+def test_keys_include_the_dataset_version():
+    cache = VerificationCache()
+    cache.set_version("v1")
+    key_v1 = cache.make_key(inputs)
+    cache.set_version("v2")
+    assert cache.make_key(inputs) != key_v1
+
+
+def test_new_version_drops_local_entries():
+    cache = VerificationCache()
+    cache.set_version("v1")
+    key = cache.make_key(inputs)
+    cache.set(key, result)
+    assert cache.get(key) == result
+
+    cache.set_version("v1")  # unchanged version keeps entries
+    assert cache.get(key) == result
+
+    cache.set_version("v2")
+    assert cache.get(key) is None
+    stats = cache.stats()
+    assert stats["invalidations"] == 1
+    assert stats["local_size"] == 0
+    assert (stats["local_hits"], stats["misses"]) == (2, 1)
+
+
+def test_local_tier_is_lru_bounded():
+    cache = VerificationCache(maxsize=2)
+    cache.set_version("v1")
+    cache.set("a", {"n": 1})
+    cache.set("b", {"n": 2})
+    cache.get("a")
+    cache.set("c", {"n": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.get("c") == {"n": 3}
+
+
+def test_shared_tier_serves_other_workers(shared):
+    writer = VerificationCache(shared=shared)
+    reader = VerificationCache(shared=shared)
+    for cache in (writer, reader):
+        cache.set_version("v1")
+
+    key = writer.make_key(inputs)
+    writer.set(key, result)
+    assert reader.get(key) == result
+    assert reader.stats()["shared_hits"] == 1
+    assert reader.get(key) == result  # now promoted to the local tier
+    assert reader.stats()["local_hits"] == 1
+
+
+def test_shared_tier_prunes_other_versions(shared):
+    old = VerificationCache(shared=shared)
+    old.set_version("v1")
+    key = old.make_key(inputs)
+    old.set(key, result)
+
+    new = VerificationCache(shared=shared)
+    new.set_version("v2")
+    assert shared.get(key) is None
+
+
+def test_shared_tier_entries_expire_after_ttl(shared, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(verify_cache.time, "time", lambda: now[0])
+    writer = VerificationCache(shared=shared, shared_ttl=60)
+    writer.set_version("v1")
+    key = writer.make_key(inputs)
+    writer.set(key, result)
+
+    reader = VerificationCache(shared=shared)
+    reader.set_version("v1")
+    now[0] += 59
+    assert reader.get(key) == result
+
+    other = VerificationCache(shared=shared)
+    other.set_version("v1")
+    now[0] += 2
+    assert other.get(key) is None
+
+
+def test_async_tiers_match_sync(shared):
+    writer = VerificationCache(shared=shared)
+    reader = VerificationCache(shared=shared)
+    for cache in (writer, reader):
+        cache.set_version("v1")
+    key = writer.make_key(inputs)
+
+    asyncio.run(writer.set_async(key, result))
+    assert asyncio.run(reader.get_async(key)) == result
+    assert asyncio.run(reader.get_async(reader.make_key({**inputs, "nafdac": ""}))) is None
+    assert reader.stats()["shared_hits"] == 1
+    assert reader.stats()["misses"] == 1
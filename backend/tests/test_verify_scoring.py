@@ -0,0 +1,122 @@
+import pytest
+from app.core.verify_engine import DrugVerificationEngine
+
+catalog = [
+    {
+        "nexahealth_id": 1,
+        "product_name": "Coartem 20/120 Tablets",
+        "generic_name": "Artemether/Lumefantrine",
+        "identifiers": {"nafdac_reg_no": "A4-1234"},
+        "manufacturer": {"name": "Novartis Pharma AG"}
+    },
+    {
+        "nexahealth_id": 2,
+        "product_name": "Coartem Dispersible",
+        "generic_name": "Artemether/Lumefantrine",
+        "identifiers": {"nafdac_reg_no": "A4-1235"},
+        "manufacturer": {"name": "Novartis Pharma AG"}
+    },
+    {
+        "nexahealth_id": 3,
+        "product_name": "Lonart DS",
+        "generic_name": "Artemether/Lumefantrine",
+        "identifiers": {"nafdac_reg_no": "04-5678"},
+        "manufacturer": {"name": "Bliss GVS Pharma Ltd"}
+    },
+    {
+        "nexahealth_id": 4,
+        "product_name": "Emzor Paracetamol",
+        "generic_name": "Paracetamol",
+        "identifiers": {"nafdac_reg_no": "04-0012"},
+        "manufacturer": {"name": "Emzor Pharmaceutical Industries Ltd"}
+    },
+    {
+        # Empty generic name, NAFDAC number and manufacturer
+        "nexahealth_id": 5,
+        "product_name": "Panadol Extra",
+        "generic_name": "",
+        "identifiers": {},
+        "manufacturer": {}
+    },
+    {
+        "nexahealth_id": 6,
+        "product_name": "",
+        "generic_name": "Paracetamol",
+        "identifiers": {"nafdac_reg_no": "A4-0099"},
+        "manufacturer": {"name": "GlaxoSmithKline"}
+    },
+]
+
+requests = [
+    {"product_name": "Coartem", "manufacturer": "Novartis", "nafdac_reg_no": "A4-1234"},
+    {"product_name": "Coartem"},
+    {"product_name": "coartem dispersable", "generic_name": "artemether lumefantrine"},
+    {"nafdac_reg_no": "A4-1234"},
+    {"nafdac_reg_no": "a4 1235"},
+    {"nafdac_reg_no": "04-5679"},
+    {"product_name": "Paracetamol", "manufacturer": "Emzor"},
+    {"generic_name": "Paracetamol"},
+    {"product_name": "Panadol", "nafdac_reg_no": "A4-0099"},
+    {"product_name": "Lonart", "manufacturer": "Novartis Pharma AG"},
+    {"product_name": "", "generic_name": "", "nafdac_reg_no": "", "manufacturer": ""},
+]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return DrugVerificationEngine(catalog, dataset_version="test")
+
+
+def scalar_results(engine, inputs):
+    """Reference path: _score_drug on every drug, filtered and ranked like _score_candidates"""
+    results = []
+    for drug in engine.drug_db:
+        score, details, warnings = engine._score_drug(drug, inputs)
+        if score >= engine.SCORES["min_score"]:
+            results.append((score, drug, details, warnings))
+    return sorted(results, key=lambda x: x[0], reverse=True)
+
+
+@pytest.mark.parametrize("request_dict", requests)
+def test_score_candidates_matches_scalar_path(engine, request_dict):
+    inputs = engine._normalize_inputs(request_dict)
+    all_ids = {drug.nexahealth_id for drug in engine.drug_db}
+
+    batch = engine._score_candidates(all_ids, inputs)
+    scalar = scalar_results(engine, inputs)
+
+    assert [drug.nexahealth_id for _, drug, _, _ in batch] == \
+        [drug.nexahealth_id for _, drug, _, _ in scalar]
+    for (batch_score, _, batch_details, batch_warnings), (score, _, details, warnings) in zip(batch, scalar):
+        assert batch_score == pytest.approx(score)
+        assert [(d["field"], d["reason"], d["matched"]) for d in batch_details] == \
+            [(d["field"], d["reason"], d["matched"]) for d in details]
+        assert [d["score"] for d in batch_details] == pytest.approx([d["score"] for d in details])
+        assert batch_warnings == warnings
+
+
+def test_score_candidates_empty_inputs_score_nothing(engine):
+    inputs = engine._normalize_inputs({})
+    all_ids = {drug.nexahealth_id for drug in engine.drug_db}
+    assert engine._score_candidates(all_ids, inputs) == scalar_results(engine, inputs)
+    assert engine._score_candidates(set(), inputs) == []
+
+
+def test_score_candidates_ties_rank_in_catalogue_order():
+    # Identical drugs under ids whose set iteration order is not catalogue order
+    ids = [17, 9, 2, 33]
+    tied = DrugVerificationEngine([
+        {
+            "nexahealth_id": drug_id,
+            "product_name": "Flagyl 400mg",
+            "generic_name": "Metronidazole",
+            "identifiers": {"nafdac_reg_no": f"04-{drug_id:04d}"},
+            "manufacturer": {"name": "Sanofi"}
+        }
+        for drug_id in ids
+    ], dataset_version="test")
+    inputs = tied._normalize_inputs({"product_name": "Flagyl", "manufacturer": "Sanofi"})
+
+    batch = tied._score_candidates(set(ids), inputs)
+    assert [drug.nexahealth_id for _, drug, _, _ in batch] == ids
+    assert [drug.nexahealth_id for _, drug, _, _ in scalar_results(tied, inputs)] == ids